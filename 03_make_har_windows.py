@@ -0,0 +1,331 @@
+import os
+import json
+import pickle
+import argparse
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from glob import glob
+from functools import lru_cache
+from tqdm import tqdm
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+from ppg_pipeline import process_data, sensor_dataset
+from ppg_pipeline.utils import REVERSE_SENSOR_TYPE_MAP, SENSOR_VALUE_COLUMNS
+
+"""
+02_process_data.py 이후 단계
+1. har_label 파싱 -> label 구간 [timeString, 다음 timeString 또는 +label_duration)
+2. sensor sample 에 label 구간 join (searchsorted)
+3. 같은 label 구간 안에서 sensor type 별 고정 길이 window 생성 (stride view)
+4. <PROCESSED_DATA_DIR>/<device_id>/har_windows/<date>/<sensor_type>.npz / .parquet 로 저장
+"""
+load_dotenv()
+
+RAW_DATA_DIR = os.getenv("RAW_DATA_DIR")
+PROCESSED_DATA_DIR = os.getenv("PROCESSED_DATA_DIR")
+# 모든 shard 가 같은 label code 를 쓰도록 고정한 label 목록 ({"version", "labels"}), label 이 바뀌면 version 을 올림
+HAR_LABEL_VOCAB_PATH = os.getenv(
+    "HAR_LABEL_VOCAB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "har_label_vocab.json")
+)
+
+# har_label 항목에서 label 값을 가진 key
+HAR_LABEL_KEY = "label"
+WINDOW_SENSOR_TYPES = ["SAMSUNG_PPG", "SAMSUNG_ACCE", "GYROSCOPE"]
+
+DEFAULT_WINDOW_SIZE = 256
+DEFAULT_STRIDE = 128
+# label 항목 하나가 덮는 최대 시간 (다음 항목이 더 빨리 오면 거기까지)
+DEFAULT_LABEL_DURATION_MS = 60 * 1000
+# window 안에서 sample 간격이 이보다 크면 (수집 끊김) 해당 window 는 버림
+DEFAULT_MAX_GAP_MS = 1000
+
+FEATURE_FUNCTIONS = {
+    "mean": lambda windows: windows.mean(axis=1, dtype=np.float64),
+    "std": lambda windows: windows.std(axis=1, dtype=np.float64),
+    "min": lambda windows: windows.min(axis=1),
+    "max": lambda windows: windows.max(axis=1),
+    "rms": lambda windows: np.sqrt(np.square(windows, dtype=np.float64).mean(axis=1)),
+}
+SENSOR_TYPE_CODES = {sensor_type: type_value for type_value, sensor_type in REVERSE_SENSOR_TYPE_MAP.items()}
+# 값 컬럼(SENSOR_VALUE_COLUMNS)이 있는 sensor type 만 window 생성 가능 (SAMSUNG_IBI 등은 값이 없음)
+WINDOW_SENSOR_TYPE_CHOICES = [
+    sensor_type for sensor_type, type_value in SENSOR_TYPE_CODES.items() if SENSOR_VALUE_COLUMNS.get(type_value)
+]
+
+
+@lru_cache(maxsize=None)
+def load_label_vocab(vocab_path=HAR_LABEL_VOCAB_PATH):
+    # Returns: (version, label_names) -> label code 는 label_names 의 index
+    
+    with open(vocab_path, "r") as f:
+        vocab = json.load(f)
+    
+    return vocab["version"], np.array(vocab["labels"])
+
+def load_har_labels(device_id, target_date, label_key=HAR_LABEL_KEY, label_duration_ms=DEFAULT_LABEL_DURATION_MS):
+    """
+    target_date 를 포함할 수 있는 har_label 파일(생성일부터 일주일간 누적)을 읽어 해당 날짜의 label 구간을 반환.
+    timeString 은 KST 로 간주, 같은 시각의 항목이 여러 파일에 있으면 하나만 사용.
+    Returns: (starts, ends, labels) -> epoch ms int64 / int64 / object array, starts 순 정렬
+    """
+    
+    har_label_dir = os.path.join(RAW_DATA_DIR, device_id, "har_label")
+    target = datetime.strptime(target_date, "%Y-%m-%d")
+    
+    entries = {}
+    for har_label_path in sorted(glob(os.path.join(har_label_dir, "*"))):
+        try:
+            file_date = datetime.strptime(os.path.basename(har_label_path).split("_")[0], "%y%m%d")
+        except ValueError:
+            continue
+        if not target - timedelta(days=7) < file_date <= target:
+            continue
+        
+        with open(har_label_path, "r") as f:
+            datas = json.load(f)
+        for inner_dict in datas:
+            time_string = inner_dict.get("timeString")
+            if time_string is None or label_key not in inner_dict:
+                continue
+            if time_string.split(" ")[0] == target_date:
+                entries[time_string] = inner_dict[label_key]
+    
+    if not entries:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=object)
+    
+    time_strings = sorted(entries)
+    starts = pd.to_datetime(time_strings).tz_localize("Asia/Seoul").as_unit("ms").asi8
+    labels = np.array([entries[time_string] for time_string in time_strings], dtype=object)
+    
+    ends = starts + label_duration_ms
+    ends[:-1] = np.minimum(ends[:-1], starts[1:])
+    
+    return starts, ends, labels
+
+def load_sensor_arrays(device_id, target_date, sensor_type):
+    """
+    02_process_data.py 결과에서 sensor type 하나의 (timestamp ms, values (n, d) float32) 를 timestamp 순으로 반환.
+    partitioned dataset 이 있으면 dataset 에서, 없으면 columnar / legacy 일 단위 parquet 에서 읽음.
+    """
+    
+    value_columns = SENSOR_VALUE_COLUMNS[SENSOR_TYPE_CODES[sensor_type]]
+    dataset_dir = sensor_dataset.SENSOR_DATASET_DIR
+    
+    if dataset_dir and os.path.exists(sensor_dataset.partition_dir(dataset_dir, device_id, target_date, sensor_type)):
+        table = pq.read_table(
+            sensor_dataset.partition_dir(dataset_dir, device_id, target_date, sensor_type),
+            columns=["timestamp"] + value_columns,
+        )
+        timestamps = table["timestamp"].cast(pa.int64()).to_numpy()
+        values = np.column_stack([table[column].to_numpy() for column in value_columns]).astype(np.float32, copy=False)
+        return timestamps, values
+    
+    day_path = os.path.join(PROCESSED_DATA_DIR, device_id, "sensor_data", f"{target_date}.parquet")
+    if not os.path.exists(day_path):
+        return np.empty(0, dtype=np.int64), np.empty((0, len(value_columns)), dtype=np.float32)
+    
+    if "data" in pq.ParquetFile(day_path).schema_arrow.names:
+        # legacy : data(list<double>) / timestamp(int64 ms)
+        table = pq.read_table(day_path, columns=["timestamp", "data"], filters=[("sensor_type", "=", sensor_type)])
+        timestamps = table["timestamp"].to_numpy()
+        flat_values = pc.list_flatten(table["data"]).to_numpy().astype(np.float32)
+        values = flat_values.reshape(len(timestamps), -1)[:, :len(value_columns)]
+    else:
+        table = pq.read_table(day_path, columns=["timestamp"] + value_columns, filters=[("sensor_type", "=", sensor_type)])
+        timestamps = table["timestamp"].cast(pa.int64()).to_numpy()
+        values = np.column_stack([table[column].to_numpy() for column in value_columns]).astype(np.float32, copy=False)
+    
+    order = np.argsort(timestamps, kind="stable")
+    
+    return timestamps[order], values[order]
+
+def join_labels(timestamps, starts, ends):
+    # sample 별 label 구간 index, 어느 구간에도 속하지 않으면 -1
+    
+    label_index = np.searchsorted(starts, timestamps, side="right") - 1
+    inside = label_index >= 0
+    inside[inside] = timestamps[inside] < ends[label_index[inside]]
+    label_index[~inside] = -1
+    
+    return label_index
+
+def make_windows(timestamps, values, label_index, window_size=DEFAULT_WINDOW_SIZE, stride=DEFAULT_STRIDE,
+                 max_gap_ms=DEFAULT_MAX_GAP_MS):
+    """
+    같은 label 구간 안에서만 window 생성, window 안에 max_gap_ms 보다 큰 간격이 있으면 제외.
+    windows 는 values 의 stride view (복사 없음), 선택된 window 의 시작 위치만 index 로 반환.
+    Returns: (windows view (n_all, window_size, d), starts index)
+    """
+    
+    if len(timestamps) < window_size:
+        return np.empty((0, window_size, values.shape[1]), dtype=values.dtype), np.empty(0, dtype=np.int64)
+    
+    # (n - window_size + 1, d, window_size) -> (.., window_size, d)
+    windows = np.lib.stride_tricks.sliding_window_view(values, window_size, axis=0).transpose(0, 2, 1)
+    
+    # window 경계를 넘는 label 변경 / 시간 간격을 누적합으로 검사
+    breaks = np.zeros(len(timestamps), dtype=np.int64)
+    breaks[1:] = (label_index[1:] != label_index[:-1]) | (np.diff(timestamps) > max_gap_ms)
+    cumulative = np.cumsum(breaks)
+    
+    window_starts = np.arange(0, len(timestamps) - window_size + 1, dtype=np.int64)
+    valid = (cumulative[window_starts + window_size - 1] == cumulative[window_starts]) & (label_index[window_starts] >= 0)
+    
+    # 구간마다 stride 를 구간 시작부터 다시 맞춤
+    segment_start = np.maximum.accumulate(np.where(breaks.astype(bool), np.arange(len(timestamps)), 0))
+    valid &= (window_starts - segment_start[window_starts]) % stride == 0
+    
+    return windows, window_starts[valid]
+
+def window_features(windows, channels, features):
+    # {"<feature>_<channel>": (n,) float32}
+    
+    columns = {}
+    for feature in features:
+        feature_values = FEATURE_FUNCTIONS[feature](windows)
+        for channel_index, channel in enumerate(channels):
+            columns[f"{feature}_{channel}"] = feature_values[:, channel_index].astype(np.float32)
+    
+    return columns
+
+def make_save_dir(device_id, target_date):
+    
+    save_dir = os.path.join(PROCESSED_DATA_DIR, device_id, "har_windows", target_date)
+    os.makedirs(save_dir, exist_ok=True)
+    
+    return save_dir
+
+def process_har_windows(device_id, target_date, sensor_types=WINDOW_SENSOR_TYPES, window_size=DEFAULT_WINDOW_SIZE,
+                        stride=DEFAULT_STRIDE, max_gap_ms=DEFAULT_MAX_GAP_MS, features=None,
+                        label_key=HAR_LABEL_KEY, label_duration_ms=DEFAULT_LABEL_DURATION_MS,
+                        label_vocab_path=HAR_LABEL_VOCAB_PATH):
+    """
+    device-date 하나의 sensor type 별 window shard 저장.
+    - <sensor_type>.npz : windows (n, window_size, d) float32, label (n,) int16, label_names, label_vocab_version,
+                          start_ts / end_ts (n,) int64 ms, channels
+    - <sensor_type>.parquet : window 별 device_id / start / end / label (+ features), schema metadata 에 label_vocab_version
+    label code 는 label_vocab_path 의 고정 목록 기준 (shard 를 합쳐도 같은 code 는 같은 label), 목록에 없는 label 의 window 는 제외.
+    Returns: {sensor_type: window 수}
+    """
+    
+    starts, ends, labels = load_har_labels(device_id, target_date, label_key, label_duration_ms)
+    if len(starts) == 0:
+        return {}
+    vocab_version, label_names = load_label_vocab(label_vocab_path)
+    label_lookup = {name: code for code, name in enumerate(label_names.tolist())}
+    label_codes = np.array([label_lookup.get(label, -1) for label in labels.astype(str).tolist()], dtype=np.int16)
+    unknown_labels = sorted(set(labels[label_codes < 0].astype(str).tolist()))
+    if unknown_labels:
+        print(f"Unknown har labels (device-> {device_id}, date-> {target_date}, excluded): {unknown_labels}")
+    
+    save_dir = make_save_dir(device_id, target_date)
+    
+    window_counts = {}
+    for sensor_type in sensor_types:
+        timestamps, values = load_sensor_arrays(device_id, target_date, sensor_type)
+        if len(timestamps) == 0:
+            continue
+        label_index = join_labels(timestamps, starts, ends)
+        windows, window_starts = make_windows(timestamps, values, label_index, window_size, stride, max_gap_ms)
+        window_starts = window_starts[label_codes[label_index[window_starts]] >= 0]
+        
+        selected = windows[window_starts]
+        window_labels = label_codes[label_index[window_starts]]
+        start_ts = timestamps[window_starts]
+        end_ts = timestamps[window_starts + window_size - 1]
+        
+        channels = SENSOR_VALUE_COLUMNS[SENSOR_TYPE_CODES[sensor_type]]
+        np.savez(
+            os.path.join(save_dir, f"{sensor_type}.npz"),
+            windows=selected, label=window_labels, label_names=label_names, label_vocab_version=vocab_version,
+            start_ts=start_ts, end_ts=end_ts,
+            channels=np.array(channels),
+        )
+        
+        meta_columns = {
+            "device_id": pa.array([device_id] * len(window_starts), type=pa.string()),
+            "window_index": pa.array(np.arange(len(window_starts), dtype=np.int32)),
+            "start_time": pa.array(start_ts, type=pa.int64()).cast(pa.timestamp("ms", tz="Asia/Seoul")),
+            "end_time": pa.array(end_ts, type=pa.int64()).cast(pa.timestamp("ms", tz="Asia/Seoul")),
+            "label": pa.array(label_names[window_labels], type=pa.string()),
+        }
+        if features:
+            meta_columns.update(window_features(selected, channels, features))
+        meta_table = pa.table(meta_columns).replace_schema_metadata({"label_vocab_version": str(vocab_version)})
+        pq.write_table(meta_table, os.path.join(save_dir, f"{sensor_type}.parquet"))
+        
+        window_counts[sensor_type] = len(window_starts)
+    
+    return window_counts
+
+def process_device_dates(device_dates, **kwargs):
+    # 한 device-date 의 실패는 해당 항목만 건너뜀, Returns: {(device_id, target_date): error message}
+    
+    failed = {}
+    progress = tqdm(device_dates)
+    for device_id, target_date in progress:
+        progress.set_description(f"Device-> {device_id}, date-> {target_date}")
+        try:
+            process_har_windows(device_id, target_date, **kwargs)
+        except Exception as e:
+            failed[(device_id, target_date)] = f"{type(e).__name__}: {e}"
+            print(f"Failed device-> {device_id}, date-> {target_date}: {failed[(device_id, target_date)]}")
+    
+    return failed
+
+def main(start_date=None, end_date=None, device_ids=None, **kwargs):
+    
+    if start_date is None:
+        with open("upload_check.pkl", "rb") as f:
+            data_dict = pickle.load(f)
+        date_list = [data_dict["valid_data"]["date"]]
+        device_ids = device_ids or sorted(data_dict["valid_data"]["device_ids"])
+    else:
+        date_list = process_data.make_backfill_dates(start_date, end_date or start_date)
+        upload_check = process_data.upload_check
+        device_ids = device_ids or sorted(upload_check.parse_user2device(upload_check.CSV_PATH).values())
+    
+    device_dates = [(device_id, target_date) for device_id in device_ids for target_date in date_list]
+    failed = process_device_dates(device_dates, **kwargs)
+    
+    if failed:
+        print(f"Failed: {len(failed)}/{len(device_dates)}")
+        for (device_id, target_date), error in failed.items():
+            print(f"  {device_id} {target_date}: {error}")
+    
+    print("Done")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--start-date", default=None,
+                        help="처리 시작 날짜 YYYY-MM-DD (없으면 upload_check.pkl 의 날짜 / device)")
+    parser.add_argument("--end-date", default=None,
+                        help="처리 마지막 날짜 YYYY-MM-DD (기본: start-date)")
+    parser.add_argument("--device-ids", nargs="*", default=None)
+    parser.add_argument("--sensor-types", nargs="*", default=WINDOW_SENSOR_TYPES, choices=WINDOW_SENSOR_TYPE_CHOICES)
+    parser.add_argument("--window-size", type=int, default=DEFAULT_WINDOW_SIZE,
+                        help="window 당 sample 수")
+    parser.add_argument("--stride", type=int, default=DEFAULT_STRIDE,
+                        help="window 시작 간격 (sample 수)")
+    parser.add_argument("--max-gap-ms", type=int, default=DEFAULT_MAX_GAP_MS,
+                        help="window 안에서 허용하는 최대 sample 간격")
+    parser.add_argument("--features", nargs="*", default=None, choices=list(FEATURE_FUNCTIONS),
+                        help="parquet 에 추가할 window 별 channel 요약 feature")
+    parser.add_argument("--label-key", default=HAR_LABEL_KEY,
+                        help="har_label 항목에서 label 값의 key")
+    parser.add_argument("--label-duration-ms", type=int, default=DEFAULT_LABEL_DURATION_MS,
+                        help="label 항목 하나가 덮는 최대 시간")
+    parser.add_argument("--label-vocab", default=HAR_LABEL_VOCAB_PATH,
+                        help="label code 로 사용할 고정 label 목록 json ({\"version\", \"labels\"})")
+    args = parser.parse_args()
+    
+    main(
+        start_date=args.start_date, end_date=args.end_date, device_ids=args.device_ids,
+        sensor_types=args.sensor_types, window_size=args.window_size, stride=args.stride,
+        max_gap_ms=args.max_gap_ms, features=args.features,
+        label_key=args.label_key, label_duration_ms=args.label_duration_ms, label_vocab_path=args.label_vocab,
+    )
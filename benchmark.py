@@ -0,0 +1,286 @@
+import os
+import sys
+import json
+import time
+import glob
+import argparse
+import platform
+import resource
+import tempfile
+import multiprocessing
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+
+import synthetic_data
+
+"""
+synthetic 데이터로 처리 단계별 성능 측정
+- decode_*          : sensor binary decoding (utils.decode_binary / process_binary)
+- structure_scan    : sensor binary header 구조 확인 (utils.scan_sensor_structure, 값 decoding 없음)
+- samsung_health_*  : samsung_health json 처리 (process_samsung_health_batch / process_samsung_health)
+- upload_scan*      : 01_upload_check.catch_missing_data (디렉토리 listing / UploadIndex)
+- parquet_write_*   : decoding 된 table 을 sensor_data parquet 으로 기록
+benchmark 마다 새 process 에서 실행하여 peak RSS 를 따로 측정, 결과는 baseline json 과 비교 가능
+"""
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _sensor_paths(raw_dir):
+    return sorted(glob.glob(os.path.join(raw_dir, "*", "sensor_data", "*.bin")))
+
+def _file_bytes(paths):
+    return sum(os.path.getsize(path) for path in paths)
+
+def bench_decode_numpy(raw_dir, dates):
+    
+    from ppg_pipeline.utils import decode_binary
+    
+    paths = _sensor_paths(raw_dir)
+    start = time.perf_counter()
+    records = 0
+    for path in paths:
+        blocks, _ = decode_binary(path)
+        records += sum(len(block["sequence"]) for block in blocks)
+    
+    return records, _file_bytes(paths), time.perf_counter() - start
+
+def bench_decode_python(raw_dir, dates):
+    
+    from ppg_pipeline.utils import process_binary
+    
+    paths = _sensor_paths(raw_dir)
+    start = time.perf_counter()
+    records = sum(len(process_binary(path, engine="python")) for path in paths)
+    
+    return records, _file_bytes(paths), time.perf_counter() - start
+
+def bench_structure_scan(raw_dir, dates):
+    
+    from ppg_pipeline.utils import scan_sensor_structure
+    
+    paths = _sensor_paths(raw_dir)
+    start = time.perf_counter()
+    records = sum(scan_sensor_structure(path)["records"] for path in paths)
+    
+    return records, _file_bytes(paths), time.perf_counter() - start
+
+def _bench_samsung_health(raw_dir, engine):
+    
+    from ppg_pipeline import process_data
+    
+    paths = sorted(glob.glob(os.path.join(raw_dir, "*", "samsung_health", "*", "*.json")))
+    datas = []
+    for path in paths:
+        with open(path, "r") as f:
+            datas.append((os.path.basename(path).split("_")[0], json.load(f)))
+    
+    process_fn = process_data.process_samsung_health_batch if engine == "batch" else process_data.process_samsung_health
+    start = time.perf_counter()
+    records = sum(len(process_fn(data, data_type)) for data_type, data in datas)
+    
+    return records, _file_bytes(paths), time.perf_counter() - start
+
+def bench_samsung_health_batch(raw_dir, dates):
+    return _bench_samsung_health(raw_dir, "batch")
+
+def bench_samsung_health_legacy(raw_dir, dates):
+    return _bench_samsung_health(raw_dir, "legacy")
+
+def _bench_upload_scan(raw_dir, dates, use_index):
+    
+    from ppg_pipeline import upload_check
+    from ppg_pipeline.upload_index import UploadIndex
+    
+    device_ids = sorted(os.listdir(raw_dir))
+    scanned = [
+        path for device_id in device_ids for spec_dir in ["har_label", "sensor_data", "samsung_health"]
+        for path in glob.glob(os.path.join(raw_dir, device_id, spec_dir, "*"))
+    ]
+    har_label_bytes = _file_bytes(glob.glob(os.path.join(raw_dir, "*", "har_label", "*")))
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index = UploadIndex(raw_dir, os.path.join(tmp_dir, "upload_index.sqlite")) if use_index else None
+        if index is not None:
+            # 처음 index 를 만드는 시간은 제외, 변경 없는 상태에서의 재체크 시간 측정
+            upload_check.catch_missing_data(device_ids, date_set=set(dates), index=index)
+        
+        start = time.perf_counter()
+        upload_check.catch_missing_data(device_ids, date_set=set(dates), index=index)
+        seconds = time.perf_counter() - start
+        
+        if index is not None:
+            index.close()
+    
+    return len(scanned), har_label_bytes, seconds
+
+def bench_upload_scan(raw_dir, dates):
+    return _bench_upload_scan(raw_dir, dates, use_index=False)
+
+def bench_upload_scan_index(raw_dir, dates):
+    return _bench_upload_scan(raw_dir, dates, use_index=True)
+
+def _bench_parquet_write(raw_dir, output_mode):
+    
+    import pyarrow.parquet as pq
+    from ppg_pipeline import process_data
+    
+    paths = _sensor_paths(raw_dir)
+    tables = [process_data.decode_sensor_file(path, file_index, output_mode) for file_index, path in enumerate(paths)]
+    schema = process_data.sensor_output_schema(paths, output_mode)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        save_path = os.path.join(tmp_dir, "sensor_data.parquet")
+        start = time.perf_counter()
+        with pq.ParquetWriter(save_path, schema) as writer:
+            for table in tables:
+                writer.write_table(table, row_group_size=process_data.DEFAULT_ROW_GROUP_SIZE)
+        seconds = time.perf_counter() - start
+        written_bytes = os.path.getsize(save_path)
+    
+    return sum(table.num_rows for table in tables), written_bytes, seconds
+
+def bench_parquet_write_legacy(raw_dir, dates):
+    return _bench_parquet_write(raw_dir, "legacy")
+
+def bench_parquet_write_columnar(raw_dir, dates):
+    return _bench_parquet_write(raw_dir, "columnar")
+
+BENCHMARKS = {
+    "decode_numpy": bench_decode_numpy,
+    "decode_python": bench_decode_python,
+    "structure_scan": bench_structure_scan,
+    "samsung_health_batch": bench_samsung_health_batch,
+    "samsung_health_legacy": bench_samsung_health_legacy,
+    "upload_scan": bench_upload_scan,
+    "upload_scan_index": bench_upload_scan_index,
+    "parquet_write_legacy": bench_parquet_write_legacy,
+    "parquet_write_columnar": bench_parquet_write_columnar,
+}
+
+def _run_in_child(name, raw_dir, dates):
+    # 새 process 에서 실행, 상대 경로(upload_index.sqlite 등)가 기존과 같도록 repo 로 이동
+    
+    os.chdir(REPO_DIR)
+    os.environ["RAW_DATA_DIR"] = raw_dir
+    
+    records, num_bytes, seconds = BENCHMARKS[name](raw_dir, dates)
+    # Linux : KB 단위
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    
+    return records, num_bytes, seconds, peak_rss
+
+def run_benchmarks(raw_dir, dates, names=None, repeat=1):
+    """
+    Returns: {name: {"seconds", "records", "bytes", "records_per_sec", "mb_per_sec", "peak_rss_mb"}}
+    repeat 중 가장 빠른 시간, 가장 큰 peak RSS 사용
+    """
+    
+    # 모듈 import 시점에 RAW_DATA_DIR 을 읽으므로 child 에도 전달
+    os.environ["RAW_DATA_DIR"] = raw_dir
+    context = multiprocessing.get_context("spawn")
+    
+    results = {}
+    for name in names or BENCHMARKS:
+        runs = []
+        for _ in range(repeat):
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                runs.append(executor.submit(_run_in_child, name, raw_dir, dates).result())
+        
+        records, num_bytes, _, _ = runs[0]
+        seconds = min(run[2] for run in runs)
+        peak_rss = max(run[3] for run in runs)
+        results[name] = {
+            "seconds": seconds,
+            "records": records,
+            "bytes": num_bytes,
+            "records_per_sec": records / seconds if seconds > 0 else 0.0,
+            "mb_per_sec": num_bytes / 1024**2 / seconds if seconds > 0 else 0.0,
+            "peak_rss_mb": peak_rss / 1024**2,
+        }
+        print(format_result(name, results[name]))
+    
+    return results
+
+def format_result(name, result):
+    return (
+        f"{name:<24} {result['seconds']:>8.3f}s {result['records_per_sec']:>14,.0f} rec/s "
+        f"{result['mb_per_sec']:>9.1f} MB/s {result['peak_rss_mb']:>9.1f} MB RSS"
+    )
+
+def compare(results, baseline, tolerance=0.1):
+    """
+    baseline 대비 records/sec 가 tolerance 이상 느려지거나 peak RSS 가 tolerance 이상 커지면 regression.
+    Returns: regression 이 있는 benchmark 이름 list
+    """
+    
+    regressions = []
+    print(f"\n{'benchmark':<24} {'rec/s ratio':>12} {'RSS ratio':>10}")
+    for name, result in results.items():
+        base = baseline.get("results", {}).get(name)
+        if base is None or base["records_per_sec"] == 0 or base["peak_rss_mb"] == 0:
+            print(f"{name:<24} {'-':>12} {'-':>10}")
+            continue
+        
+        speed_ratio = result["records_per_sec"] / base["records_per_sec"]
+        rss_ratio = result["peak_rss_mb"] / base["peak_rss_mb"]
+        regressed = speed_ratio < 1 - tolerance or rss_ratio > 1 + tolerance
+        print(f"{name:<24} {speed_ratio:>11.2f}x {rss_ratio:>9.2f}x{'  <- regression' if regressed else ''}")
+        if regressed:
+            regressions.append(name)
+    
+    return regressions
+
+def main():
+    
+    parser = argparse.ArgumentParser(description="synthetic 데이터 benchmark")
+    parser.add_argument("--raw-dir", default=None,
+                        help="benchmark 에 사용할 raw 데이터 (없으면 임시 디렉토리에 synthetic 데이터 생성)")
+    parser.add_argument("--devices", type=int, default=1)
+    parser.add_argument("--start-date", default="2025-08-11")
+    parser.add_argument("--days", type=int, default=1)
+    parser.add_argument("--hours", type=int, nargs="*", default=[10, 11])
+    parser.add_argument("--samsung-health-count", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--benchmarks", nargs="*", default=None, choices=list(BENCHMARKS))
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--save-baseline", default=None, help="결과를 baseline json 으로 저장")
+    parser.add_argument("--baseline", default=None, help="비교할 baseline json")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+    
+    start = datetime.strptime(args.start_date, "%Y-%m-%d")
+    dates = [(start + timedelta(days=day)).strftime("%Y-%m-%d") for day in range(args.days)]
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        raw_dir = args.raw_dir
+        if raw_dir is None:
+            raw_dir = os.path.join(tmp_dir, "raw")
+            summary = synthetic_data.make_raw_tree(
+                raw_dir, [f"synthetic_{index:04d}" for index in range(args.devices)], dates,
+                hours=args.hours, seed=args.seed, samsung_health_count=args.samsung_health_count,
+            )
+            print(f"synthetic sensor_data: {summary['files']} files, {summary['bytes'] / 1024**2:.1f} MB\n")
+        
+        results = run_benchmarks(os.path.abspath(raw_dir), dates, args.benchmarks, args.repeat)
+    
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {key: value for key, value in vars(args).items() if key not in ("save_baseline", "baseline")},
+        "results": results,
+    }
+    
+    if args.save_baseline is not None:
+        with open(args.save_baseline, "w") as f:
+            json.dump(report, f, indent=2)
+    
+    if args.baseline is not None:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+from ppg_pipeline.cli import main
+
+"""
+ppg-pipeline 을 설치하지 않고 repo 에서 실행 (python pipeline_cli.py <command>)
+"""
+
+if __name__ == "__main__":
+    main()
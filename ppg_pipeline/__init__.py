@@ -0,0 +1,5 @@
+"""
+PPG sensor data / Samsung Health data 전처리 package
+- upload_check : 업로드 체크 (01_upload_check.py), process_data : 처리 (02_process_data.py), cli : ppg-pipeline command
+- 나머지 module 은 두 단계가 함께 쓰는 decoding / 저장 / job store / metrics
+"""
@@ -0,0 +1,86 @@
+import sys
+import time
+import argparse
+from importlib import import_module
+
+"""
+전처리 단계를 하나로 묶은 CLI (pip install . 후 ppg-pipeline <command>)
+- check    : ppg_pipeline.upload_check (01_upload_check.py, 업로드 체크, job store 등록)
+- process  : ppg_pipeline.process_data (02_process_data.py, job store claim 또는 --device-dates 목록을 한 process 에서 처리)
+- backfill : ppg_pipeline.process_data --start-date ... (날짜 범위)
+- parquet-bench : ppg_pipeline.parquet_profiles (write profile 별 용량 / 기록 / 읽기 시간 비교)
+- report   : job store 상태 + 마지막 실행 요약 (pandas / pyarrow 를 import 하지 않음)
+- 각 단계 module 은 해당 command 에서만 import 하고, import 에 걸린 시간을 stderr 로 출력
+"""
+
+COMMAND_MODULES = {
+    "check": "ppg_pipeline.upload_check",
+    "process": "ppg_pipeline.process_data",
+    "backfill": "ppg_pipeline.process_data",
+    "parquet-bench": "ppg_pipeline.parquet_profiles",
+}
+
+
+def timed_import(name):
+    
+    start = time.perf_counter()
+    module = import_module(name)
+    print(f"import {name}: {time.perf_counter() - start:.2f}s", file=sys.stderr)
+    
+    return module
+
+def report(args):
+    
+    from . import job_store
+    from . import run_metrics
+    
+    with job_store.open_job_store(args.job_store) as store:
+        counts = store.counts(args.stage, args.date)
+        failed = store.jobs(args.stage, "failed", args.date)
+    
+    title = f"Jobs ({args.stage}{', ' + args.date if args.date else ''})"
+    print(f"{title}: " + ", ".join(f"{status} {count}" for status, count in counts.items()))
+    for device_id, target_date, _, attempts, worker, error in failed:
+        print(f"  failed {target_date} {device_id} attempts={attempts} worker={worker or '-'} {error or ''}".rstrip())
+    
+    for run_name in ["upload_check", "process_data"]:
+        summary = run_metrics.latest_summary(run_name, args.metrics_dir)
+        if summary is not None:
+            print(summary)
+
+def main(argv=None):
+    
+    argv = sys.argv[1:] if argv is None else argv
+    process_start = time.perf_counter()
+    
+    parser = argparse.ArgumentParser(prog="ppg-pipeline", description="PPG / Samsung Health 전처리")
+    parser.add_argument("command", choices=[*COMMAND_MODULES, "report"])
+    command_args = argv[1:]
+    args = parser.parse_args(argv[:1])
+    
+    if args.command == "report":
+        from . import job_store
+        from . import run_metrics
+        
+        report_parser = argparse.ArgumentParser(prog="ppg-pipeline report")
+        report_parser.add_argument("--job-store", default=job_store.JOB_STORE_URL)
+        report_parser.add_argument("--stage", default=job_store.PROCESS_STAGE)
+        report_parser.add_argument("--date", default=None, help="YYYY-MM-DD")
+        report_parser.add_argument("--metrics-dir", default=run_metrics.RUN_METRICS_DIR)
+        report(report_parser.parse_args(command_args))
+        return
+    
+    module = timed_import(COMMAND_MODULES[args.command])
+    command_parser = module.build_parser(argparse.ArgumentParser(prog=f"ppg-pipeline {args.command}"))
+    command_args = command_parser.parse_args(command_args)
+    
+    if args.command == "backfill" and command_args.start_date is None:
+        command_parser.error("backfill 은 --start-date 가 필요합니다")
+    if args.command == "process" and command_args.start_date is not None:
+        command_parser.error("날짜 범위는 backfill 로 실행합니다")
+    
+    print(f"startup: {time.perf_counter() - process_start:.2f}s", file=sys.stderr)
+    module.run(command_args, command_parser)
+
+if __name__ == "__main__":
+    main()
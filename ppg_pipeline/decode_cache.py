@@ -0,0 +1,178 @@
+import os
+import glob
+import shutil
+import hashlib
+import argparse
+import pyarrow as pa
+from dotenv import load_dotenv
+
+"""
+시간 단위 sensor binary decoding 결과 cache
+- <cache_dir>/<device_id>/<basename>.<output_mode>.<key>.arrow (Arrow IPC)
+- key : 원본 경로 / 크기 / mtime (+ 옵션으로 내용 hash), 원본이 바뀌면 key가 달라져 다시 decoding
+- 용량 제한은 LRU(최근 사용 시각) 기준으로 evict
+"""
+load_dotenv()
+
+DECODE_CACHE_DIR = os.getenv("DECODE_CACHE_DIR")
+DECODE_CACHE_MAX_BYTES = int(os.getenv("DECODE_CACHE_MAX_BYTES", 20 * 1024**3))
+
+# decoding 결과 형태가 바뀌면 올려서 기존 cache를 무효화
+CACHE_VERSION = 4
+
+
+def content_hash(file_path, chunk_size=1 << 20):
+    
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    
+    return digest.hexdigest()
+
+def cache_path(cache_dir, sensor_data_path, output_mode, use_hash=False):
+    
+    stat = os.stat(sensor_data_path)
+    key_items = [CACHE_VERSION, os.path.abspath(sensor_data_path), stat.st_size, stat.st_mtime_ns, output_mode]
+    if use_hash:
+        key_items.append(content_hash(sensor_data_path))
+    key = hashlib.sha1("|".join(map(str, key_items)).encode("utf-8")).hexdigest()[:16]
+    
+    device_id = os.path.basename(os.path.dirname(os.path.dirname(os.path.abspath(sensor_data_path))))
+    basename = os.path.basename(sensor_data_path)
+    
+    return os.path.join(cache_dir, device_id, f"{basename}.{output_mode}.{key}.arrow")
+
+def load(path):
+    
+    if not os.path.exists(path):
+        return None
+    
+    try:
+        with pa.memory_map(path, "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+    except (OSError, pa.ArrowInvalid):
+        # 깨진 cache는 지우고 다시 decoding
+        os.remove(path)
+        return None
+    
+    # LRU eviction 기준 갱신
+    os.utime(path)
+    
+    return table
+
+def store(path, table):
+    
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    
+    # 같은 원본 파일의 이전 버전 cache 제거
+    prefix = os.path.basename(path).rsplit(".", 2)[0]
+    for stale_path in glob.glob(os.path.join(glob.escape(os.path.dirname(path)), f"{glob.escape(prefix)}.*.arrow")):
+        if stale_path != path:
+            os.remove(stale_path)
+    
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+def load_or_decode(sensor_data_path, output_mode, decode_fn, cache_dir=DECODE_CACHE_DIR, use_hash=False):
+    """
+    cache에 있으면 재사용, 없으면 decode_fn()으로 decoding 후 저장.
+    Returns: (table, hit)
+    """
+    
+    if cache_dir is None:
+        return decode_fn(), False
+    
+    path = cache_path(cache_dir, sensor_data_path, output_mode, use_hash=use_hash)
+    table = load(path)
+    if table is not None:
+        return table, True
+    
+    table = decode_fn()
+    store(path, table)
+    
+    return table, False
+
+def list_entries(cache_dir):
+    
+    entries = []
+    for path in glob.glob(os.path.join(glob.escape(cache_dir), "*", "*.arrow")):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+    
+    return entries
+
+def evict(cache_dir=DECODE_CACHE_DIR, max_bytes=DECODE_CACHE_MAX_BYTES):
+    # 오래 사용되지 않은 cache부터 max_bytes 이하가 될 때까지 삭제
+    
+    if cache_dir is None or not os.path.exists(cache_dir):
+        return 0
+    
+    entries = sorted(list_entries(cache_dir))
+    total_bytes = sum(size for _, size, _ in entries)
+    
+    removed = 0
+    for _, size, path in entries:
+        if total_bytes <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total_bytes -= size
+        removed += 1
+    
+    return removed
+
+def invalidate(cache_dir=DECODE_CACHE_DIR, device_ids=None, target_date=None):
+    # device / 날짜 단위로 cache 삭제, 둘 다 없으면 전체 삭제
+    
+    if cache_dir is None or not os.path.exists(cache_dir):
+        return 0
+    
+    if device_ids is None and target_date is None:
+        removed = len(list_entries(cache_dir))
+        shutil.rmtree(cache_dir)
+        return removed
+    
+    device_pattern = device_ids if device_ids is not None else ["*"]
+    date_pattern = f"*{target_date}*" if target_date is not None else "*"
+    
+    removed = 0
+    for device_id in device_pattern:
+        for path in glob.glob(os.path.join(glob.escape(cache_dir), device_id, f"{date_pattern}.arrow")):
+            os.remove(path)
+            removed += 1
+    
+    return removed
+
+def main():
+    
+    parser = argparse.ArgumentParser(description="sensor_data decoding cache 관리")
+    parser.add_argument("command", choices=["stats", "evict", "invalidate"])
+    parser.add_argument("--cache-dir", default=DECODE_CACHE_DIR)
+    parser.add_argument("--max-bytes", type=int, default=DECODE_CACHE_MAX_BYTES)
+    parser.add_argument("--device-ids", nargs="*", default=None)
+    parser.add_argument("--date", default=None, help="YYYY-MM-DD")
+    args = parser.parse_args()
+    
+    if args.cache_dir is None:
+        parser.error("--cache-dir 또는 DECODE_CACHE_DIR 가 필요합니다")
+    
+    if args.command == "stats":
+        entries = list_entries(args.cache_dir) if os.path.exists(args.cache_dir) else []
+        total_bytes = sum(size for _, size, _ in entries)
+        print(f"entries: {len(entries)}, size: {total_bytes / 1024**2:.1f} MB / {args.max_bytes / 1024**2:.1f} MB")
+    elif args.command == "evict":
+        print(f"evicted: {evict(args.cache_dir, args.max_bytes)}")
+    else:
+        print(f"invalidated: {invalidate(args.cache_dir, args.device_ids, args.date)}")
+
+if __name__ == "__main__":
+    main()
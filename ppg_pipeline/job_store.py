@@ -0,0 +1,359 @@
+import os
+import time
+import socket
+import sqlite3
+import argparse
+import threading
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+"""
+(device, date, stage) 단위 작업 상태 저장소
+- 01_upload_check.py 가 유효한 (device, date) 를 pending 으로 등록, 02_process_data.py worker 들이 claim 하여 처리
+- 상태 : pending -> claimed(worker, lease) -> done | failed
+    - lease 가 만료된 claimed (worker 중단) 와 retry 시간이 지난 failed 는 attempts 가 max_attempts 미만이면 다시 claim
+- claim 은 후보를 읽은 뒤 상태 조건을 건 UPDATE 로 하나씩 가져가므로 여러 worker 가 같은 DB 를 동시에 사용 가능
+- 기본은 SQLite(WAL) 로 같은 host 의 process 끼리만 공유 가능, 여러 host 에서 사용하려면 JOB_STORE_URL 을 postgresql:// 로 (psycopg 필요)
+    - WAL 은 shared memory 와 file lock 을 사용하므로 network mount(NFS / SMB 등) 위의 SQLite 파일은 열지 않음
+"""
+load_dotenv()
+
+JOB_STORE_URL = os.getenv("JOB_STORE_URL", "job_store.sqlite")
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", 30 * 60))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+JOB_RETRY_SECONDS = int(os.getenv("JOB_RETRY_SECONDS", 10 * 60))
+
+PROCESS_STAGE = "process_data"
+# claim 을 (device, date) 목록으로 제한할 때 한 query 에 넣는 항목 수 (SQLite parameter 수 제한)
+CLAIM_KEY_CHUNK = 500
+# SQLite job store 를 둘 수 없는 network filesystem (/proc/mounts 의 fstype)
+NETWORK_FS_TYPES = {"nfs", "nfs4", "cifs", "smb3", "smbfs", "fuse.sshfs", "ceph", "glusterfs", "lustre", "9p", "afs"}
+STATUSES = ["pending", "claimed", "done", "failed"]
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS jobs (
+        device_id TEXT NOT NULL,
+        date TEXT NOT NULL,
+        stage TEXT NOT NULL,
+        status TEXT NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        worker TEXT,
+        lease_until DOUBLE PRECISION,
+        error TEXT,
+        updated_at DOUBLE PRECISION NOT NULL,
+        PRIMARY KEY (device_id, date, stage)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS jobs_status ON jobs (stage, status, date)",
+]
+# claim 가능한 상태 (lease 만료 / retry 대기 종료), parameter : now, max_attempts, now - retry_seconds
+CLAIMABLE = (
+    "(status = 'pending'"
+    " OR (status = 'claimed' AND lease_until < {p} AND attempts < {p})"
+    " OR (status = 'failed' AND attempts < {p} AND updated_at < {p}))"
+)
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def mount_fstype(path):
+    # path 가 속한 mount 의 filesystem type (/proc/mounts 가 없으면 None)
+    
+    try:
+        with open("/proc/mounts", "r") as f:
+            mounts = [line.split()[1:3] for line in f]
+    except OSError:
+        return None
+    
+    path = os.path.realpath(path)
+    fstype, matched = None, ""
+    for mount_point, mount_type in mounts:
+        mount_point = mount_point.replace("\\040", " ")
+        if (path == mount_point or path.startswith(mount_point.rstrip("/") + "/")) and len(mount_point) > len(matched):
+            fstype, matched = mount_type, mount_point
+    
+    return fstype
+
+class JobStore:
+    """
+    DB-API connection 을 사용하는 공통 구현, backend 는 connect() 와 placeholder 만 다름.
+    여러 thread(lease 연장)에서 같이 사용하므로 DB 접근은 lock 안에서.
+    """
+    
+    placeholder = "?"
+    
+    def __init__(self, url):
+        
+        self.url = url
+        self.conn = self.connect()
+        self.lock = threading.RLock()
+        with self.lock:
+            for statement in SCHEMA:
+                self.conn.execute(statement)
+            self.conn.commit()
+    
+    def connect(self):
+        raise NotImplementedError
+    
+    def close(self):
+        self.conn.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def _sql(self, query):
+        return query.replace("{p}", self.placeholder)
+    
+    def _execute(self, query, params=()):
+        # 한 statement 를 실행하고 commit, 바뀐 row 수 반환
+        
+        with self.lock:
+            try:
+                rowcount = self.conn.execute(self._sql(query), params).rowcount
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+        
+        return rowcount
+    
+    def _fetchall(self, query, params=()):
+        
+        with self.lock:
+            rows = self.conn.execute(self._sql(query), params).fetchall()
+            self.conn.commit()
+        
+        return rows
+    
+    def enqueue(self, device_dates, stage=PROCESS_STAGE, force=False):
+        """
+        (device_id, date) 들을 pending 으로 등록. 이미 있는 항목은 그대로 두고 (done 은 다시 처리하지 않음),
+        force 이면 상태와 attempts 를 초기화. Returns: 새로 pending 이 된 항목 수
+        """
+        
+        conflict = (
+            "DO UPDATE SET status = 'pending', attempts = 0, worker = NULL, lease_until = NULL, error = NULL,"
+            " updated_at = excluded.updated_at"
+            if force else "DO NOTHING"
+        )
+        query = (
+            "INSERT INTO jobs (device_id, date, stage, status, updated_at) VALUES ({p}, {p}, {p}, 'pending', {p})"
+            f" ON CONFLICT (device_id, date, stage) {conflict}"
+        )
+        
+        now = time.time()
+        return sum(self._execute(query, (device_id, target_date, stage, now)) for device_id, target_date in device_dates)
+    
+    def claim(self, stage=PROCESS_STAGE, worker=None, limit=1, lease_seconds=JOB_LEASE_SECONDS,
+              max_attempts=JOB_MAX_ATTEMPTS, retry_seconds=JOB_RETRY_SECONDS, device_dates=None):
+        """
+        claim 가능한 항목을 날짜 / device 순으로 최대 limit 개 가져감 (다른 worker 가 먼저 가져간 항목은 건너뜀).
+        device_dates 를 주면 그 (device_id, date) 중에서만 가져감 (backfill 등 지정한 목록만 처리할 때).
+        lease 가 만료된 채 attempts 를 모두 쓴 항목은 failed 로 바꿈.
+        Returns: [(device_id, date), ...]
+        """
+        
+        worker = worker or worker_name()
+        now = time.time()
+        self._execute(
+            "UPDATE jobs SET status = 'failed', error = 'lease expired', updated_at = {p}"
+            " WHERE stage = {p} AND status = 'claimed' AND lease_until < {p} AND attempts >= {p}",
+            (now, stage, now, max_attempts),
+        )
+        
+        claimable_params = (now, max_attempts, max_attempts, now - retry_seconds)
+        if device_dates is None:
+            key_chunks = [None]
+        else:
+            keys = sorted(set(device_dates), key=lambda key: (key[1], key[0]))
+            key_chunks = [keys[i:i + CLAIM_KEY_CHUNK] for i in range(0, len(keys), CLAIM_KEY_CHUNK)]
+        
+        candidates = []
+        for keys in key_chunks:
+            query = f"SELECT device_id, date FROM jobs WHERE stage = {{p}} AND {CLAIMABLE}"
+            params = (stage, *claimable_params)
+            if keys is not None:
+                query += " AND (device_id, date) IN (VALUES " + ", ".join(["({p}, {p})"] * len(keys)) + ")"
+                params += tuple(value for key in keys for value in key)
+            candidates += self._fetchall(query + " ORDER BY date, device_id LIMIT {p}", (*params, limit - len(candidates)))
+            if len(candidates) >= limit:
+                break
+        
+        claimed = []
+        for device_id, target_date in candidates:
+            rowcount = self._execute(
+                "UPDATE jobs SET status = 'claimed', worker = {p}, lease_until = {p}, attempts = attempts + 1,"
+                " error = NULL, updated_at = {p}"
+                f" WHERE device_id = {{p}} AND date = {{p}} AND stage = {{p}} AND {CLAIMABLE}",
+                (worker, now + lease_seconds, now, device_id, target_date, stage, *claimable_params),
+            )
+            if rowcount == 1:
+                claimed.append((device_id, target_date))
+        
+        return claimed
+    
+    def _finish(self, device_id, target_date, stage, worker, status, error=None):
+        # 아직 이 worker 의 claim 인 경우에만 상태 변경, lease 를 뺏긴 경우 False
+        
+        return self._execute(
+            "UPDATE jobs SET status = {p}, error = {p}, lease_until = NULL, updated_at = {p}"
+            " WHERE device_id = {p} AND date = {p} AND stage = {p} AND status = 'claimed' AND worker = {p}",
+            (status, error, time.time(), device_id, target_date, stage, worker),
+        ) == 1
+    
+    def complete(self, device_id, target_date, stage=PROCESS_STAGE, worker=None):
+        return self._finish(device_id, target_date, stage, worker or worker_name(), "done")
+    
+    def fail(self, device_id, target_date, error, stage=PROCESS_STAGE, worker=None):
+        return self._finish(device_id, target_date, stage, worker or worker_name(), "failed", error)
+    
+    def release(self, device_id, target_date, stage=PROCESS_STAGE, worker=None):
+        # 처리하지 못하고 중단하는 항목을 바로 pending 으로 (attempts 는 유지)
+        return self._finish(device_id, target_date, stage, worker or worker_name(), "pending")
+    
+    def renew(self, device_dates, stage=PROCESS_STAGE, worker=None, lease_seconds=JOB_LEASE_SECONDS):
+        
+        worker = worker or worker_name()
+        lease_until = time.time() + lease_seconds
+        for device_id, target_date in device_dates:
+            self._execute(
+                "UPDATE jobs SET lease_until = {p}"
+                " WHERE device_id = {p} AND date = {p} AND stage = {p} AND status = 'claimed' AND worker = {p}",
+                (lease_until, device_id, target_date, stage, worker),
+            )
+    
+    @contextmanager
+    def keep_alive(self, device_dates, stage=PROCESS_STAGE, worker=None, lease_seconds=JOB_LEASE_SECONDS):
+        # 처리하는 동안 lease_seconds / 3 마다 lease 연장
+        
+        stop = threading.Event()
+        
+        def _renew():
+            while not stop.wait(lease_seconds / 3):
+                self.renew(device_dates, stage, worker, lease_seconds)
+        
+        thread = threading.Thread(target=_renew, name="job_lease", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+    
+    def retry(self, stage=PROCESS_STAGE, target_date=None):
+        # failed 항목을 attempts 를 초기화하여 pending 으로
+        
+        query = "UPDATE jobs SET status = 'pending', attempts = 0, error = NULL, updated_at = {p} WHERE stage = {p} AND status = 'failed'"
+        params = (time.time(), stage)
+        if target_date is not None:
+            query += " AND date = {p}"
+            params += (target_date,)
+        
+        return self._execute(query, params)
+    
+    def counts(self, stage=PROCESS_STAGE, target_date=None):
+        # {status: 항목 수}
+        
+        query = "SELECT status, COUNT(*) FROM jobs WHERE stage = {p}"
+        params = (stage,)
+        if target_date is not None:
+            query += " AND date = {p}"
+            params += (target_date,)
+        
+        counts = dict.fromkeys(STATUSES, 0)
+        counts.update(self._fetchall(query + " GROUP BY status", params))
+        
+        return counts
+    
+    def jobs(self, stage=PROCESS_STAGE, status=None, target_date=None):
+        # [(device_id, date, status, attempts, worker, error), ...]
+        
+        query = "SELECT device_id, date, status, attempts, worker, error FROM jobs WHERE stage = {p}"
+        params = (stage,)
+        if status is not None:
+            query += " AND status = {p}"
+            params += (status,)
+        if target_date is not None:
+            query += " AND date = {p}"
+            params += (target_date,)
+        
+        return self._fetchall(query + " ORDER BY date, device_id", params)
+
+class SQLiteJobStore(JobStore):
+    
+    def connect(self):
+        
+        path = self.url.removeprefix("sqlite:///")
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        
+        fstype = mount_fstype(os.path.dirname(os.path.abspath(path)))
+        if fstype in NETWORK_FS_TYPES:
+            raise RuntimeError(
+                f"SQLite job store 는 network mount({fstype}) 에서 사용할 수 없습니다: {path} "
+                "(여러 host 에서 사용하려면 JOB_STORE_URL 을 postgresql:// 로 지정)"
+            )
+        
+        # 여러 process 가 같은 파일을 사용, 쓰기 lock 은 busy timeout 동안 기다림
+        conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        
+        return conn
+
+class PostgresJobStore(JobStore):
+    
+    placeholder = "%s"
+    
+    def connect(self):
+        
+        try:
+            import psycopg
+        except ImportError as e:
+            raise ImportError("postgresql job store 는 psycopg 가 필요합니다 (pip install psycopg)") from e
+        
+        return psycopg.connect(self.url)
+
+def open_job_store(url=JOB_STORE_URL):
+    # postgresql://... -> PostgresJobStore, 그 외 (sqlite:///path 또는 파일 경로) -> SQLiteJobStore
+    
+    if url.startswith(("postgresql://", "postgres://")):
+        return PostgresJobStore(url)
+    
+    return SQLiteJobStore(url)
+
+def main():
+    
+    parser = argparse.ArgumentParser(description="작업 상태 저장소 조회 / 관리")
+    parser.add_argument("command", choices=["status", "list", "retry", "enqueue"])
+    parser.add_argument("--job-store", default=JOB_STORE_URL,
+                        help="SQLite 파일 경로 또는 postgresql:// URL (JOB_STORE_URL)")
+    parser.add_argument("--stage", default=PROCESS_STAGE)
+    parser.add_argument("--date", default=None, help="YYYY-MM-DD")
+    parser.add_argument("--status", choices=STATUSES, default=None, help="list 대상 상태")
+    parser.add_argument("--device-ids", nargs="*", default=None, help="enqueue 할 device (--date 필요)")
+    parser.add_argument("--force", action="store_true", help="enqueue 시 done / failed 항목도 다시 pending 으로")
+    args = parser.parse_args()
+    
+    with open_job_store(args.job_store) as store:
+        if args.command == "status":
+            counts = store.counts(args.stage, args.date)
+            print(", ".join(f"{status}: {count}" for status, count in counts.items()))
+        elif args.command == "list":
+            for device_id, target_date, status, attempts, worker, error in store.jobs(args.stage, args.status, args.date):
+                print(f"{target_date} {device_id} {status} attempts={attempts} worker={worker or '-'} {error or ''}".rstrip())
+        elif args.command == "retry":
+            print(f"retry: {store.retry(args.stage, args.date)}")
+        else:
+            if args.date is None or not args.device_ids:
+                parser.error("enqueue 는 --date 와 --device-ids 가 필요합니다")
+            added = store.enqueue([(device_id, args.date) for device_id in args.device_ids], args.stage, force=args.force)
+            print(f"enqueued: {added}")
+
+if __name__ == "__main__":
+    main()
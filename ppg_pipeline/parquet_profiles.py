@@ -0,0 +1,236 @@
+import os
+import glob
+import time
+import argparse
+import tempfile
+import pyarrow as pa
+import pyarrow.parquet as pq
+from dotenv import load_dotenv
+
+"""
+parquet 기록 profile (codec / level, float 컬럼 BYTE_STREAM_SPLIT, timestamp delta encoding, 범주형 문자열 dictionary,
+row group / page 크기)
+- default  : 기존과 같은 pyarrow 기본값 (snappy, 모든 컬럼 dictionary)
+- fast     : lz4 + 범주형 문자열만 dictionary (기록 속도 우선)
+- balanced : zstd(3) + BYTE_STREAM_SPLIT / delta + 범주형 문자열만 dictionary
+- archival : zstd(9) + BYTE_STREAM_SPLIT / delta, 큰 row group (용량 우선)
+- benchmark : 하루 처리 결과를 profile 마다 다시 기록하여 용량 / 기록 시간 / 읽기 시간 비교
+"""
+load_dotenv()
+
+PROCESSED_DATA_DIR = os.getenv("PROCESSED_DATA_DIR")
+PARQUET_WRITE_PROFILE = os.getenv("PARQUET_WRITE_PROFILE", "default")
+
+# sensor_data parquet 의 row group 당 최대 row 수
+DEFAULT_ROW_GROUP_SIZE = 256 * 1024
+
+WRITE_PROFILES = {
+    "default": {
+        "compression": "snappy",
+        "compression_level": None,
+        "byte_stream_split": False,
+        "delta_timestamps": False,
+        "dictionary": "all",
+        "row_group_size": DEFAULT_ROW_GROUP_SIZE,
+        "data_page_size": None,
+    },
+    "fast": {
+        "compression": "lz4",
+        "compression_level": None,
+        "byte_stream_split": False,
+        "delta_timestamps": False,
+        "dictionary": "categorical",
+        "row_group_size": DEFAULT_ROW_GROUP_SIZE,
+        "data_page_size": 1 << 20,
+    },
+    "balanced": {
+        "compression": "zstd",
+        "compression_level": 3,
+        "byte_stream_split": True,
+        "delta_timestamps": True,
+        "dictionary": "categorical",
+        "row_group_size": DEFAULT_ROW_GROUP_SIZE,
+        "data_page_size": 1 << 20,
+    },
+    "archival": {
+        "compression": "zstd",
+        "compression_level": 9,
+        "byte_stream_split": True,
+        "delta_timestamps": True,
+        "dictionary": "categorical",
+        "row_group_size": 1024 * 1024,
+        "data_page_size": 1 << 20,
+    },
+}
+# 값 종류가 적은 문자열 컬럼 (dictionary="categorical" 이면 이 컬럼만 dictionary encoding)
+CATEGORICAL_COLUMNS = {"sensor_type", "category", "unit", "device_id", "file_path", "data_type"}
+# timestamp 타입이 아니어도 증가하는 정수 컬럼 (legacy sensor_data 의 epoch ms 등)
+DELTA_COLUMNS = {"timestamp", "sequence", "record_id"}
+# benchmark 대상 (PROCESSED_DATA_DIR/<device_id>/<data_kind>/<date>.parquet, data_kind 는 glob pattern 가능)
+# nested samsung_health 의 detail 은 category 별 디렉토리 (samsung_health_detail/<category>/<date>.parquet)
+BENCHMARK_DATA_KINDS = ["sensor_data", "samsung_health", "samsung_health_detail/*", "samsung_health_series"]
+
+
+def _leaf_columns(field, prefix=""):
+    # parquet column path(list 는 <name>.list.element), 이름, 타입
+    
+    path = f"{prefix}{field.name}"
+    if pa.types.is_list(field.type) or pa.types.is_large_list(field.type):
+        yield from _leaf_columns(field.type.value_field.with_name("element"), f"{path}.list.")
+    elif pa.types.is_struct(field.type):
+        for child in field.type:
+            yield from _leaf_columns(child, f"{path}.")
+    elif pa.types.is_map(field.type):
+        # map 은 encoding 을 바꾸지 않음
+        return
+    else:
+        yield path, field.name, field.type
+
+def write_options(schema, profile=PARQUET_WRITE_PROFILE):
+    """
+    pq.ParquetWriter / pq.write_table 에 넘길 옵션 (row_group_size 는 write_table 인자라 제외, profile_row_group_size 참고).
+    BYTE_STREAM_SPLIT / delta 를 쓰는 컬럼은 dictionary encoding 에서 제외.
+    """
+    
+    settings = WRITE_PROFILES[profile]
+    options = {"compression": settings["compression"]}
+    if settings["compression_level"] is not None:
+        options["compression_level"] = settings["compression_level"]
+    if settings["data_page_size"] is not None:
+        options["data_page_size"] = settings["data_page_size"]
+    if settings["dictionary"] == "all":
+        return options
+    
+    column_encoding = {}
+    dictionary_columns = []
+    for field in schema:
+        for path, name, column_type in _leaf_columns(field):
+            if pa.types.is_dictionary(column_type):
+                column_type = column_type.value_type
+            if settings["byte_stream_split"] and pa.types.is_floating(column_type):
+                column_encoding[path] = "BYTE_STREAM_SPLIT"
+            elif settings["delta_timestamps"] and (
+                pa.types.is_timestamp(column_type)
+                or (name in DELTA_COLUMNS and pa.types.is_integer(column_type) and column_type.bit_width >= 32)
+            ):
+                column_encoding[path] = "DELTA_BINARY_PACKED"
+            elif name in CATEGORICAL_COLUMNS and (pa.types.is_string(column_type) or pa.types.is_large_string(column_type)):
+                dictionary_columns.append(path)
+    
+    options["use_dictionary"] = dictionary_columns
+    if column_encoding:
+        options["column_encoding"] = column_encoding
+    
+    return options
+
+def profile_row_group_size(profile=PARQUET_WRITE_PROFILE):
+    return WRITE_PROFILES[profile]["row_group_size"]
+
+def write_table(table, path, profile=PARQUET_WRITE_PROFILE, **kwargs):
+    # profile 을 적용한 pq.write_table (kwargs 는 write_statistics 등 추가 옵션)
+    
+    kwargs.setdefault("row_group_size", profile_row_group_size(profile))
+    pq.write_table(table, path, **write_options(table.schema, profile), **kwargs)
+
+def staging_path(path):
+    # path 와 같은 디렉토리의 임시 경로 (os.replace 로 교체, "." 로 시작하여 pyarrow dataset 조회에서 제외됨)
+    
+    directory, basename = os.path.split(path)
+    os.makedirs(directory, exist_ok=True)
+    
+    return os.path.join(directory, f".{basename}.{os.getpid()}.tmp")
+
+def commit_staged(staged):
+    # staged: {최종 경로: 임시 경로}, 모든 기록이 끝난 뒤 한 번에 최종 경로로 교체
+    
+    for path, tmp_path in staged.items():
+        os.replace(tmp_path, path)
+
+def discard_staged(staged):
+    # 이번 실행이 쓴 임시 파일만 제거 (이전 실행의 결과는 그대로 둠)
+    
+    for tmp_path in staged.values():
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def benchmark_profiles(paths, profiles=None, repeat=1):
+    """
+    parquet 파일들을 읽어 profile 마다 다시 기록.
+    Returns: {profile: {"bytes", "write_seconds", "read_seconds"}} (repeat 중 가장 빠른 시간, 읽기는 OS cache 가 찬 상태)
+    """
+    
+    tables = [pq.read_table(path) for path in paths]
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for profile in profiles or WRITE_PROFILES:
+            write_seconds, read_seconds = [], []
+            for _ in range(repeat):
+                save_paths = [os.path.join(tmp_dir, f"{profile}_{index}.parquet") for index in range(len(tables))]
+                
+                start = time.perf_counter()
+                for table, save_path in zip(tables, save_paths):
+                    write_table(table, save_path, profile)
+                write_seconds.append(time.perf_counter() - start)
+                
+                start = time.perf_counter()
+                for save_path in save_paths:
+                    pq.read_table(save_path)
+                read_seconds.append(time.perf_counter() - start)
+            
+            results[profile] = {
+                "bytes": sum(os.path.getsize(save_path) for save_path in save_paths),
+                "write_seconds": min(write_seconds),
+                "read_seconds": min(read_seconds),
+            }
+    
+    return results
+
+def format_results(results, rows):
+    
+    # ratio : default profile(없으면 첫 profile) 대비 용량
+    lines = [f"{'profile':<10} {'size(MB)':>10} {'ratio':>7} {'write(s)':>9} {'read(s)':>9} {'write rows/s':>14}"]
+    base = results.get("default") or next(iter(results.values()))
+    for profile, result in results.items():
+        rows_per_sec = rows / result["write_seconds"] if result["write_seconds"] > 0 else 0.0
+        lines.append(
+            f"{profile:<10} {result['bytes'] / 1024**2:>10.2f} {result['bytes'] / base['bytes']:>6.2f}x "
+            f"{result['write_seconds']:>9.3f} {result['read_seconds']:>9.3f} {rows_per_sec:>14,.0f}"
+        )
+    
+    return "\n".join(lines)
+
+def build_parser(parser=None):
+    
+    parser = parser or argparse.ArgumentParser(description="parquet write profile 별 용량 / 기록 / 읽기 시간 비교")
+    parser.add_argument("--device-ids", nargs="+", required=True)
+    parser.add_argument("--date", required=True, help="YYYY-MM-DD")
+    parser.add_argument("--data-kinds", nargs="*", default=BENCHMARK_DATA_KINDS,
+                        help="비교할 처리 결과 종류 (PROCESSED_DATA_DIR/<device_id>/<data_kind>/<date>.parquet, glob pattern 가능)")
+    parser.add_argument("--profiles", nargs="*", default=None, choices=list(WRITE_PROFILES))
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--processed-dir", default=PROCESSED_DATA_DIR)
+    
+    return parser
+
+def run(args, parser=None):
+    
+    # 건너뛴 종류도 이유와 함께 출력
+    for data_kind in args.data_kinds:
+        paths = sorted(
+            path for device_id in args.device_ids
+            for path in glob.glob(os.path.join(glob.escape(os.path.join(args.processed_dir, device_id)), data_kind, f"{args.date}.parquet"))
+        )
+        if not paths:
+            print(f"\n{data_kind}: skipped (no {data_kind}/{args.date}.parquet)")
+            continue
+        
+        rows = sum(pq.ParquetFile(path).metadata.num_rows for path in paths)
+        if rows == 0:
+            print(f"\n{data_kind}: skipped ({len(paths)} files, 0 rows)")
+            continue
+        results = benchmark_profiles(paths, args.profiles, args.repeat)
+        print(f"\n{data_kind}: {len(paths)} files, {rows:,} rows")
+        print(format_results(results, rows))
+
+if __name__ == "__main__":
+    run(build_parser().parse_args())
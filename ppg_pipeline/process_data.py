@@ -0,0 +1,1006 @@
+import os
+import json
+import time
+import argparse
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from glob import glob
+from tqdm import tqdm
+from typing import List
+from functools import partial, lru_cache
+from contextlib import nullcontext
+from itertools import groupby
+from collections import deque, defaultdict
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from dotenv import load_dotenv
+
+from .utils import (
+    decode_binary, blocks_to_legacy_table, blocks_to_table, with_file_paths, save_error_info,
+    sensor_table_schema, legacy_sensor_schema, utc2kst, parse_iso_duration,
+    utc2kst_batch, parse_iso_duration_batch,
+)
+from . import decode_cache
+from . import job_store
+from . import run_metrics
+from . import sensor_dataset
+from . import sensor_rollup
+from . import sensor_quality
+from . import parquet_profiles
+from .parquet_profiles import DEFAULT_ROW_GROUP_SIZE
+from .read_ahead import ReadAhead, READ_AHEAD_FILES, READ_AHEAD_MAX_BYTES, READ_AHEAD_THREADS
+from . import upload_check
+from .config import DATA_UNITS, VALUE_KEY, VALUE_STR_KEY, FUNCTION_MAP
+
+"""
+처리할 데이터
+1. sensor_data
+2. samsung_health_data
+"""
+load_dotenv()
+
+RAW_DATA_DIR = os.getenv("RAW_DATA_DIR")
+PROCESSED_DATA_DIR = os.getenv("PROCESSED_DATA_DIR")
+# PROCESSED_DATA_DIR = "/home/ai04/workspace/ppg_process/test"    # TODO: for debugging
+
+# 삼성헬스 어플리케이션에서 제공하는 사전 운동 타입
+# https://developer.samsung.com/health/android/data/api-reference/EXERCISE_TYPE.html
+EXERCISE_TYPE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "exercise_type.json")
+
+REMOVE_KEYS = ["uid", "appId", "deviceId", "startTime", "endTime"]
+
+# nested 출력에서 long-format 으로 펼치는 항목, timestamp 로 변환하는 항목
+SERIES_KEY = "seriesData"
+SERIES_TIME_KEYS = ["startTime", "endTime"]
+
+# json.dumps(..., ensure_ascii=False) 와 같은 결과, 호출마다 encoder 를 새로 만들지 않음
+encode_json = json.JSONEncoder(ensure_ascii=False).encode
+# decoding 결과 table 의 schema metadata 에 저장하는 error_info (decode cache 에 같이 저장됨)
+ERROR_INFO_METADATA_KEY = b"error_info"
+
+
+@lru_cache(maxsize=None)
+def load_exercise_map():
+    # 처음 사용할 때 한번만 읽음 (cwd 와 관계없이 repo 의 exercise_type.json)
+    
+    with open(EXERCISE_TYPE_PATH, "r") as f:
+        return json.load(f)
+
+def list_sensor_data_paths(device_id, target_date):
+    
+    target_device_dir = os.path.join(RAW_DATA_DIR, device_id)
+    sensor_data_dir = os.path.join(target_device_dir, "sensor_data")
+    # sensor_data_dir = "samsung_health/2025-08-12"  # TODO: for debug
+    # sensor_data_dir = "samsung_health/debug"  # TODO: for debug
+    
+    target_sensor_data_paths = glob(os.path.join(sensor_data_dir, f"*{target_date}*"))
+    
+    return sorted(target_sensor_data_paths)
+
+def is_sensor_data_path(path):
+    # list_sensor_data_paths 와 같은 기준 (<device_id>/sensor_data/ 아래 파일)
+    return os.path.basename(os.path.dirname(path)) == "sensor_data"
+
+def sensor_output_schema(sensor_data_paths, output_mode="legacy"):
+    
+    if output_mode == "columnar":
+        return with_file_paths(sensor_table_schema().empty_table(), sensor_data_paths).schema
+    
+    return legacy_sensor_schema()
+
+def with_error_info(table, error_info):
+    # decoding 에러(error_info)를 schema metadata 에 기록, cache hit 에도 에러 기록 / metrics 를 다시 남기기 위함
+    
+    if error_info is None:
+        return table
+    metadata = dict(table.schema.metadata or {})
+    metadata[ERROR_INFO_METADATA_KEY] = json.dumps(error_info, ensure_ascii=False).encode("utf-8")
+    
+    return table.replace_schema_metadata(metadata)
+
+def table_error_info(table):
+    
+    value = (table.schema.metadata or {}).get(ERROR_INFO_METADATA_KEY)
+    
+    return json.loads(value) if value is not None else None
+
+def record_decode_errors(metrics, error_info, salvage=False):
+    # decoding 중단 원인을 rejected 에 기록
+    # salvage 이면 건너뛴 구간마다 원인을 기록하고, 건너뛴 byte / 제외한 record 수도 기록
+    
+    for span_info in error_info.get("skipped_spans") if salvage else [error_info]:
+        reason = span_info.get("details", {}).get("at", "unknown")
+        metrics["rejected"][reason] = metrics["rejected"].get(reason, 0) + 1
+    if salvage:
+        metrics["skipped_bytes"] += error_info["skipped_bytes"]
+        for reason, key in [("salvage_skipped", "estimated_skipped_records"), ("salvage_rejected", "rejected_records")]:
+            metrics["rejected"][reason] = metrics["rejected"].get(reason, 0) + error_info[key]
+
+def _decode_sensor_file(sensor_data_path, output_mode="legacy", metrics=None, salvage=False, data=None):
+    # 결과 table 의 schema metadata 에 시간 / sensor type 별 품질 (sensor_quality.py 참고) + decoding 에러 기록
+    
+    blocks, error_info = decode_binary(sensor_data_path, salvage=salvage, data=data)
+    file_size = os.path.getsize(sensor_data_path) if data is None else len(data)
+    quality = sensor_quality.file_quality(blocks, error_info, sensor_data_path, file_size)
+    if metrics is not None:
+        metrics["bytes_read"] += file_size
+    
+    if output_mode == "columnar":
+        table = blocks_to_table(blocks)
+    else:
+        table = blocks_to_legacy_table(sensor_data_path, blocks)
+    
+    return with_error_info(sensor_quality.with_quality(table, quality), error_info)
+
+def decode_cache_mode(output_mode, salvage=False):
+    # salvage 결과는 기존 결과와 다르므로 cache 를 따로 사용
+    return f"{output_mode}-salvage" if salvage else output_mode
+
+def is_decode_cached(cache_dir, output_mode, cache_hash, salvage, sensor_data_path):
+    # read-ahead 에서 cache 가 있는 파일은 미리 읽지 않음 (내용 hash 를 쓰면 확인에 파일을 읽어야 하므로 제외)
+    
+    if cache_dir is None or cache_hash or not is_sensor_data_path(sensor_data_path):
+        return False
+    
+    return os.path.exists(decode_cache.cache_path(cache_dir, sensor_data_path, decode_cache_mode(output_mode, salvage)))
+
+def decode_sensor_file(sensor_data_path, file_index, output_mode="legacy", cache_dir=None, cache_hash=False,
+                       salvage=False, reader=None):
+    # cache_dir 가 있으면 원본 경로/크기/mtime 이 같은 파일은 decoding 하지 않고 cache 재사용
+    # reader(read_ahead.ReadAhead)가 있으면 미리 읽어둔 내용을 decoding
+    
+    device_id = os.path.basename(os.path.dirname(os.path.dirname(os.path.abspath(sensor_data_path))))
+    with run_metrics.stage("decode", device_id, file_path=sensor_data_path, profile=True) as metrics:
+        data = reader.take(sensor_data_path) if reader is not None else None
+        inner_table, hit = decode_cache.load_or_decode(
+            sensor_data_path, decode_cache_mode(output_mode, salvage),
+            partial(_decode_sensor_file, sensor_data_path, output_mode, metrics, salvage, data),
+            cache_dir=cache_dir, use_hash=cache_hash,
+        )
+        metrics["records"] += inner_table.num_rows
+        metrics["cache_hit"] = hit
+        
+        # cache hit 이면 decoding 하지 않으므로 저장해둔 에러를 다시 기록 (재실행에도 corrupt 파일이 보이도록)
+        error_info = table_error_info(inner_table)
+        if error_info is not None:
+            record_decode_errors(metrics, error_info, salvage)
+            if hit:
+                save_error_info(sensor_data_path, error_info)
+    
+    if output_mode == "columnar":
+        file_index_column = pa.array(np.full(inner_table.num_rows, file_index, dtype=np.int16))
+        inner_table = inner_table.set_column(inner_table.schema.get_field_index("file_index"), "file_index", file_index_column)
+    
+    return inner_table
+
+def process_sensor_data(device_id, target_date, save_path, output_mode="legacy", row_group_size=DEFAULT_ROW_GROUP_SIZE,
+                        cache_dir=None, cache_hash=False, salvage=False, read_ahead=READ_AHEAD_FILES,
+                        write_profile=parquet_profiles.PARQUET_WRITE_PROFILE):
+    """
+    시간 단위 binary를 하나씩 decoding 하여 열려있는 ParquetWriter에 row group으로 바로 기록.
+    메모리에는 한 파일 분량만 유지됨 (read_ahead > 0 이면 미리 읽어둔 파일 최대 read_ahead 개 추가).
+    
+    output_mode
+        legacy   : file_path / sequence / sensor_type / data(list) / collected_time / timestamp
+        columnar : sensor type 별 float32 컬럼 (utils.sensor_table_schema 참고)
+    
+    Returns: 기록한 row 수
+    """
+    
+    target_sensor_data_paths = list_sensor_data_paths(device_id, target_date)
+    schema = sensor_output_schema(target_sensor_data_paths, output_mode)
+    
+    num_rows = 0
+    progress = tqdm(target_sensor_data_paths)
+    
+    reader = None
+    if read_ahead > 0:
+        reader = ReadAhead(
+            target_sensor_data_paths, depth=read_ahead,
+            skip=partial(is_decode_cached, cache_dir, output_mode, cache_hash, salvage),
+        )
+    
+    writer_options = parquet_profiles.write_options(schema, write_profile)
+    with pq.ParquetWriter(save_path, schema, **writer_options) as writer, reader or nullcontext():
+        for file_index, sensor_data_path in enumerate(progress):
+            
+            progress.set_description(f" processing-> {os.path.basename(sensor_data_path)}")
+            
+            inner_table = decode_sensor_file(
+                sensor_data_path, file_index, output_mode, cache_dir, cache_hash, salvage, reader
+            )
+            writer.write_table(inner_table, row_group_size=row_group_size)
+            num_rows += inner_table.num_rows
+    
+    return num_rows
+
+def process_samsung_health(datas: List, data_type: str):
+    
+    processed_list = []
+    for data in datas:
+        
+        start_time = utc2kst(data["startTime"])
+        end_time = utc2kst(data["endTime"])
+        value = data[VALUE_KEY[data_type]] if data_type in VALUE_KEY else None
+        processed_value = parse_iso_duration(value)
+        
+        value_dict = {}
+        if data_type in VALUE_STR_KEY:
+            for inner_value_str_key in VALUE_STR_KEY[data_type]:
+                value_dict[inner_value_str_key] = data[inner_value_str_key]
+        
+        if data_type == "Exercise":
+            processed_value = load_exercise_map()[processed_value]
+            value_dict["exercise_str"] = value
+        
+        inner_dict = {
+            "category": data_type,
+            "start_time": start_time,
+            "end_time": end_time,
+        }
+        
+        if data_type in DATA_UNITS:
+            inner_dict["unit"] = DATA_UNITS[data_type]
+        
+        if data_type in FUNCTION_MAP["activity_summary"]:
+            inner_dict["value"] = processed_value
+        elif data_type in FUNCTION_MAP["sequential_data"]:
+            inner_dict["value"] = processed_value
+            inner_dict["value_str"] = json.dumps(value_dict, ensure_ascii=False)
+        elif data_type in FUNCTION_MAP["etc"]:
+            value_dict = data.copy()
+            for rm_key in REMOVE_KEYS:
+                value_dict.pop(rm_key)
+            
+            inner_dict["value_str"] = json.dumps(value_dict, ensure_ascii=False)
+        else :
+            raise ValueError("Invalid data_type")
+        
+        processed_list.append(inner_dict)
+    
+    return processed_list
+
+def process_samsung_health_columns(datas: List, data_type: str, value_str=True):
+    """
+    process_samsung_health 와 같은 결과를 컬럼 단위로 계산.
+    시간 변환 / duration 파싱 / 운동 코드 변환을 파일 전체에 한번에 적용.
+    value_str=False 이면 value_str(json 문자열) 컬럼은 만들지 않음.
+    Returns: {컬럼명: list}
+    """
+    
+    if not datas:
+        return {}
+    
+    if not any(data_type in FUNCTION_MAP[function_type] for function_type in FUNCTION_MAP):
+        raise ValueError("Invalid data_type")
+    
+    num_rows = len(datas)
+    columns = {
+        "category": [data_type] * num_rows,
+        "start_time": utc2kst_batch([data["startTime"] for data in datas]),
+        "end_time": utc2kst_batch([data["endTime"] for data in datas]),
+    }
+    
+    if data_type in DATA_UNITS:
+        columns["unit"] = [DATA_UNITS[data_type]] * num_rows
+    
+    values = [data[VALUE_KEY[data_type]] for data in datas] if data_type in VALUE_KEY else [None] * num_rows
+    processed_values = parse_iso_duration_batch(values)
+    
+    if data_type == "Exercise":
+        exercise_map = load_exercise_map()
+        exercise_codes = [exercise_map.get(value) for value in processed_values]
+        if None in exercise_codes:
+            raise KeyError(processed_values[exercise_codes.index(None)])
+        processed_values = exercise_codes
+    
+    if data_type in FUNCTION_MAP["activity_summary"]:
+        columns["value"] = processed_values
+    elif data_type in FUNCTION_MAP["sequential_data"]:
+        columns["value"] = processed_values
+        if not value_str:
+            return columns
+        value_str_keys = VALUE_STR_KEY.get(data_type, [])
+        value_str_list = []
+        for data, value in zip(datas, values):
+            value_dict = {inner_value_str_key: data[inner_value_str_key] for inner_value_str_key in value_str_keys}
+            if data_type == "Exercise":
+                value_dict["exercise_str"] = value
+            value_str_list.append(encode_json(value_dict))
+        columns["value_str"] = value_str_list
+    elif not value_str:
+        return columns
+    else: # etc
+        value_str_list = []
+        for data in datas:
+            value_dict = data.copy()
+            for rm_key in REMOVE_KEYS:
+                value_dict.pop(rm_key)
+            value_str_list.append(encode_json(value_dict))
+        columns["value_str"] = value_str_list
+    
+    return columns
+
+def process_samsung_health_batch(datas: List, data_type: str):
+    # process_samsung_health 와 같은 row dict list 반환
+    
+    columns = process_samsung_health_columns(datas, data_type)
+    if not columns:
+        return []
+    
+    keys = list(columns)
+    return [dict(zip(keys, row)) for row in zip(*columns.values())]
+
+def process_samsung_health_nested(datas: List, data_type: str):
+    """
+    value_str 대신 원본 구조를 유지하는 nested 출력용.
+    Returns: (columns, detail_rows, series_rows)
+        columns     : process_samsung_health_columns(value_str=False) 결과
+        detail_rows : VALUE_STR_KEY 항목(seriesData 제외) 또는 etc 타입의 전체 payload, record_index 포함
+        series_rows : seriesData 를 펼친 long-format row, record_index 포함
+    """
+    
+    columns = process_samsung_health_columns(datas, data_type, value_str=False)
+    detail_rows = []
+    series_rows = []
+    if not columns:
+        return columns, detail_rows, series_rows
+    
+    if data_type in FUNCTION_MAP["sequential_data"]:
+        value_str_keys = VALUE_STR_KEY.get(data_type, [])
+        detail_keys = [key for key in value_str_keys if key != SERIES_KEY]
+        for record_index, data in enumerate(datas):
+            detail = {"record_index": record_index}
+            for key in detail_keys:
+                detail[key] = data[key]
+            if data_type == "Exercise":
+                detail["exercise_str"] = data[VALUE_KEY[data_type]]
+            detail_rows.append(detail)
+            
+            if SERIES_KEY in value_str_keys:
+                for point in data[SERIES_KEY] or []:
+                    series_row = {"record_index": record_index}
+                    series_row.update(point if isinstance(point, dict) else {"value": point})
+                    series_rows.append(series_row)
+    
+    elif data_type in FUNCTION_MAP["etc"]:
+        for record_index, data in enumerate(datas):
+            detail = data.copy()
+            for rm_key in REMOVE_KEYS:
+                detail.pop(rm_key)
+            detail_rows.append({"record_index": record_index, **detail})
+    
+    return columns, detail_rows, series_rows
+
+def _to_arrow_column(values):
+    # 타입 추론이 안되는 컬럼(섞인 타입 등)은 json 문자열로 저장
+    
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError, TypeError, OverflowError):
+        return pa.array([None if value is None else encode_json(value) for value in values], type=pa.string())
+
+def _to_kst_timestamp(values):
+    import pandas as pd
+    
+    kst = pd.to_datetime(pd.Series(values, dtype=object), utc=True, format="ISO8601").dt.tz_convert("Asia/Seoul")
+    return pa.array(kst, type=pa.timestamp("ms", tz="Asia/Seoul"))
+
+def _rows_to_table(rows, leading_columns):
+    
+    keys = list(leading_columns)
+    for row in rows:
+        for key in row:
+            if key not in leading_columns and key not in keys:
+                keys.append(key)
+    
+    arrays = []
+    for key in keys:
+        values = [row.get(key) for row in rows]
+        if key in SERIES_TIME_KEYS and all(isinstance(value, str) for value in values):
+            try:
+                arrays.append(_to_kst_timestamp(values))
+                continue
+            except (ValueError, TypeError):
+                pass
+        arrays.append(leading_columns[key] if key in leading_columns else _to_arrow_column(values))
+    
+    return pa.Table.from_arrays(arrays, names=keys)
+
+def samsung_health_nested_tables(results):
+    """
+    [(data_type, columns, detail_rows, series_rows), ...] 를 하루 단위 table 들로 변환.
+    record_id 는 하루 안에서의 record 순번으로, 세 table 을 연결하는 key.
+    Returns: {data_kind: pa.Table}
+        samsung_health                  : record_id / category / start_time / end_time / unit / value
+        samsung_health_detail/<category>: record_id + VALUE_STR_KEY 항목 (etc 타입은 전체 payload)
+        samsung_health_series           : record_id / category + seriesData 항목
+    """
+    import pandas as pd
+    
+    record_ids, categories, start_times, end_times, units, values = [], [], [], [], [], []
+    detail_rows = defaultdict(list)
+    series_rows = []
+    
+    for data_type, columns, inner_detail_rows, inner_series_rows in results:
+        if not columns:
+            continue
+        offset = len(record_ids)
+        num_rows = len(columns["category"])
+        
+        record_ids += range(offset, offset + num_rows)
+        categories += columns["category"]
+        start_times += columns["start_time"]
+        end_times += columns["end_time"]
+        units += columns.get("unit", [None] * num_rows)
+        values += columns.get("value", [None] * num_rows)
+        
+        for row in inner_detail_rows:
+            detail_rows[data_type].append({"record_id": offset + row.pop("record_index"), **row})
+        for row in inner_series_rows:
+            series_rows.append({"record_id": offset + row.pop("record_index"), "category": data_type, **row})
+    
+    numeric_values = pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").astype("float64")
+    tables = {
+        "samsung_health": pa.table({
+            "record_id": pa.array(record_ids, type=pa.int64()),
+            "category": pa.array(categories, type=pa.string()).dictionary_encode(),
+            "start_time": _to_kst_timestamp(start_times),
+            "end_time": _to_kst_timestamp(end_times),
+            "unit": pa.array(units, type=pa.string()).dictionary_encode(),
+            "value": pa.array(numeric_values, from_pandas=True),
+        })
+    }
+    
+    for data_type, rows in detail_rows.items():
+        tables[f"samsung_health_detail/{data_type}"] = _rows_to_table(
+            rows, {"record_id": pa.array([row["record_id"] for row in rows], type=pa.int64())}
+        )
+    
+    if series_rows:
+        tables["samsung_health_series"] = _rows_to_table(series_rows, {
+            "record_id": pa.array([row["record_id"] for row in series_rows], type=pa.int64()),
+            "category": pa.array([row["category"] for row in series_rows], type=pa.string()).dictionary_encode(),
+        })
+    
+    return tables
+
+def list_samsung_health_paths(device_id, target_date):
+    
+    target_data_dir = os.path.join(RAW_DATA_DIR, device_id, "samsung_health", target_date)
+    # target_data_dir = "samsung_health/2025-08-07"  # TODO: for debug
+    target_paths = glob(os.path.join(target_data_dir, "*.json"))
+    
+    return sorted(target_paths)
+
+def process_samsung_health_dir(device_id, target_date, verbose=True, engine="batch", output_mode="legacy", reader=None):
+    """
+    output_mode
+        legacy : category / start_time / end_time / unit / value / value_str(json) 의 DataFrame
+        nested : samsung_health_nested_tables 결과 ({data_kind: pa.Table})
+    reader(read_ahead.ReadAhead)가 있으면 미리 읽어둔 json 을 사용
+    """
+    
+    target_paths = list_samsung_health_paths(device_id, target_date)
+    
+    results = []
+    
+    processing_samsung_health = tqdm(target_paths, disable=not verbose)
+    
+    with run_metrics.stage("samsung_health", device_id, target_date, profile=True) as metrics:
+        for target_path in processing_samsung_health:
+            
+            processing_samsung_health.set_description(f" processing-> {os.path.basename(target_path)}")
+            
+            data_type = os.path.basename(target_path).split("_")[0]
+            if reader is not None:
+                data = reader.take(target_path)
+                datas = json.loads(data)
+                metrics["bytes_read"] += len(data)
+            else:
+                with open(target_path, "r") as f:
+                    datas = json.load(f)
+                metrics["bytes_read"] += os.path.getsize(target_path)
+            metrics["records"] += len(datas)
+            if output_mode == "nested":
+                results.append((data_type, *process_samsung_health_nested(datas, data_type)))
+                continue
+            
+            if engine == "batch":
+                processed_health_list = process_samsung_health_batch(datas, data_type)
+            else:
+                processed_health_list = process_samsung_health(datas, data_type)
+            results += processed_health_list
+        
+        if output_mode == "nested":
+            return samsung_health_nested_tables(results)
+        
+        # legacy 출력에서만 pandas 사용 (module import 시에는 불러오지 않음)
+        import pandas as pd
+        return pd.DataFrame(results)
+
+def save_samsung_health(result, device_id, target_date, write_profile=parquet_profiles.PARQUET_WRITE_PROFILE, staged=None):
+    # staged 가 있으면 임시 경로에 기록 (staged_save_path)
+    
+    save_path = make_save_path if staged is None else partial(staged_save_path, staged)
+    if isinstance(result, dict):
+        for data_kind, table in result.items():
+            parquet_profiles.write_table(table, save_path(device_id, data_kind, target_date), write_profile)
+    else:
+        # DataFrame.to_parquet(index=False, engine="pyarrow") 와 같은 table 에 profile 적용
+        table = pa.Table.from_pandas(result, preserve_index=False)
+        parquet_profiles.write_table(table, save_path(device_id, "samsung_health", target_date), write_profile)
+
+def make_save_path(device_id, data_kind, target_date):
+    
+    save_path = os.path.join(PROCESSED_DATA_DIR, device_id, data_kind, f"{target_date}.parquet")
+    os.makedirs(os.path.dirname(save_path), exist_ok=True)
+    
+    return save_path
+
+def staged_save_path(staged, device_id, data_kind, target_date):
+    # make_save_path 옆의 임시 경로를 staged({최종 경로: 임시 경로})에 추가, device-date 전체가 성공한 뒤 commit_staged 로 교체
+    
+    save_path = make_save_path(device_id, data_kind, target_date)
+    staged[save_path] = parquet_profiles.staging_path(save_path)
+    
+    return staged[save_path]
+
+def iter_task_results(tasks, executor=None, window=None):
+    """
+    tasks: [(key, kind, fn, args), ...]
+    제출 순서대로 (key, kind, get_result)를 yield. get_result() 호출 시 결과를 반환하거나 예외를 raise.
+    executor가 있으면 최대 window개의 task만 앞서 제출하여 결과가 쌓이는 메모리를 제한.
+    """
+    
+    if executor is None:
+        for key, kind, fn, args in tasks:
+            yield key, kind, partial(fn, *args)
+        return
+    
+    task_iter = iter(tasks)
+    pending = deque()
+    
+    def _submit_next():
+        task = next(task_iter, None)
+        if task is not None:
+            key, kind, fn, args = task
+            pending.append((key, kind, executor.submit(fn, *args)))
+    
+    for _ in range(window or 1):
+        _submit_next()
+    
+    while pending:
+        key, kind, future = pending.popleft()
+        _submit_next()
+        yield key, kind, future.result
+
+def sensor_staging_path(device_id, target_date):
+    # partitioned layout 에서 하루치 columnar 파일을 잠시 쓰는 경로 ("_" 로 시작하여 dataset 조회에서 제외됨)
+    
+    save_path = os.path.join(sensor_dataset.SENSOR_DATASET_DIR, "_staging", f"{device_id}_{target_date}.parquet")
+    os.makedirs(os.path.dirname(save_path), exist_ok=True)
+    
+    return save_path
+
+def process_device_dates(device_dates, output_mode="legacy", row_group_size=None, workers=1,
+                         cache_dir=None, cache_hash=False, health_output_mode="legacy", sensor_layout="daily",
+                         salvage=False, read_ahead=READ_AHEAD_FILES, read_ahead_bytes=READ_AHEAD_MAX_BYTES,
+                         read_threads=READ_AHEAD_THREADS, rollup=True, write_profile=parquet_profiles.PARQUET_WRITE_PROFILE):
+    """
+    (device_id, target_date) 별 sensor_data / samsung_health 처리.
+    workers > 1 이면 시간 단위 sensor 파일과 samsung_health 디렉토리를 process pool에 분산하고,
+    결과는 제출 순서(device, date, sequence)대로 기록하므로 serial 실행과 동일한 parquet이 생성됨.
+    한 device-date의 실패는 해당 항목만 중단시키고 나머지는 계속 처리 (결과는 모두 임시 파일에 기록하고 device-date 전체가 성공한 뒤
+    os.replace 로 교체, 실패하면 이번 실행의 임시 파일만 지우고 이전 결과는 유지).
+    sensor_layout="partitioned" 이면 (columnar) sensor_data 를 device / date / sensor_type partition 으로 저장.
+    salvage 이면 corrupt 한 sensor binary 에서 잘못된 구간만 건너뛰고 나머지를 decoding (utils.decode_binary 참고).
+    read_ahead > 0 이면 (serial 실행) 다음 read_ahead 개의 raw 파일을 thread 로 미리 읽어 decoding 과 겹침,
+    I/O 를 기다린 시간은 pipeline stage 의 io_stall_seconds 로 기록.
+    rollup 이면 분 단위 sensor_rollup / samsung_health_rollup table 도 저장 (sensor_rollup.py 참고).
+    sensor_data 수집 품질은 decoding 중 계산한 값을 합쳐 sensor_quality/<date>.parquet 로 저장 (sensor_quality.py 참고).
+    sensor_data / samsung_health 는 write_profile 의 codec / encoding 으로 기록, row_group_size 가 없으면 profile 값 사용
+    (parquet_profiles.py 참고).
+    
+    Returns: {(device_id, target_date): error message}
+    """
+    
+    row_group_size = row_group_size or parquet_profiles.profile_row_group_size(write_profile)
+    sensor_paths = {
+        (device_id, target_date): list_sensor_data_paths(device_id, target_date)
+        for device_id, target_date in device_dates
+    }
+    
+    samsung_health_paths = {
+        (device_id, target_date): list_samsung_health_paths(device_id, target_date)
+        for device_id, target_date in device_dates
+    }
+    
+    # read-ahead 는 serial 실행에서만 사용 (worker 는 각자 파일을 읽음), task 순서대로 미리 읽음
+    reader = None
+    if read_ahead > 0 and workers <= 1:
+        read_paths = [
+            path for key in sensor_paths for path in sensor_paths[key] + samsung_health_paths[key]
+        ]
+        reader = ReadAhead(
+            read_paths, depth=read_ahead, max_bytes=read_ahead_bytes, threads=read_threads,
+            skip=partial(is_decode_cached, cache_dir, output_mode, cache_hash, salvage),
+        )
+    
+    tasks = []
+    for device_id, target_date in device_dates:
+        key = (device_id, target_date)
+        for file_index, sensor_data_path in enumerate(sensor_paths[key]):
+            tasks.append((key, "sensor_data", decode_sensor_file,
+                          (sensor_data_path, file_index, output_mode, cache_dir, cache_hash, salvage, reader)))
+        tasks.append((key, "samsung_health", process_samsung_health_dir,
+                      (device_id, target_date, workers <= 1, "batch", health_output_mode, reader)))
+    
+    failed = {}
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    pipeline_start = time.perf_counter()
+    try:
+        with run_metrics.stage("pipeline") as pipeline_metrics:
+            results = iter_task_results(tasks, executor, window=workers * 2)
+            progress = tqdm(groupby(results, key=lambda result: result[0]), total=len(device_dates))
+            
+            for (device_id, target_date), device_results in progress:
+                progress.set_description(f"Device-> {device_id}, date-> {target_date}")
+                
+                # {최종 경로: 임시 경로}, device-date 전체가 성공해야 교체
+                staged = {}
+                if sensor_layout == "partitioned":
+                    sensor_save_path = sensor_staging_path(device_id, target_date)
+                else:
+                    sensor_save_path = staged_save_path(staged, device_id, "sensor_data", target_date)
+                schema = sensor_output_schema(sensor_paths[(device_id, target_date)], output_mode)
+                try:
+                    # worker 결과를 기다리는 시간 포함, device-date 하나의 전체 시간
+                    with run_metrics.stage("write", device_id, target_date) as metrics:
+                        qualities = []
+                        writer_options = parquet_profiles.write_options(schema, write_profile)
+                        with pq.ParquetWriter(sensor_save_path, schema, **writer_options) as writer:
+                            for _, kind, get_result in device_results:
+                                result = get_result()
+                                if kind == "sensor_data":
+                                    qualities.append(sensor_quality.table_quality(result))
+                                    writer.write_table(result, row_group_size=row_group_size)
+                                    metrics["rows_written"] += result.num_rows
+                                else:
+                                    samsung_health_result = result
+                        quality_save_path = staged_save_path(staged, device_id, "sensor_quality", target_date)
+                        pq.write_table(sensor_quality.quality_table(qualities), quality_save_path)
+                        
+                        if rollup:
+                            with run_metrics.stage("rollup", device_id, target_date) as rollup_metrics:
+                                rollup_tables = {
+                                    "sensor_rollup": sensor_rollup.rollup_sensor_data(sensor_save_path, device_id),
+                                    "samsung_health_rollup": sensor_rollup.rollup_samsung_health(samsung_health_result, device_id),
+                                }
+                                for data_kind, table in rollup_tables.items():
+                                    pq.write_table(table, staged_save_path(staged, device_id, data_kind, target_date))
+                                    rollup_metrics["rows_written"] += table.num_rows
+                        
+                        if sensor_layout == "partitioned":
+                            with run_metrics.stage("partition", device_id, target_date) as partition_metrics:
+                                written = sensor_dataset.write_sensor_partitions(
+                                    sensor_save_path, device_id, target_date, write_profile=write_profile, staged=staged,
+                                )
+                                partition_metrics["rows_written"] += sum(written.values())
+                        
+                        save_samsung_health(samsung_health_result, device_id, target_date, write_profile, staged=staged)
+                        if isinstance(samsung_health_result, dict):
+                            metrics["rows_written"] += sum(table.num_rows for table in samsung_health_result.values())
+                        else:
+                            metrics["rows_written"] += len(samsung_health_result)
+                        
+                        parquet_profiles.commit_staged(staged)
+                        if sensor_layout == "partitioned":
+                            # 새 partition 으로 교체한 뒤 이번 결과에 없는 sensor type 의 이전 partition 제거
+                            sensor_dataset.remove_sensor_partitions(device_id, target_date, keep=staged)
+                            os.remove(sensor_save_path)
+                
+                except Exception as e:
+                    # 이번 실행의 임시 파일만 제거, 이전 실행의 결과는 그대로 둠
+                    parquet_profiles.discard_staged(staged)
+                    if sensor_layout == "partitioned" and os.path.exists(sensor_save_path):
+                        os.remove(sensor_save_path)
+                    failed[(device_id, target_date)] = f"{type(e).__name__}: {e}"
+                    print(f"Failed device-> {device_id}, date-> {target_date}: {failed[(device_id, target_date)]}")
+            
+            if reader is not None:
+                pipeline_metrics["io_read_seconds"] += reader.stats["read_seconds"]
+                pipeline_metrics["io_stall_seconds"] += reader.stats["stall_seconds"]
+                pipeline_metrics["bytes_read"] += reader.stats["bytes_read"]
+                print(reader.format_stats(time.perf_counter() - pipeline_start))
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        if reader is not None:
+            reader.close()
+    
+    return failed
+
+def process_devices(device_ids, target_date, **kwargs):
+    
+    failed = process_device_dates([(device_id, target_date) for device_id in device_ids], **kwargs)
+    
+    return {device_id: error for (device_id, _), error in failed.items()}
+
+def run_jobs(store, claim_batch=1, worker=None, lease_seconds=job_store.JOB_LEASE_SECONDS,
+             max_attempts=job_store.JOB_MAX_ATTEMPTS, device_dates=None, **kwargs):
+    """
+    job store 에서 process_data 항목을 claim_batch 개씩 claim 하여 처리, claim 할 항목이 없으면 종료.
+    device_dates 를 주면 그 (device_id, date) 만 claim (다른 실행이 등록한 항목은 가져가지 않음).
+    처리하는 동안 lease 를 연장하고, 성공하면 done / 실패하면 failed (retry 는 job_store.claim 참고).
+    여러 host 에서 같은 store 로 동시에 실행 가능.
+    Returns: {(device_id, target_date): error message}
+    """
+    
+    worker = worker or job_store.worker_name()
+    failed = {}
+    
+    while claimed := store.claim(job_store.PROCESS_STAGE, worker, limit=claim_batch,
+                                 lease_seconds=lease_seconds, max_attempts=max_attempts, device_dates=device_dates):
+        print(f"Claimed ({worker}): {', '.join(f'{device_id} {target_date}' for device_id, target_date in claimed)}")
+        try:
+            with store.keep_alive(claimed, job_store.PROCESS_STAGE, worker, lease_seconds):
+                batch_failed = process_device_dates(claimed, **kwargs)
+        except BaseException:
+            # 중단(KeyboardInterrupt 등) 시 다른 worker 가 바로 가져갈 수 있도록 반환
+            for device_id, target_date in claimed:
+                store.release(device_id, target_date, job_store.PROCESS_STAGE, worker)
+            raise
+        
+        for device_id, target_date in claimed:
+            error = batch_failed.get((device_id, target_date))
+            if error is None:
+                finished = store.complete(device_id, target_date, job_store.PROCESS_STAGE, worker)
+            else:
+                failed[(device_id, target_date)] = error
+                finished = store.fail(device_id, target_date, error, job_store.PROCESS_STAGE, worker)
+            if not finished:
+                print(f"Lease lost device-> {device_id}, date-> {target_date}")
+    
+    return failed
+
+def make_backfill_dates(start_date, end_date):
+    
+    current = datetime.strptime(start_date, "%Y-%m-%d")
+    last = datetime.strptime(end_date, "%Y-%m-%d")
+    
+    date_list = []
+    while current <= last:
+        date_list.append(current.strftime("%Y-%m-%d"))
+        current += timedelta(days=1)
+    
+    return date_list
+
+def find_backfill_targets(device_ids, date_list, check_upload=True):
+    """
+    raw sensor_data 가 있는 (device_id, date) 쌍을 찾고,
+    check_upload 이면 01_upload_check 와 같은 기준(har_label, sensor_data 6개 이상)으로 유효한 쌍만 남김.
+    """
+    
+    device_dates = [
+        (device_id, target_date)
+        for device_id in device_ids
+        for target_date in date_list
+        if list_sensor_data_paths(device_id, target_date)
+    ]
+    
+    if not check_upload or not device_dates:
+        return device_dates
+    
+    candidate_ids = sorted({device_id for device_id, _ in device_dates})
+    missing_date_dict = upload_check.catch_missing_data(candidate_ids, date_set=set(date_list))
+    
+    valid_device_dates = []
+    for device_id, target_date in device_dates:
+        device_dict = missing_date_dict[device_id]
+        if "error" in device_dict:
+            print(f"Upload check failed-> {device_id}: {device_dict['error']}")
+            continue
+        if target_date in device_dict["har_label"] or target_date in device_dict["sensor_data"]:
+            continue
+        valid_device_dates.append((device_id, target_date))
+    
+    return valid_device_dates
+
+def process_targets(device_dates, store_url=None, force=False, claim_batch=1,
+                    metrics_dir=run_metrics.RUN_METRICS_DIR, profile_dir=run_metrics.RUN_PROFILE_DIR, **kwargs):
+    """
+    지정한 (device_id, date) 들을 한 process 에서 처리.
+    store_url 이 있으면 job store 에 등록한 뒤 claim 하여 처리 (같은 명령을 여러 host 에서 실행하면 나눠서 처리,
+    이미 done 인 항목은 건너뜀, force 이면 다시 처리). claim 은 device_dates 로 제한하므로 실패 수는 이 목록 기준.
+    """
+    
+    run_metrics.configure("process_data", metrics_dir, profile_dir)
+    
+    if store_url is None:
+        failed = process_device_dates(device_dates, **kwargs)
+    else:
+        with job_store.open_job_store(store_url) as store:
+            store.enqueue(device_dates, job_store.PROCESS_STAGE, force=force)
+            failed = run_jobs(store, claim_batch=claim_batch, device_dates=device_dates, **kwargs)
+    
+    if failed:
+        print(f"Failed: {len(failed)}/{len(device_dates)}")
+        for (device_id, target_date), error in failed.items():
+            print(f"  {device_id} {target_date}: {error}")
+    
+    summary = run_metrics.finish("process_data")
+    if summary is not None:
+        print(summary)
+    
+    print("Done")
+    
+    return failed
+
+def backfill(start_date, end_date, device_ids=None, check_upload=True, csv_path=None, **kwargs):
+    
+    if device_ids is None:
+        device_ids = list(upload_check.parse_user2device(csv_path or upload_check.CSV_PATH).values())
+    
+    date_list = make_backfill_dates(start_date, end_date)
+    device_dates = find_backfill_targets(device_ids, date_list, check_upload=check_upload)
+    print(f"Backfill targets: {len(device_dates)} (device, date) pairs")
+    
+    return process_targets(device_dates, **kwargs)
+
+def parse_device_dates(items):
+    # ["<device_id>:<YYYY-MM-DD>", ...] 또는 "device_id date" 줄로 된 파일 내용 -> [(device_id, date), ...]
+    
+    device_dates = []
+    for item in items:
+        device_id, target_date = item.replace(":", " ").split()
+        datetime.strptime(target_date, "%Y-%m-%d")
+        device_dates.append((device_id, target_date))
+    
+    return device_dates
+
+def main(output_mode="legacy", row_group_size=None, workers=1,
+         cache_dir=None, cache_hash=False, cache_max_bytes=decode_cache.DECODE_CACHE_MAX_BYTES,
+         health_output_mode="legacy", sensor_layout="daily", salvage=False,
+         read_ahead=READ_AHEAD_FILES, read_ahead_bytes=READ_AHEAD_MAX_BYTES, read_threads=READ_AHEAD_THREADS,
+         rollup=True, store_url=job_store.JOB_STORE_URL, claim_batch=1,
+         write_profile=parquet_profiles.PARQUET_WRITE_PROFILE,
+         metrics_dir=run_metrics.RUN_METRICS_DIR, profile_dir=run_metrics.RUN_PROFILE_DIR):
+    """
+    01_upload_check.py 가 job store 에 등록한 (device, date) 를 claim 하여 처리.
+    이전 실행에서 중단된 항목(lease 만료)과 retry 대기가 끝난 failed 항목도 함께 처리.
+    """
+    
+    run_metrics.configure("process_data", metrics_dir, profile_dir)
+    
+    with job_store.open_job_store(store_url) as store:
+        failed = run_jobs(
+            store, claim_batch=claim_batch,
+            output_mode=output_mode, row_group_size=row_group_size, workers=workers,
+            cache_dir=cache_dir, cache_hash=cache_hash, health_output_mode=health_output_mode,
+            sensor_layout=sensor_layout, salvage=salvage,
+            read_ahead=read_ahead, read_ahead_bytes=read_ahead_bytes, read_threads=read_threads, rollup=rollup,
+            write_profile=write_profile,
+        )
+        counts = store.counts(job_store.PROCESS_STAGE)
+    
+    if cache_dir is not None:
+        decode_cache.evict(cache_dir, cache_max_bytes)
+    
+    if failed:
+        print(f"Failed: {len(failed)}")
+        for (device_id, target_date), error in failed.items():
+            print(f"  {device_id} {target_date}: {error}")
+    print("Jobs: " + ", ".join(f"{status} {count}" for status, count in counts.items()))
+    
+    summary = run_metrics.finish("process_data")
+    if summary is not None:
+        print(summary)
+    
+    print("Done")
+
+def build_parser(parser=None):
+    
+    parser = parser or argparse.ArgumentParser()
+    parser.add_argument("--output-mode", choices=["legacy", "columnar"], default="legacy",
+                        help="sensor_data parquet 형태 (columnar: sensor type 별 float32 컬럼)")
+    parser.add_argument("--health-output-mode", choices=["legacy", "nested"], default="legacy",
+                        help="samsung_health parquet 형태 (nested: value_str 대신 detail / series table)")
+    parser.add_argument("--sensor-layout", choices=["daily", "partitioned"], default="daily",
+                        help="sensor_data 저장 형태 (partitioned: device / date / sensor_type partition, columnar 필요)")
+    parser.add_argument("--salvage", action="store_true",
+                        help="corrupt 한 sensor binary 에서 잘못된 구간만 건너뛰고 다음 정상 header 부터 이어서 decoding")
+    parser.add_argument("--read-ahead", type=int, default=READ_AHEAD_FILES,
+                        help="serial 실행에서 미리 읽어둘 raw 파일 수 (0이면 사용 안함, READ_AHEAD_FILES)")
+    parser.add_argument("--read-ahead-bytes", type=int, default=READ_AHEAD_MAX_BYTES,
+                        help="미리 읽어둘 최대 byte (READ_AHEAD_MAX_BYTES)")
+    parser.add_argument("--read-threads", type=int, default=READ_AHEAD_THREADS,
+                        help="read-ahead thread 수 (READ_AHEAD_THREADS)")
+    parser.add_argument("--no-rollup", action="store_true",
+                        help="분 단위 sensor_rollup / samsung_health_rollup table 을 만들지 않음")
+    parser.add_argument("--row-group-size", type=int, default=None,
+                        help="sensor_data parquet 의 row group 당 최대 row 수 (기본: write profile 값)")
+    parser.add_argument("--write-profile", choices=list(parquet_profiles.WRITE_PROFILES),
+                        default=parquet_profiles.PARQUET_WRITE_PROFILE,
+                        help="parquet codec / encoding profile (PARQUET_WRITE_PROFILE, parquet_profiles.py 참고)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="process pool worker 수 (1이면 serial)")
+    parser.add_argument("--cache-dir", default=decode_cache.DECODE_CACHE_DIR,
+                        help="시간 단위 decoding 결과 cache 경로 (없으면 cache 사용 안함)")
+    parser.add_argument("--cache-hash", action="store_true",
+                        help="cache key에 파일 내용 hash 포함")
+    parser.add_argument("--cache-max-bytes", type=int, default=decode_cache.DECODE_CACHE_MAX_BYTES,
+                        help="실행 후 cache 용량 상한 (LRU evict)")
+    parser.add_argument("--device-dates", nargs="*", default=None,
+                        help="처리할 <device_id>:<YYYY-MM-DD> 목록 (주어지면 job store 대신 이 목록을 한 process 에서 처리)")
+    parser.add_argument("--device-dates-file", default=None,
+                        help="한 줄에 \"<device_id> <YYYY-MM-DD>\" 인 처리 목록 파일 (--device-dates 와 같음)")
+    parser.add_argument("--start-date", default=None,
+                        help="backfill 시작 날짜 YYYY-MM-DD (주어지면 job store 대신 날짜 범위를 처리)")
+    parser.add_argument("--end-date", default=None,
+                        help="backfill 마지막 날짜 YYYY-MM-DD (기본: start-date)")
+    parser.add_argument("--device-ids", nargs="*", default=None,
+                        help="backfill 대상 device (기본: user_device_table.csv 의 전체 device)")
+    parser.add_argument("--csv-path", default=None,
+                        help="user_device_table.csv 경로 (기본: 01_upload_check.CSV_PATH)")
+    parser.add_argument("--skip-upload-check", action="store_true",
+                        help="backfill 시 har_label / sensor_data 업로드 체크 없이 raw 데이터가 있으면 처리")
+    parser.add_argument("--job-store", default=job_store.JOB_STORE_URL,
+                        help="작업 상태 저장소, SQLite 파일 경로 또는 postgresql:// URL (JOB_STORE_URL)")
+    parser.add_argument("--claim-batch", type=int, default=0,
+                        help="한번에 claim 하여 처리할 (device, date) 수 (기본: max(workers, 1))")
+    parser.add_argument("--no-job-store", action="store_true",
+                        help="backfill 대상을 job store 에 등록하지 않고 바로 처리")
+    parser.add_argument("--force", action="store_true",
+                        help="backfill 시 job store 에서 이미 done 인 항목도 다시 처리")
+    parser.add_argument("--metrics-dir", default=run_metrics.RUN_METRICS_DIR,
+                        help="stage 별 측정값(JSON lines / Prometheus textfile) 저장 경로 (RUN_METRICS_DIR)")
+    parser.add_argument("--profile-dir", default=run_metrics.RUN_PROFILE_DIR,
+                        help="decoding / samsung_health 구간 cProfile 결과 저장 경로 (RUN_PROFILE_DIR)")
+    
+    return parser
+
+def run(args, parser=None):
+    
+    parser = parser or build_parser()
+    
+    if args.sensor_layout == "partitioned" and args.output_mode != "columnar":
+        parser.error("--sensor-layout partitioned 는 --output-mode columnar 가 필요합니다")
+    
+    process_kwargs = dict(
+        output_mode=args.output_mode, row_group_size=args.row_group_size, workers=args.workers,
+        cache_dir=args.cache_dir, cache_hash=args.cache_hash, health_output_mode=args.health_output_mode,
+        sensor_layout=args.sensor_layout, salvage=args.salvage,
+        read_ahead=args.read_ahead, read_ahead_bytes=args.read_ahead_bytes, read_threads=args.read_threads,
+        rollup=not args.no_rollup, write_profile=args.write_profile,
+    )
+    
+    claim_batch = args.claim_batch or max(args.workers, 1)
+    
+    device_dates = parse_device_dates(args.device_dates or [])
+    if args.device_dates_file is not None:
+        with open(args.device_dates_file, "r") as f:
+            device_dates += parse_device_dates(line for line in f if line.strip())
+    
+    if device_dates:
+        # scheduler 가 나눠준 목록은 job store 를 거치지 않고 그대로 처리
+        process_targets(device_dates, metrics_dir=args.metrics_dir, profile_dir=args.profile_dir, **process_kwargs)
+    elif args.start_date is not None:
+        backfill(
+            args.start_date, args.end_date or args.start_date, device_ids=args.device_ids,
+            check_upload=not args.skip_upload_check, csv_path=args.csv_path,
+            store_url=None if args.no_job_store else args.job_store, force=args.force, claim_batch=claim_batch,
+            metrics_dir=args.metrics_dir, profile_dir=args.profile_dir, **process_kwargs,
+        )
+    else:
+        main(
+            **process_kwargs, cache_max_bytes=args.cache_max_bytes, store_url=args.job_store, claim_batch=claim_batch,
+            metrics_dir=args.metrics_dir, profile_dir=args.profile_dir,
+        )
+    
+    if (device_dates or args.start_date is not None) and args.cache_dir is not None:
+        decode_cache.evict(args.cache_dir, args.cache_max_bytes)
+
+if __name__ == "__main__":
+    run(build_parser().parse_args())
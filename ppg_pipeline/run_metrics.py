@@ -0,0 +1,364 @@
+import os
+import json
+import time
+import cProfile
+import threading
+from glob import glob, escape
+from datetime import datetime
+from contextlib import contextmanager
+from collections import defaultdict
+from zoneinfo import ZoneInfo
+from dotenv import load_dotenv
+
+"""
+실행 단계별 측정값 기록
+- stage(...) 로 감싼 구간마다 wall / CPU 시간, 읽은 / 건너뛴 byte, decoding / reject record 수, 기록한 row 수, 구간 중 최대 RSS 를 JSON lines 로 기록
+    - CPU 시간은 process 전체(pyarrow / read-ahead thread 포함), 같은 process 에서 동시에 실행되는 stage 는 서로의 CPU 시간이 겹침
+    - 최대 RSS 는 sampler thread 가 RSS_SAMPLE_SECONDS 마다 읽은 현재 RSS 중 구간 안의 최대값 (pyarrow memory pool 포함)
+- 경로는 환경변수(RUN_METRICS_PATH)로 전달하여 process pool worker 에서도 같은 파일에 한 줄씩 append
+- configure 한 process 에서 바깥에 device 가 지정된 다른 stage 가 없는 stage 는 outermost 로 표시, device 별 시간은 outermost 만 합산
+- 실행이 끝나면 summarize -> Prometheus textfile(<metrics_dir>/<run_name>.prom) / chat report 요약
+- RUN_PROFILE_DIR 이 있으면 profile=True 인 구간을 cProfile 로 저장 (py-spy 는 stage 함수 이름으로 구분 가능)
+    - main thread 에서만 profile (Python 3.12+ 는 동시에 하나의 profiler 만 enable 가능, thread pool 구간은 측정만)
+"""
+load_dotenv()
+
+RUN_METRICS_DIR = os.getenv("RUN_METRICS_DIR")
+RUN_PROFILE_DIR = os.getenv("RUN_PROFILE_DIR")
+RSS_SAMPLE_SECONDS = float(os.getenv("RSS_SAMPLE_SECONDS", 0.05))
+
+COUNTER_KEYS = ["bytes_read", "records", "rows_written", "skipped_bytes", "io_read_seconds", "io_stall_seconds"]
+PROMETHEUS_PREFIX = "ppg_preprocess"
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+# thread 별 진행 중인 device 단위 stage 깊이
+_local = threading.local()
+# 진행 중인 stage 별 최대 RSS (sampler thread 가 갱신), sampler 는 process 마다 처음 stage 에서 시작
+_rss_peaks = {}
+_rss_lock = threading.Lock()
+_sampler_pid = None
+
+
+def configure(run_name, metrics_dir=RUN_METRICS_DIR, profile_dir=RUN_PROFILE_DIR):
+    """
+    이번 실행의 JSON lines 경로를 정하고 환경변수에 저장 (이후 만드는 worker process 에 상속).
+    Returns: metrics 파일 경로 (metrics_dir 가 없으면 None)
+    """
+    
+    metrics_path = None
+    if metrics_dir is not None:
+        os.makedirs(metrics_dir, exist_ok=True)
+        run_id = datetime.now(ZoneInfo("Asia/Seoul")).strftime("%y%m%d_%H%M%S")
+        metrics_path = os.path.join(metrics_dir, f"{run_name}_{run_id}.jsonl")
+        os.environ["RUN_METRICS_PATH"] = metrics_path
+        os.environ["RUN_NAME"] = run_name
+        # worker process 에 상속되어 outermost 판단에 사용
+        os.environ["RUN_MAIN_PID"] = str(os.getpid())
+    else:
+        os.environ.pop("RUN_METRICS_PATH", None)
+    
+    if profile_dir is not None:
+        os.makedirs(profile_dir, exist_ok=True)
+        os.environ["RUN_PROFILE_DIR"] = profile_dir
+    else:
+        os.environ.pop("RUN_PROFILE_DIR", None)
+    
+    return metrics_path
+
+def current_rss():
+    # 현재 RSS (byte), /proc 가 없으면 None
+    
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        return None
+
+def _sample_rss():
+    
+    while True:
+        time.sleep(RSS_SAMPLE_SECONDS)
+        rss = current_rss()
+        with _rss_lock:
+            for key, peak in _rss_peaks.items():
+                if rss > peak:
+                    _rss_peaks[key] = rss
+
+def _start_rss(key):
+    # stage 시작 시 현재 RSS 로 시작, fork 된 worker 에는 sampler thread 가 없으므로 process 마다 시작
+    global _sampler_pid
+    
+    rss = current_rss()
+    if rss is None:
+        return
+    with _rss_lock:
+        _rss_peaks[key] = rss
+        if _sampler_pid != os.getpid():
+            _sampler_pid = os.getpid()
+            threading.Thread(target=_sample_rss, name="rss-sampler", daemon=True).start()
+
+def _reset_after_fork():
+    # fork 시점에 sampler thread 가 잡고 있던 lock / 부모의 stage 상태를 worker 에서 초기화
+    global _local, _rss_peaks, _rss_lock
+    
+    _local = threading.local()
+    _rss_peaks = {}
+    _rss_lock = threading.Lock()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+def _stop_rss(key):
+    
+    rss = current_rss()
+    with _rss_lock:
+        peak = _rss_peaks.pop(key, None)
+    if peak is None:
+        return None
+    
+    return max(peak, rss)
+
+def _append(metrics_path, record):
+    # 한 번의 write 로 한 줄 기록 (O_APPEND), 여러 process / thread 에서 동시에 써도 줄이 섞이지 않음
+    
+    line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+    fd = os.open(metrics_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
+@contextmanager
+def stage(name, device_id=None, target_date=None, file_path=None, profile=False):
+    """
+    with stage("decode", device_id, target_date, path) as record:
+        record["records"] += ...
+    record: bytes_read / records / rows_written / skipped_bytes / io_*_seconds / rejected({reason: count}) 에 값을 더하면 함께 기록됨.
+    metrics / profile 설정이 없으면 측정하지 않음.
+    """
+    
+    record = {key: 0 for key in COUNTER_KEYS}
+    record["rejected"] = {}
+    
+    metrics_path = os.environ.get("RUN_METRICS_PATH")
+    profile_dir = os.environ.get("RUN_PROFILE_DIR") if profile else None
+    if metrics_path is None and profile_dir is None:
+        yield record
+        return
+    
+    profiler = None
+    if profile_dir is not None and threading.current_thread() is threading.main_thread():
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # 다른 profiler 가 이미 enable 된 경우 (Python 3.12+) 이 구간은 profile 하지 않음
+            profiler = None
+    depth = getattr(_local, "depth", 0)
+    outermost = device_id is not None and depth == 0 and os.environ.get("RUN_MAIN_PID") == str(os.getpid())
+    rss_key = object()
+    if metrics_path is not None:
+        _start_rss(rss_key)
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    
+    error = None
+    _local.depth = depth + (device_id is not None)
+    try:
+        yield record
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _local.depth = depth
+        if profiler is not None:
+            profiler.disable()
+            profile_name = ".".join(
+                str(part) for part in [name, device_id, target_date, file_path and os.path.basename(file_path), os.getpid()]
+                if part is not None
+            )
+            profiler.dump_stats(os.path.join(profile_dir, f"{profile_name}.{time.time_ns()}.prof"))
+        
+        if metrics_path is not None:
+            record.update({
+                "run": os.environ.get("RUN_NAME"),
+                "stage": name,
+                "device_id": device_id,
+                "date": target_date,
+                "file": file_path,
+                "pid": os.getpid(),
+                "end": datetime.now(ZoneInfo("Asia/Seoul")).isoformat(timespec="milliseconds"),
+                "outermost": outermost,
+                "wall_seconds": time.perf_counter() - wall_start,
+                "cpu_seconds": time.process_time() - cpu_start,
+                "stage_peak_rss_bytes": _stop_rss(rss_key) or 0,
+                "error": error,
+            })
+            _append(metrics_path, record)
+
+def load_records(metrics_path):
+    
+    with open(metrics_path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def summarize(records):
+    """
+    stage 별 합계 + 가장 오래 걸린 device (outermost stage 의 wall time 합계, 안쪽 stage / worker 의 시간은 중복되므로 제외)
+    Returns: {"stages": {stage: {...}}, "slowest_devices": [(device_id, wall_seconds), ...], "errors": n}
+    """
+    
+    stages = defaultdict(lambda: {"count": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0, "stage_peak_rss_bytes": 0,
+                                  "rejected": defaultdict(int), **{key: 0 for key in COUNTER_KEYS}})
+    device_seconds = defaultdict(float)
+    errors = 0
+    
+    for record in records:
+        summary = stages[record["stage"]]
+        summary["count"] += 1
+        summary["wall_seconds"] += record["wall_seconds"]
+        summary["cpu_seconds"] += record["cpu_seconds"]
+        summary["stage_peak_rss_bytes"] = max(summary["stage_peak_rss_bytes"], record.get("stage_peak_rss_bytes", 0))
+        for key in COUNTER_KEYS:
+            summary[key] += record.get(key, 0)
+        for reason, count in record.get("rejected", {}).items():
+            summary["rejected"][reason] += count
+        if record.get("outermost"):
+            device_seconds[record["device_id"]] += record["wall_seconds"]
+        errors += record.get("error") is not None
+    
+    return {
+        "stages": {name: {**summary, "rejected": dict(summary["rejected"])} for name, summary in stages.items()},
+        "slowest_devices": sorted(device_seconds.items(), key=lambda item: item[1], reverse=True)[:3],
+        "errors": errors,
+    }
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def write_prometheus(summary, run_name, prom_path):
+    # node_exporter textfile collector 형식
+    
+    metrics = [
+        ("stage_count", "count", "stage 실행 횟수"),
+        ("stage_wall_seconds", "wall_seconds", "stage wall time 합계"),
+        ("stage_cpu_seconds", "cpu_seconds", "stage CPU time 합계"),
+        ("stage_bytes_read", "bytes_read", "읽은 byte"),
+        ("stage_records", "records", "decoding / 처리한 record 수"),
+        ("stage_rows_written", "rows_written", "기록한 row 수"),
+        ("stage_skipped_bytes", "skipped_bytes", "salvage 시 건너뛴 byte"),
+        ("stage_io_read_seconds", "io_read_seconds", "read-ahead thread 가 읽는 데 쓴 시간"),
+        ("stage_io_stall_seconds", "io_stall_seconds", "read-ahead 결과를 기다린 시간"),
+        ("stage_peak_rss_bytes", "stage_peak_rss_bytes", "stage 구간 중 최대 RSS (sampling)"),
+    ]
+    
+    lines = []
+    for metric_name, key, help_text in metrics:
+        lines.append(f"# HELP {PROMETHEUS_PREFIX}_{metric_name} {help_text}")
+        lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{metric_name} gauge")
+        for stage_name, stage_summary in summary["stages"].items():
+            lines.append(
+                f'{PROMETHEUS_PREFIX}_{metric_name}{{run="{_escape_label(run_name)}",stage="{_escape_label(stage_name)}"}} '
+                f"{stage_summary[key]}"
+            )
+    
+    lines.append(f"# HELP {PROMETHEUS_PREFIX}_stage_rejected_records reject 된 record 수 (원인별)")
+    lines.append(f"# TYPE {PROMETHEUS_PREFIX}_stage_rejected_records gauge")
+    for stage_name, stage_summary in summary["stages"].items():
+        for reason, count in stage_summary["rejected"].items():
+            lines.append(
+                f'{PROMETHEUS_PREFIX}_stage_rejected_records{{run="{_escape_label(run_name)}",'
+                f'stage="{_escape_label(stage_name)}",reason="{_escape_label(reason)}"}} {count}'
+            )
+    
+    lines.append(f"# HELP {PROMETHEUS_PREFIX}_run_errors 에러로 끝난 stage 수")
+    lines.append(f"# TYPE {PROMETHEUS_PREFIX}_run_errors gauge")
+    lines.append(f'{PROMETHEUS_PREFIX}_run_errors{{run="{_escape_label(run_name)}"}} {summary["errors"]}')
+    lines.append(f"# HELP {PROMETHEUS_PREFIX}_run_last_finished_seconds 마지막 실행 종료 시각 (epoch)")
+    lines.append(f"# TYPE {PROMETHEUS_PREFIX}_run_last_finished_seconds gauge")
+    lines.append(f'{PROMETHEUS_PREFIX}_run_last_finished_seconds{{run="{_escape_label(run_name)}"}} {time.time():.0f}')
+    
+    _write_textfile(prom_path, lines)
+
+def _write_textfile(prom_path, lines):
+    # 수집 중 반쯤 쓴 파일이 읽히지 않도록 rename 으로 교체
+    
+    tmp_path = f"{prom_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, prom_path)
+
+def write_gauges(prom_path, gauges):
+    """
+    장시간 실행(watch 등)의 현재 상태를 Prometheus textfile 로 기록.
+    gauges: [(metric_name, help_text, {label: value}, value), ...] 같은 metric_name 은 연속으로
+    """
+    
+    lines = []
+    previous_name = None
+    for metric_name, help_text, labels, value in gauges:
+        if metric_name != previous_name:
+            lines.append(f"# HELP {PROMETHEUS_PREFIX}_{metric_name} {help_text}")
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{metric_name} gauge")
+            previous_name = metric_name
+        label_text = ",".join(f'{key}="{_escape_label(label)}"' for key, label in labels.items())
+        lines.append(f"{PROMETHEUS_PREFIX}_{metric_name}{{{label_text}}} {value}" if labels else f"{PROMETHEUS_PREFIX}_{metric_name} {value}")
+    
+    _write_textfile(prom_path, lines)
+
+def format_summary(summary, title):
+    # chat report 용 짧은 요약
+    
+    lines = [title]
+    for stage_name, stage_summary in summary["stages"].items():
+        line = (
+            f"- {stage_name}: {stage_summary['count']}건, {stage_summary['wall_seconds']:.1f}s "
+            f"(CPU {stage_summary['cpu_seconds']:.1f}s), {stage_summary['bytes_read'] / 1024**2:.1f} MB, "
+            f"records {stage_summary['records']:,}, rows {stage_summary['rows_written']:,}, "
+            f"peak RSS {stage_summary['stage_peak_rss_bytes'] / 1024**2:.0f} MB"
+        )
+        if stage_summary["io_read_seconds"]:
+            line += (
+                f", I/O stall {stage_summary['io_stall_seconds']:.1f}s / "
+                f"compute {stage_summary['wall_seconds'] - stage_summary['io_stall_seconds']:.1f}s "
+                f"(read {stage_summary['io_read_seconds']:.1f}s)"
+            )
+        if stage_summary["skipped_bytes"]:
+            line += f", skipped {stage_summary['skipped_bytes']:,} B"
+        if stage_summary["rejected"]:
+            line += ", rejected " + ", ".join(f"{reason} {count}" for reason, count in stage_summary["rejected"].items())
+        lines.append(line)
+    if summary["slowest_devices"]:
+        lines.append("- slowest: " + ", ".join(f"{device_id} {seconds:.1f}s" for device_id, seconds in summary["slowest_devices"]))
+    if summary["errors"]:
+        lines.append(f"- errors: {summary['errors']}")
+    
+    return "\n".join(lines)
+
+def finish(run_name, metrics_path=None):
+    """
+    이번 실행의 metrics 를 요약하여 Prometheus textfile 기록 후 요약 문자열 반환.
+    metrics 를 기록하지 않았으면 None
+    """
+    
+    metrics_path = metrics_path or os.environ.get("RUN_METRICS_PATH")
+    if metrics_path is None or not os.path.exists(metrics_path):
+        return None
+    
+    summary = summarize(load_records(metrics_path))
+    write_prometheus(summary, run_name, os.path.join(os.path.dirname(metrics_path), f"{run_name}.prom"))
+    
+    return format_summary(summary, f"[{run_name}] {os.path.basename(metrics_path)}")
+
+def latest_summary(run_name, metrics_dir=RUN_METRICS_DIR):
+    # 가장 최근 실행(run_name)의 요약, 없으면 None
+    
+    if metrics_dir is None:
+        return None
+    
+    metrics_paths = sorted(glob(os.path.join(escape(metrics_dir), f"{run_name}_*.jsonl")))
+    if not metrics_paths:
+        return None
+    
+    summary = summarize(load_records(metrics_paths[-1]))
+    
+    return format_summary(summary, f"[{run_name}] {os.path.basename(metrics_paths[-1])}")
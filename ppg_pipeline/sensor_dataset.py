@@ -0,0 +1,175 @@
+import os
+import glob
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import pyarrow.fs as pafs
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from dotenv import load_dotenv
+
+from . import parquet_profiles
+from .utils import REVERSE_SENSOR_TYPE_MAP, SENSOR_VALUE_COLUMNS, sensor_table_schema
+
+"""
+partition 된 sensor_data dataset
+- <SENSOR_DATASET_DIR>/device_id=<device>/date=<YYYY-MM-DD>/sensor_type=<SENSOR_TYPE>/part-0.parquet
+- 각 파일은 timestamp 순으로 정렬, row group 별 min/max 통계 + page index 로 시간 범위 조회 시 필요한 부분만 읽음
+- 파일에는 해당 sensor type 의 값 컬럼만 저장
+"""
+load_dotenv()
+
+PROCESSED_DATA_DIR = os.getenv("PROCESSED_DATA_DIR")
+SENSOR_DATASET_DIR = os.getenv(
+    "SENSOR_DATASET_DIR",
+    os.path.join(PROCESSED_DATA_DIR, "_dataset", "sensor_data") if PROCESSED_DATA_DIR else None,
+)
+
+# 1시간 PPG 조회 시 읽는 양을 줄이기 위한 row group 크기
+DATASET_ROW_GROUP_SIZE = 64 * 1024
+
+PARTITION_SCHEMA = pa.schema([
+    pa.field("device_id", pa.string()),
+    pa.field("date", pa.string()),
+    pa.field("sensor_type", pa.string()),
+])
+BASE_COLUMNS = ["file_index", "sequence", "timestamp"]
+KST = ZoneInfo("Asia/Seoul")
+
+
+def dataset_schema():
+    # 모든 sensor type 의 값 컬럼 + partition 컬럼
+    
+    schema = sensor_table_schema().remove(sensor_table_schema().get_field_index("sensor_type"))
+    for field in PARTITION_SCHEMA:
+        schema = schema.append(field)
+    
+    return schema
+
+def partition_dir(dataset_dir, device_id, target_date, sensor_type):
+    return os.path.join(dataset_dir, f"device_id={device_id}", f"date={target_date}", f"sensor_type={sensor_type}")
+
+def remove_sensor_partitions(device_id, target_date, dataset_dir=SENSOR_DATASET_DIR, keep=()):
+    # (device, date) 의 sensor type partition 파일 중 keep 에 없는 파일 제거 (재실행 시 새 partition 을 교체한 뒤 이전 결과 정리)
+    
+    for sensor_type in REVERSE_SENSOR_TYPE_MAP.values():
+        target_dir = partition_dir(dataset_dir, device_id, target_date, sensor_type)
+        for old_path in glob.glob(os.path.join(glob.escape(target_dir), "*.parquet")):
+            if old_path not in keep:
+                os.remove(old_path)
+
+def write_sensor_partitions(day_parquet_path, device_id, target_date, dataset_dir=SENSOR_DATASET_DIR,
+                            row_group_size=DATASET_ROW_GROUP_SIZE, write_profile=parquet_profiles.PARQUET_WRITE_PROFILE,
+                            staged=None):
+    """
+    columnar 형태의 하루 sensor_data parquet 을 sensor type 별로 나눠 timestamp 순으로 정렬하여 저장.
+    sensor type 하나씩 읽으므로 메모리는 (device, date, sensor_type) 하나 분량.
+    codec / encoding 은 write_profile 을 따르고, row group 은 조회용 크기(row_group_size) 사용.
+    새 partition 은 임시 파일에 먼저 기록, staged 가 없으면 모두 기록된 뒤 교체하고 이전 partition 중 남은 파일을 제거.
+    staged({최종 경로: 임시 경로})를 넘기면 임시 경로만 추가하고 교체 / 정리는 호출한 쪽에서 수행
+    (parquet_profiles.commit_staged 후 remove_sensor_partitions(..., keep=staged)).
+    Returns: {sensor_type: row 수}
+    """
+    
+    parquet_file = pq.ParquetFile(day_parquet_path)
+    metadata = parquet_file.schema_arrow.metadata
+    
+    commit = staged is None
+    staged = {} if commit else staged
+    
+    written = {}
+    try:
+        for type_value, sensor_type in REVERSE_SENSOR_TYPE_MAP.items():
+            columns = BASE_COLUMNS + SENSOR_VALUE_COLUMNS.get(type_value, [])
+            target_dir = partition_dir(dataset_dir, device_id, target_date, sensor_type)
+            
+            if type_value not in SENSOR_VALUE_COLUMNS:
+                continue
+            
+            table = pq.read_table(day_parquet_path, columns=columns, filters=[("sensor_type", "=", sensor_type)])
+            if table.num_rows == 0:
+                continue
+            
+            table = table.sort_by([("timestamp", "ascending"), ("file_index", "ascending"), ("sequence", "ascending")])
+            table = table.replace_schema_metadata(metadata)
+            
+            save_path = os.path.join(target_dir, "part-0.parquet")
+            staged[save_path] = parquet_profiles.staging_path(save_path)
+            parquet_profiles.write_table(
+                table, staged[save_path], write_profile,
+                row_group_size=row_group_size, write_statistics=True, write_page_index=True,
+            )
+            written[sensor_type] = table.num_rows
+    except Exception:
+        if commit:
+            parquet_profiles.discard_staged(staged)
+        raise
+    
+    if commit:
+        parquet_profiles.commit_staged(staged)
+        remove_sensor_partitions(device_id, target_date, dataset_dir, keep=staged)
+    
+    return written
+
+def _to_kst(time):
+    
+    if isinstance(time, str):
+        time = datetime.fromisoformat(time)
+    if time.tzinfo is None:
+        time = time.replace(tzinfo=KST)
+    
+    return time.astimezone(KST)
+
+def open_sensor_dataset(dataset_dir=SENSOR_DATASET_DIR):
+    # pyarrow.dataset 은 pandas 를 함께 불러오므로 조회할 때만 import (02_process_data.py 의 기록 경로에서는 불필요)
+    import pyarrow.dataset as ds
+    
+    return ds.dataset(
+        dataset_dir,
+        schema=dataset_schema(),
+        format="parquet",
+        partitioning=ds.partitioning(PARTITION_SCHEMA, flavor="hive"),
+        filesystem=pafs.LocalFileSystem(use_mmap=True),
+    )
+
+def read_sensor_data(device_ids, start_time, end_time, sensor_types=None, columns=None, dataset_dir=SENSOR_DATASET_DIR):
+    """
+    device / 시간 범위 [start_time, end_time) / sensor type / 컬럼을 지정하여 조회.
+    naive datetime 과 문자열은 KST 로 간주.
+    partition(device_id, date, sensor_type) 과 row group 의 timestamp 통계로 필요한 부분만 읽음.
+    """
+    
+    if isinstance(device_ids, str):
+        device_ids = [device_ids]
+    if isinstance(sensor_types, str):
+        sensor_types = [sensor_types]
+    
+    start_time = _to_kst(start_time)
+    end_time = _to_kst(end_time)
+    
+    # 자정 직전 파일의 record 가 다음 날짜로 넘어갈 수 있어 하루 앞 partition 까지 포함
+    date_list = []
+    current = start_time.date() - timedelta(days=1)
+    while current <= end_time.date():
+        date_list.append(current.strftime("%Y-%m-%d"))
+        current += timedelta(days=1)
+    
+    timestamp_type = pa.timestamp("ms", tz="Asia/Seoul")
+    expression = (
+        pc.field("device_id").isin(list(device_ids))
+        & pc.field("date").isin(date_list)
+        & (pc.field("timestamp") >= pa.scalar(start_time, type=timestamp_type))
+        & (pc.field("timestamp") < pa.scalar(end_time, type=timestamp_type))
+    )
+    if sensor_types is not None:
+        expression &= pc.field("sensor_type").isin(list(sensor_types))
+    
+    if columns is None and sensor_types is not None:
+        type_codes = {sensor_type: type_value for type_value, sensor_type in REVERSE_SENSOR_TYPE_MAP.items()}
+        columns = ["device_id", "sensor_type"] + BASE_COLUMNS
+        for sensor_type in sensor_types:
+            columns += SENSOR_VALUE_COLUMNS.get(type_codes[sensor_type], [])
+    
+    dataset = open_sensor_dataset(dataset_dir)
+    
+    return dataset.to_table(columns=columns, filter=expression)
@@ -0,0 +1,216 @@
+import os
+import json
+import glob
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from collections import defaultdict
+from dotenv import load_dotenv
+
+from .utils import REVERSE_SENSOR_TYPE_MAP, EXPECTED_SAMPLE_RATES_HZ
+from .upload_index import parse_entry_name
+
+"""
+sensor_data 시간 / sensor type 별 수집 품질
+- decoding 한 record 의 timestamp 로 파일마다 계산 (다시 읽지 않음), decoding 결과 table 의 schema metadata(quality)로 전달
+    - cache 된 결과에도 같이 저장되므로 cache hit 이어도 그대로 사용
+- sensor_quality/<date>.parquet : 시간(hour) / sensor type 별 sample 수, 기대 sample 수, 최대 timestamp 간격, 순서가 뒤바뀐 / 중복 timestamp 수
+    + sensor_type 이 null 인 row : 해당 시간 파일 수, 제외된 record / byte, decoding 중단 수
+- 01_upload_check.py 는 파일 수 대신 이 결과로 수집 시간을 판단 (없으면 파일 수)
+"""
+load_dotenv()
+
+PROCESSED_DATA_DIR = os.getenv("PROCESSED_DATA_DIR")
+# 기대 sample 의 이 비율 이상 수집된 시간만 수집된 것으로 봄
+QUALITY_MIN_COVERAGE = float(os.getenv("QUALITY_MIN_COVERAGE", 0.5))
+# 수집 시간 판단 기준 sensor type
+QUALITY_SENSOR_TYPE = "SAMSUNG_PPG"
+
+QUALITY_METADATA_KEY = b"quality"
+HOUR_MS = 3600 * 1000
+KST = ZoneInfo("Asia/Seoul")
+
+
+def quality_schema():
+    
+    return pa.schema([
+        pa.field("hour", pa.timestamp("ms", tz="Asia/Seoul")),
+        pa.field("sensor_type", pa.string()),
+        pa.field("files", pa.int32()),
+        pa.field("samples", pa.int64()),
+        pa.field("expected", pa.int64()),
+        pa.field("max_gap_ms", pa.int64()),
+        pa.field("out_of_order", pa.int64()),
+        pa.field("duplicates", pa.int64()),
+        pa.field("rejected_records", pa.int64()),
+        pa.field("rejected_bytes", pa.int64()),
+        pa.field("decode_errors", pa.int32()),
+    ])
+
+def file_quality(blocks, error_info, sensor_data_path, file_size):
+    """
+    decode_binary 결과 하나의 품질.
+    Returns: {"hour": 파일 이름의 시간(ms, 없으면 None), "rejected_records", "rejected_bytes", "decode_errors",
+              "types": [[sensor_type, hour(ms), samples, max_gap_ms, out_of_order, duplicates], ...]}
+    """
+    
+    target_date, target_hour = parse_entry_name("sensor_data", os.path.basename(sensor_data_path))
+    file_hour = None
+    if target_date is not None:
+        hour_start = datetime.strptime(target_date, "%Y-%m-%d").replace(hour=target_hour, tzinfo=KST)
+        file_hour = int(hour_start.timestamp() * 1000)
+    
+    quality = {"hour": file_hour, "rejected_records": 0, "rejected_bytes": 0, "decode_errors": 0, "types": []}
+    if error_info is not None:
+        if "skipped_spans" in error_info:
+            quality["rejected_records"] = error_info["estimated_skipped_records"] + error_info["rejected_records"]
+            quality["rejected_bytes"] = error_info["skipped_bytes"]
+        else:
+            # salvage 가 아니면 에러 위치 이후는 decoding 하지 않음
+            quality["rejected_bytes"] = file_size - error_info["pos"]
+            quality["decode_errors"] = 1
+    
+    if not blocks:
+        return quality
+    
+    sequence = np.concatenate([block["sequence"] for block in blocks])
+    order = np.argsort(sequence, kind="stable")
+    sensor_type = np.concatenate([block["sensor_type"] for block in blocks])[order]
+    collected_ts = np.concatenate([block["collected_ts"] for block in blocks]).astype(np.int64)[order]
+    
+    for type_value in np.unique(sensor_type).tolist():
+        timestamps = collected_ts[sensor_type == type_value]
+        
+        # 파일 순서에서 이전 record 보다 앞선 timestamp
+        backward = timestamps[1:][np.diff(timestamps) < 0]
+        
+        sorted_ts = np.sort(timestamps)
+        gaps = np.diff(sorted_ts, prepend=sorted_ts[:1])
+        hours, starts, samples = np.unique(sorted_ts // HOUR_MS, return_index=True, return_counts=True)
+        
+        max_gap = np.maximum.reduceat(gaps, starts)
+        duplicates = np.add.reduceat((gaps == 0).astype(np.int64), starts)
+        # 첫 sample 은 비교 대상이 없음
+        duplicates[0] -= 1
+        out_of_order = np.bincount(np.searchsorted(hours, backward // HOUR_MS), minlength=len(hours))
+        
+        for row in zip(hours.tolist(), samples.tolist(), max_gap.tolist(), out_of_order.tolist(), duplicates.tolist()):
+            hour, *values = row
+            quality["types"].append([REVERSE_SENSOR_TYPE_MAP[type_value], hour * HOUR_MS, *values])
+    
+    return quality
+
+def with_quality(table, quality):
+    # decoding 결과 table 의 schema metadata 에 품질 기록
+    
+    metadata = dict(table.schema.metadata or {})
+    metadata[QUALITY_METADATA_KEY] = json.dumps(quality).encode("utf-8")
+    
+    return table.replace_schema_metadata(metadata)
+
+def table_quality(table):
+    # with_quality 로 기록한 품질, 없으면 None
+    
+    value = (table.schema.metadata or {}).get(QUALITY_METADATA_KEY)
+    
+    return json.loads(value) if value is not None else None
+
+def quality_table(qualities):
+    """
+    파일별 품질을 하루 table 로 합침 (같은 시간 / sensor type 은 합산, max_gap_ms 는 최대값).
+    """
+    
+    type_rows = defaultdict(lambda: [0, 0, 0, 0])
+    hour_rows = defaultdict(lambda: [0, 0, 0, 0, 0])
+    
+    for quality in qualities:
+        if quality is None:
+            continue
+        for sensor_type, hour, samples, max_gap, out_of_order, duplicates in quality["types"]:
+            row = type_rows[(hour, sensor_type)]
+            row[0] += samples
+            row[1] = max(row[1], max_gap)
+            row[2] += out_of_order
+            row[3] += duplicates
+            # 파일 이름에 시간이 없으면 sample 의 시간에 합계
+            if quality["hour"] is None:
+                hour_rows[hour][1] += samples
+            else:
+                hour_rows[quality["hour"]][1] += samples
+        if quality["hour"] is not None or quality["types"]:
+            hour = quality["hour"] if quality["hour"] is not None else quality["types"][0][1]
+            row = hour_rows[hour]
+            row[0] += 1
+            row[2] += quality["rejected_records"]
+            row[3] += quality["rejected_bytes"]
+            row[4] += quality["decode_errors"]
+    
+    type_codes = {sensor_type: type_value for type_value, sensor_type in REVERSE_SENSOR_TYPE_MAP.items()}
+    rows = []
+    for hour, (files, samples, rejected_records, rejected_bytes, decode_errors) in hour_rows.items():
+        rows.append((hour, None, files, samples, None, None, None, None, rejected_records, rejected_bytes, decode_errors))
+    for (hour, sensor_type), (samples, max_gap, out_of_order, duplicates) in type_rows.items():
+        rate = EXPECTED_SAMPLE_RATES_HZ.get(type_codes[sensor_type])
+        expected = round(rate * 3600) if rate is not None else None
+        rows.append((hour, sensor_type, None, samples, expected, max_gap, out_of_order, duplicates, None, None, None))
+    rows.sort(key=lambda row: (row[0], row[1] or ""))
+    
+    schema = quality_schema()
+    columns = list(zip(*rows)) if rows else [[] for _ in schema]
+    
+    return pa.table(
+        [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+        schema=schema,
+    )
+
+def quality_path(device_id, target_date, processed_dir=PROCESSED_DATA_DIR):
+    return os.path.join(processed_dir, device_id, "sensor_quality", f"{target_date}.parquet")
+
+def load_quality(device_id, target_date, processed_dir=PROCESSED_DATA_DIR):
+    """
+    (device, date) 의 품질 table.
+    02_process_data.py 결과가 없으면 watch_uploads.py 의 live 파일 metadata 를 합침, 둘 다 없으면 None.
+    """
+    
+    path = quality_path(device_id, target_date, processed_dir)
+    if os.path.exists(path):
+        return pq.read_table(path)
+    
+    live_paths = sorted(glob.glob(os.path.join(
+        glob.escape(os.path.join(processed_dir, device_id, "sensor_data_live", target_date)), "[!_]*.parquet"
+    )))
+    if not live_paths:
+        return None
+    
+    qualities = []
+    for live_path in live_paths:
+        value = (pq.read_schema(live_path).metadata or {}).get(QUALITY_METADATA_KEY)
+        qualities.append(json.loads(value) if value is not None else None)
+    
+    return quality_table(qualities)
+
+def summarize_quality(table, target_date, sensor_type=QUALITY_SENSOR_TYPE, min_coverage=QUALITY_MIN_COVERAGE):
+    """
+    하루 품질 요약 (upload check / chat report 용).
+    collected_hours: target_date 의 시간 중 sensor_type 의 sample 이 기대 sample * min_coverage 이상인 시간
+    """
+    
+    rows = table.to_pylist()
+    day_rows = [row for row in rows if row["hour"].astimezone(KST).strftime("%Y-%m-%d") == target_date]
+    type_rows = [row for row in day_rows if row["sensor_type"] == sensor_type]
+    hour_rows = [row for row in day_rows if row["sensor_type"] is None]
+    
+    return {
+        "collected_hours": sorted(
+            row["hour"].astimezone(KST).hour for row in type_rows
+            if row["expected"] and row["samples"] >= row["expected"] * min_coverage
+        ),
+        "file_hours": sorted(row["hour"].astimezone(KST).hour for row in hour_rows if row["files"]),
+        "max_gap_ms": max((row["max_gap_ms"] for row in type_rows), default=0),
+        "out_of_order": sum(row["out_of_order"] for row in day_rows if row["sensor_type"] is not None),
+        "duplicates": sum(row["duplicates"] for row in day_rows if row["sensor_type"] is not None),
+        "rejected_records": sum(row["rejected_records"] for row in hour_rows),
+        "decode_errors": sum(row["decode_errors"] for row in hour_rows),
+    }
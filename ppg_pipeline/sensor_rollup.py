@@ -0,0 +1,271 @@
+import os
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from dotenv import load_dotenv
+
+from .utils import REVERSE_SENSOR_TYPE_MAP, EXPECTED_SAMPLE_RATES_HZ
+
+"""
+분 단위 rollup table
+- sensor_rollup/<date>.parquet : device / 분 별 sensor type 마다 sample 수, 기대 sample 대비 부족한 수, 최대 sample 간격
+    + 심박(hr_value) / 온도(temp_0) mean/min/max, PPG 채널별 mean/std/min/max
+- samsung_health_rollup/<date>.parquet : device / 분 / category 별 record 수, value sum/mean/min/max (start_time 기준)
+- 하루 sensor_data 전체를 읽지 않고 모니터링 / QA 조회 (read_rollups)
+"""
+load_dotenv()
+
+PROCESSED_DATA_DIR = os.getenv("PROCESSED_DATA_DIR")
+
+# rollup 컬럼 이름 prefix, 기대 sampling rate(Hz, None 이면 부족 sample 수를 계산하지 않음)
+ROLLUP_SENSOR_TYPES = {
+    type_value: (prefix, EXPECTED_SAMPLE_RATES_HZ.get(type_value))
+    for type_value, prefix in [(1001, "ppg"), (1003, "gyro"), (1004, "hr"), (1005, "temp"), (1006, "acc"), (1010, "ibi")]
+}
+# (sensor type, 값 컬럼, legacy data index, 통계)
+ROLLUP_VALUES = [
+    (1004, "hr_value", 0, ["mean", "min", "max"]),
+    (1005, "temp_0", 0, ["mean", "min", "max"]),
+    (1001, "ppg_0", 0, ["mean", "std", "min", "max"]),
+    (1001, "ppg_1", 1, ["mean", "std", "min", "max"]),
+    (1001, "ppg_2", 2, ["mean", "std", "min", "max"]),
+]
+ROLLUP_KINDS = {
+    "sensor": "sensor_rollup",
+    "samsung_health": "samsung_health_rollup",
+}
+MINUTE_MS = 60 * 1000
+KST = ZoneInfo("Asia/Seoul")
+
+
+def _stat_name(column_name, stat):
+    # hr_value -> hr_mean, temp_0 -> temp_mean, ppg_0 -> ppg_0_mean
+    
+    if column_name in ("hr_value", "temp_0"):
+        return f"{column_name.split('_')[0]}_{stat}"
+    
+    return f"{column_name}_{stat}"
+
+def sensor_rollup_schema():
+    
+    fields = [
+        pa.field("device_id", pa.string()),
+        pa.field("minute", pa.timestamp("ms", tz="Asia/Seoul")),
+    ]
+    for prefix, rate in ROLLUP_SENSOR_TYPES.values():
+        fields.append(pa.field(f"{prefix}_count", pa.int32()))
+        if rate is not None:
+            fields.append(pa.field(f"{prefix}_missing", pa.int32()))
+        fields.append(pa.field(f"{prefix}_max_gap_ms", pa.int32()))
+    for _, column_name, _, stats in ROLLUP_VALUES:
+        fields += [pa.field(_stat_name(column_name, stat), pa.float32()) for stat in stats]
+    
+    return pa.schema(fields)
+
+def samsung_health_rollup_schema():
+    
+    return pa.schema([
+        pa.field("device_id", pa.string()),
+        pa.field("minute", pa.timestamp("ms", tz="Asia/Seoul")),
+        pa.field("category", pa.string()),
+        pa.field("count", pa.int32()),
+        pa.field("value_sum", pa.float64()),
+        pa.field("value_mean", pa.float64()),
+        pa.field("value_min", pa.float64()),
+        pa.field("value_max", pa.float64()),
+    ])
+
+def _read_sensor_columns(sensor_parquet_path):
+    """
+    하루 sensor_data parquet(legacy / columnar) 에서 rollup 에 필요한 컬럼만 읽어 sensor type 별로 나눔.
+    Returns: {type_value: (timestamp(ms) int64 array, {값 컬럼: float64 array})}
+    """
+    
+    schema = pq.read_schema(sensor_parquet_path)
+    legacy = "data" in schema.names
+    value_columns = sorted({column_name for _, column_name, _, _ in ROLLUP_VALUES})
+    columns = ["sensor_type", "timestamp"] + (["data"] if legacy else value_columns)
+    table = pq.read_table(sensor_parquet_path, columns=columns)
+    
+    sensor_type = table["sensor_type"]
+    if not legacy:
+        sensor_type = sensor_type.cast(pa.string())
+    timestamp = table["timestamp"]
+    if not legacy:
+        timestamp = timestamp.cast(pa.int64())
+    
+    result = {}
+    for type_value in ROLLUP_SENSOR_TYPES:
+        mask = pc.equal(sensor_type, REVERSE_SENSOR_TYPE_MAP[type_value])
+        timestamps = pc.filter(timestamp, mask).to_numpy()
+        if len(timestamps) == 0:
+            continue
+        
+        values = {}
+        for value_type, column_name, data_index, _ in ROLLUP_VALUES:
+            if value_type != type_value:
+                continue
+            if legacy:
+                column = pc.list_element(pc.filter(table["data"], mask), data_index)
+            else:
+                column = pc.filter(table[column_name], mask)
+            values[column_name] = column.to_numpy(zero_copy_only=False).astype(np.float64)
+        result[type_value] = (timestamps, values)
+    
+    return result
+
+def _group_reduce(ufunc, values, starts, num_groups, group_index):
+    # minute 순으로 정렬된 values 를 group 별로 reduce, 값이 없는 분은 NaN
+    
+    out = np.full(num_groups, np.nan)
+    if len(values):
+        out[group_index] = ufunc.reduceat(values, starts)
+    
+    return out
+
+def rollup_sensor_data(sensor_parquet_path, device_id):
+    """
+    하루 sensor_data parquet 의 분 단위 rollup table.
+    sample 이 하나라도 있는 분만 포함 (잘못된 timestamp 가 있어도 table 이 커지지 않음), 수집이 끊긴 분은 row 가 없음.
+    max_gap_ms 는 해당 분의 sample 과 직전 sample(이전 분 포함) 사이 간격의 최대값.
+    """
+    
+    schema = sensor_rollup_schema()
+    sensor_columns = _read_sensor_columns(sensor_parquet_path)
+    if not sensor_columns:
+        return schema.empty_table()
+    
+    minutes = np.unique(np.concatenate([timestamps // MINUTE_MS for timestamps, _ in sensor_columns.values()]))
+    num_minutes = len(minutes)
+    
+    columns = {
+        "device_id": pa.array([device_id] * num_minutes, type=pa.string()),
+        "minute": pa.array(minutes * MINUTE_MS).cast(pa.timestamp("ms", tz="Asia/Seoul")),
+    }
+    for type_value, (prefix, rate) in ROLLUP_SENSOR_TYPES.items():
+        timestamps, values = sensor_columns.get(type_value, (np.empty(0, dtype=np.int64), {}))
+        
+        order = np.argsort(timestamps, kind="stable")
+        timestamps = timestamps[order]
+        minute_index = np.searchsorted(minutes, timestamps // MINUTE_MS)
+        count = np.bincount(minute_index, minlength=num_minutes)
+        
+        # 정렬된 sample 에서 분이 바뀌는 위치
+        group_index = np.flatnonzero(count)
+        starts = np.concatenate([[0], np.cumsum(count[group_index])[:-1]]).astype(np.int64)
+        
+        gaps = np.diff(timestamps, prepend=timestamps[:1])
+        max_gap = np.nan_to_num(_group_reduce(np.maximum, gaps, starts, num_minutes, group_index)).astype(np.int64)
+        
+        columns[f"{prefix}_count"] = pa.array(count, type=pa.int32())
+        if rate is not None:
+            missing = np.clip(int(np.ceil(rate * 60)) - count, 0, None)
+            columns[f"{prefix}_missing"] = pa.array(missing, type=pa.int32())
+        columns[f"{prefix}_max_gap_ms"] = pa.array(max_gap, type=pa.int32())
+        
+        for value_type, column_name, _, stats in ROLLUP_VALUES:
+            if value_type != type_value:
+                continue
+            value = values.get(column_name, np.empty(0))[order]
+            value_sum = np.bincount(minute_index, weights=value, minlength=num_minutes)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean = value_sum / count
+                variance = np.bincount(minute_index, weights=value * value, minlength=num_minutes) / count - mean * mean
+            computed = {
+                "mean": mean,
+                "std": np.sqrt(np.clip(variance, 0, None)),
+                "min": _group_reduce(np.minimum, value, starts, num_minutes, group_index),
+                "max": _group_reduce(np.maximum, value, starts, num_minutes, group_index),
+            }
+            for stat in stats:
+                columns[_stat_name(column_name, stat)] = pa.array(
+                    computed[stat].astype(np.float32), type=pa.float32(), from_pandas=True,
+                )
+    
+    return pa.table(columns, schema=schema)
+
+def rollup_samsung_health(result, device_id):
+    """
+    process_samsung_health_dir 결과(legacy DataFrame / nested {data_kind: pa.Table})의 분 / category 별 rollup.
+    구간 record(수면, 운동 등)는 start_time 이 속한 분에 집계.
+    """
+    import pandas as pd
+    
+    schema = samsung_health_rollup_schema()
+    if isinstance(result, dict):
+        result = result["samsung_health"].select(["category", "start_time", "value"]).to_pandas()
+    if len(result) == 0 or "start_time" not in result:
+        return schema.empty_table()
+    
+    frame = pd.DataFrame({
+        "category": result["category"],
+        "minute": pd.to_datetime(result["start_time"], utc=True, format="ISO8601").dt.floor("min"),
+        "value": pd.to_numeric(result["value"], errors="coerce"),
+    })
+    rollup = frame.groupby(["minute", "category"], sort=True)["value"].agg(["size", "sum", "mean", "min", "max"])
+    rollup = rollup.reset_index()
+    
+    columns = {
+        "device_id": pa.array([device_id] * len(rollup), type=pa.string()),
+        "minute": pa.array(rollup["minute"]).cast(pa.timestamp("ms", tz="Asia/Seoul")),
+        "category": pa.array(rollup["category"], type=pa.string()),
+        "count": pa.array(rollup["size"], type=pa.int32()),
+        "value_sum": pa.array(rollup["sum"].where(rollup["mean"].notna()), type=pa.float64(), from_pandas=True),
+        "value_mean": pa.array(rollup["mean"], type=pa.float64(), from_pandas=True),
+        "value_min": pa.array(rollup["min"], type=pa.float64(), from_pandas=True),
+        "value_max": pa.array(rollup["max"], type=pa.float64(), from_pandas=True),
+    }
+    
+    return pa.table(columns, schema=schema)
+
+def rollup_path(device_id, kind, target_date, processed_dir=PROCESSED_DATA_DIR):
+    return os.path.join(processed_dir, device_id, ROLLUP_KINDS[kind], f"{target_date}.parquet")
+
+def _to_kst(time):
+    
+    if isinstance(time, str):
+        time = datetime.fromisoformat(time)
+    if time.tzinfo is None:
+        time = time.replace(tzinfo=KST)
+    
+    return time.astimezone(KST)
+
+def read_rollups(device_ids, start_time, end_time, kind="sensor", columns=None, processed_dir=PROCESSED_DATA_DIR):
+    """
+    device / 시간 범위 [start_time, end_time) 의 rollup 조회 (kind: sensor | samsung_health).
+    naive datetime 과 문자열(YYYY-MM-DD 포함)은 KST 로 간주.
+    """
+    import pyarrow.dataset as ds
+    
+    if isinstance(device_ids, str):
+        device_ids = [device_ids]
+    
+    start_time = _to_kst(start_time)
+    end_time = _to_kst(end_time)
+    schema = sensor_rollup_schema() if kind == "sensor" else samsung_health_rollup_schema()
+    
+    # 자정 직전 파일의 record 가 다음 날짜로 넘어갈 수 있어 하루 앞 날짜까지 포함
+    paths = []
+    for device_id in device_ids:
+        current = start_time.date() - timedelta(days=1)
+        while current <= end_time.date():
+            path = rollup_path(device_id, kind, current.strftime("%Y-%m-%d"), processed_dir)
+            if os.path.exists(path):
+                paths.append(path)
+            current += timedelta(days=1)
+    
+    if not paths:
+        table = schema.empty_table()
+        return table.select(columns) if columns is not None else table
+    
+    timestamp_type = pa.timestamp("ms", tz="Asia/Seoul")
+    expression = (
+        (pc.field("minute") >= pa.scalar(start_time, type=timestamp_type))
+        & (pc.field("minute") < pa.scalar(end_time, type=timestamp_type))
+    )
+    table = ds.dataset(paths, schema=schema, format="parquet").to_table(columns=columns, filter=expression)
+    
+    return table
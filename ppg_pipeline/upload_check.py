@@ -0,0 +1,420 @@
+import os
+import json
+import pickle
+import argparse
+
+from glob import glob
+from dotenv import load_dotenv
+from functools import lru_cache
+from collections import defaultdict, Counter
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from . import job_store
+from . import run_metrics
+from . import sensor_quality
+from .utils import scan_har_label_dates, scan_sensor_structure
+from .upload_index import UploadIndex
+
+load_dotenv()
+
+RAW_DATA_DIR = os.getenv("RAW_DATA_DIR")
+# package 의 상위 디렉토리 (repo 에서 실행할 때 repo 의 user_device_table.csv, 설치한 경우 USER_DEVICE_CSV_PATH 로 지정)
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CSV_PATH = os.getenv("USER_DEVICE_CSV_PATH", os.path.join(REPO_DIR, "user_device_table.csv"))
+
+WEBHOOK_KEY = os.getenv("WEBHOOK_KEY")
+WEBHOOK_TOKEN = os.getenv("WEBHOOK_TOKEN")
+# 하루 중 sensor_data 가 수집된 시간이 이 이상이어야 유효
+MIN_COLLECTED_HOURS = 6
+# 이 시각 이전에는 전날을 report 날짜로 봄 (그날 업로드가 끝나는 시각)
+DEFAULT_CUTOFF_HOUR = 16
+
+@lru_cache(maxsize=None)
+def read_user_device_table(csv_path):
+    # (User_Id, Device_Id) tuple, 한 process 에서 여러번 호출해도 csv 는 한번만 읽음
+    import pandas as pd
+    
+    df = pd.read_csv(csv_path)
+    df = df[df["Device_Id"] != "c5ad2c27_a90f2adb"]
+    df = df[df["Note"] != "test기기"]
+    # df = df[df["Note"] == "test기기"] # TODO: for debugging
+    df = df.drop(columns=["Note"])
+    
+    return tuple(zip(df['User_Id'], df['Device_Id']))
+
+def parse_user2device(csv_path, reverse=False):
+    
+    rows = read_user_device_table(csv_path)
+    if reverse:
+        table = {device_id: user_id for user_id, device_id in rows}
+    else:
+        table = {user_id: device_id for user_id, device_id in rows}
+    
+    return table
+
+def make_date_list(start_date: datetime=None, end_date: datetime=None, exclude: set[str]=None,
+                   cutoff_hour: int=DEFAULT_CUTOFF_HOUR):
+    
+    if start_date is None:
+        today = datetime.today()
+        start_date = today - timedelta(days=today.weekday())
+    
+    today = datetime.today() if end_date is None else end_date
+    
+    current = today if today.hour >= cutoff_hour else today-timedelta(days=1)
+    
+    date_set = set()
+    while current.date() >= start_date.date():
+        date_set.add(current.strftime("%Y-%m-%d"))
+        current -= timedelta(days=1)
+    
+    if exclude is not None:
+        date_set -= exclude
+    
+    return set(sorted(date_set))
+
+def send_to_chat(message):
+    from httplib2 import Http
+    
+    app_message = {"text": message}
+    url = f"https://chat.googleapis.com/v1/spaces/AAQA9ue2i9I/messages?key={WEBHOOK_KEY}&token={WEBHOOK_TOKEN}"
+    message_headers = {"Content-Type": "application/json; charset=UTF-8"}
+    http_obj = Http()
+    response = http_obj.request(
+        uri=url,
+        method="POST",
+        headers=message_headers,
+        body=json.dumps(app_message),
+    )
+    print(response[0].get("status"))
+
+def check_device(target_device_id, date_set, backfill=False, index=None, metrics=None, scan_structure=True):
+    # metrics(run_metrics.stage record)가 있으면 읽은 har_label byte / 확인한 sensor_data 파일 수 기록
+    # scan_structure 이면 date_set 의 sensor_data 파일 header 구조를 확인하여 잘린 / 깨진 파일 기록, record 가 없는 파일은 수집 시간에서 제외
+    
+    date_obj_list = [datetime.strptime(ds, "%Y-%m-%d") for ds in date_set]
+    week_start_date = min(date_obj_list)
+    last_date = max(date_obj_list)
+    
+    device_dict = {}
+    target_device_dir = os.path.join(RAW_DATA_DIR, target_device_id)
+    
+    if index is not None:
+        index.refresh(target_device_id)
+    
+    for spec_dir in ["har_label", "sensor_data", "samsung_health"]:
+        
+        target_dir = os.path.join(target_device_dir, spec_dir)
+        
+        if index is None:
+            # 없으면 넘어가진 말고, 뒤에서 메세지 보낼때 처리
+            if not os.path.exists(target_dir):
+                os.makedirs(target_dir, exist_ok=True)
+            
+            filenames = os.listdir(target_dir)
+        
+        if spec_dir == "har_label":
+            if index is not None:
+                date_har_dict = index.har_label_files(target_device_id)
+            else:
+                date_har_dict = {datetime.strptime(filename.split("_")[0],"%y%m%d"):filename for filename in filenames}
+            if backfill:
+                # har_label 파일은 생성일부터 일주일간 누적됨
+                check_filenames = [
+                    filename for file_date, filename in date_har_dict.items()
+                    if week_start_date - timedelta(days=7) < file_date <= last_date
+                ]
+            elif date_har_dict:
+                check_filenames = [date_har_dict[max(date_har_dict)]]
+            else:
+                # har_label 이 하나도 없으면 모든 날짜가 missing
+                check_filenames = []
+            
+            collected_har_label_date = set()
+            for check_filename in check_filenames:
+                check_path = os.path.join(target_dir, check_filename)
+                if index is not None:
+                    collected_har_label_date |= index.har_label_dates(check_path)
+                else:
+                    collected_har_label_date |= scan_har_label_dates(check_path)[0]
+                    if metrics is not None:
+                        metrics["bytes_read"] += os.path.getsize(check_path)
+            
+            device_dict[f"{spec_dir}"] = sorted(date_set - collected_har_label_date)
+        
+        elif spec_dir == "sensor_data":
+            date_hour_dict = defaultdict(set)
+            collected_sensor_data_date_list = []
+            if index is not None:
+                sensor_files = index.sensor_files(target_device_id, week_start_date.strftime("%Y-%m-%d"))
+            else:
+                sensor_files = []
+                filenames = sorted(filenames)
+                for filename in filenames[::-1]:
+                    _, _, date, hour = filename.split(".")[0].split("_")
+                    if datetime.strptime(date, "%Y-%m-%d") < week_start_date :
+                        break
+                    sensor_files.append((date, int(hour), filename))
+            
+            # 업로드 중 잘렸거나 깨진 파일 (값은 decoding 하지 않고 header 만 따라감, index 가 있으면 바뀐 파일만 읽음)
+            structure_dict = defaultdict(dict)
+            date_hour_list = []
+            for date, hour, filename in sensor_files:
+                if scan_structure and date in date_set:
+                    check_path = os.path.join(target_dir, filename)
+                    if index is not None:
+                        structure = index.sensor_structure(check_path)
+                    else:
+                        structure = scan_sensor_structure(check_path)
+                        if metrics is not None:
+                            metrics["bytes_read"] += structure["file_size"]
+                    if structure["status"] != "ok":
+                        structure_dict[date][hour] = {
+                            key: structure[key] for key in ["status", "file_size", "end_pos", "records", "details"]
+                        }
+                    if structure["records"] == 0:
+                        continue
+                date_hour_list.append((date, hour))
+            
+            for date, hour in date_hour_list:
+                collected_sensor_data_date_list.append(date)
+                date_hour_dict[date].add(hour)
+            if metrics is not None:
+                metrics["records"] += len(date_hour_list)
+            
+            # 02_process_data.py / watch_uploads.py 가 기록한 수집 품질이 있으면 파일 수 대신 PPG 가 충분히 수집된 시간으로 판단
+            quality_dict = {}
+            for date in sorted(date_set):
+                quality_table = sensor_quality.load_quality(target_device_id, date)
+                if quality_table is not None:
+                    quality_dict[date] = sensor_quality.summarize_quality(quality_table, date)
+            
+            valid_collected_date = {
+                date for date, count in dict(Counter(collected_sensor_data_date_list)).items()
+                if count >= MIN_COLLECTED_HOURS and date not in quality_dict
+            }
+            valid_collected_date |= {
+                date for date, quality in quality_dict.items() if len(quality["collected_hours"]) >= MIN_COLLECTED_HOURS
+            }
+            # valid_collected_date = set(collected_har_label_date)  # TODO: for debugging
+            
+            device_dict[f"{spec_dir}"] = sorted(date_set - valid_collected_date)
+            sorted_date_hour_dict = dict(sorted(date_hour_dict.items(), key=lambda x: datetime.strptime(x[0], "%Y-%m-%d")))
+            device_dict[f"collected-{spec_dir}-hour"] = sorted_date_hour_dict
+            device_dict[f"quality-{spec_dir}"] = quality_dict
+            device_dict[f"structure-{spec_dir}"] = dict(structure_dict)
+        
+        else: # samsung_health
+            if index is not None:
+                collected_samsung_health_date = index.samsung_health_dates(target_device_id)
+            else:
+                collected_samsung_health_date = set(filenames)
+            device_dict[f"{spec_dir}"] = sorted(set(date_set) - set(collected_samsung_health_date))
+    
+    return device_dict
+
+def catch_missing_data(target_device_ids, date_set=None, index=None, workers=1, scan_structure=True,
+                       cutoff_hour=DEFAULT_CUTOFF_HOUR):
+    """
+    date_set 이 없으면 이번 주(make_date_list, cutoff_hour 이전이면 어제까지) 기준으로 체크.
+    date_set 을 주면(backfill) 해당 날짜들을 포함할 수 있는 har_label 파일을 모두 확인.
+    index(UploadIndex) 를 주면 디렉토리를 매번 listing 하지 않고 index 를 갱신한 뒤 query로 계산.
+    workers > 1 이면 device 별 체크를 thread pool에서 동시에 수행.
+    scan_structure 이면 sensor_data 파일마다 header 구조를 확인 (utils.scan_sensor_structure).
+    체크 중 에러가 난 device는 {"error": "<에러 메세지>"} 로 기록하고 나머지 device는 계속 체크.
+    """
+    
+    # today = datetime.now()
+    # target_date = today if today.hour >= 16 else today-timedelta(days=1)
+    
+    missing_date_dict = defaultdict(dict)
+    backfill = date_set is not None
+    if not backfill:
+        date_set = make_date_list(cutoff_hour=cutoff_hour)
+    
+    from tqdm import tqdm
+    
+    def _check(target_device_id):
+        try:
+            with run_metrics.stage("upload_check", target_device_id, profile=True) as metrics:
+                return check_device(
+                    target_device_id, date_set, backfill=backfill, index=index, metrics=metrics, scan_structure=scan_structure,
+                )
+        except Exception as e:
+            return {"error": f"{type(e).__name__}: {e}"}
+    
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            future_to_id = {executor.submit(_check, target_device_id): target_device_id for target_device_id in target_device_ids}
+            progress = tqdm(as_completed(future_to_id), total=len(future_to_id))
+            results = {}
+            for future in progress:
+                progress.set_description(f"Device-> {future_to_id[future]}")
+                results[future_to_id[future]] = future.result()
+    else:
+        progress = tqdm(target_device_ids)
+        results = {}
+        for target_device_id in progress:
+            progress.set_description(f"Device-> {target_device_id}")
+            results[target_device_id] = _check(target_device_id)
+    
+    for target_device_id in target_device_ids:
+        missing_date_dict[target_device_id] = results[target_device_id]
+    
+    return missing_date_dict
+
+def main(save_pkl=False, use_index=True, full_rescan=False, device_ids=None, workers=1, store_url=None,
+         metrics_dir=run_metrics.RUN_METRICS_DIR, profile_dir=run_metrics.RUN_PROFILE_DIR, scan_structure=True,
+         target_date=None, cutoff_hour=DEFAULT_CUTOFF_HOUR):
+    """
+    target_date(YYYY-MM-DD) 의 업로드 report. 없으면 오늘 (cutoff_hour 이전이면 어제).
+    target_date 를 주면(watch_uploads.py 의 cutoff 처리 등) 실행 시각과 관계없이 그 날짜만 체크 (backfill 과 같은 방식).
+    """
+    
+    run_metrics.configure("upload_check", metrics_dir, profile_dir)
+    
+    user2device = parse_user2device(CSV_PATH)
+    device2user = parse_user2device(CSV_PATH, reverse=True)
+    if target_date is None:
+        today = datetime.today()
+        target_date_str = (today if today.hour >= cutoff_hour else today - timedelta(days=1)).strftime("%Y-%m-%d")
+        date_set = None
+    else:
+        target_date_str = datetime.strptime(target_date, "%Y-%m-%d").strftime("%Y-%m-%d")
+        date_set = {target_date_str}
+    
+    target_device_ids = list(user2device.values()) if device_ids is None else list(device_ids)
+    
+    if use_index:
+        with UploadIndex(RAW_DATA_DIR) as index:
+            if full_rescan:
+                for target_device_id in target_device_ids:
+                    index.refresh(target_device_id, full=True)
+            missing_date_dict = catch_missing_data(
+                target_device_ids, date_set=date_set, index=index, workers=workers, scan_structure=scan_structure,
+                cutoff_hour=cutoff_hour,
+            )
+    else:
+        missing_date_dict = catch_missing_data(
+            target_device_ids, date_set=date_set, workers=workers, scan_structure=scan_structure, cutoff_hour=cutoff_hour,
+        )
+    message = f"Missing Data Report: {target_date_str}\n{'='*40}"
+    exclude_key = ["samsung_health"]
+    
+    message_dict = defaultdict(list)
+    
+    invalid_ids = set()
+    quality_lines = []
+    structure_lines = []
+    
+    for device_id, device_dict in missing_date_dict.items():
+        if "error" in device_dict:
+            message_dict["error"].append(device_id)
+            invalid_ids.add(device_id)
+            continue
+        for inner_key, inner_date_list in device_dict.items():
+            if inner_key in exclude_key:
+                continue
+            elif inner_key == "collected-sensor_data-hour":
+                # TODO
+                continue
+            elif inner_key == "quality-sensor_data":
+                # 파일은 있지만 PPG 가 부족한 시간, decoding 에서 제외된 record 가 있는 device
+                quality = inner_date_list.get(target_date_str)
+                if quality is not None and (
+                    len(quality["collected_hours"]) < len(quality["file_hours"])
+                    or quality["rejected_records"] or quality["decode_errors"]
+                ):
+                    quality_lines.append(
+                        f"{device2user.get(device_id)}({device_id}): "
+                        f"PPG {len(quality['collected_hours'])}/{len(quality['file_hours'])}h, "
+                        f"max gap {quality['max_gap_ms'] / 1000:.0f}s, "
+                        f"out of order {quality['out_of_order']}, duplicates {quality['duplicates']}, "
+                        f"rejected {quality['rejected_records']}, decode errors {quality['decode_errors']}"
+                    )
+                continue
+            elif inner_key == "structure-sensor_data":
+                # 업로드 중 잘렸거나 깨진 sensor_data 파일
+                structure = inner_date_list.get(target_date_str)
+                if structure:
+                    structure_lines.append(
+                        f"{device2user.get(device_id)}({device_id}): " + ", ".join(
+                            f"{hour:02d}h {file_structure['status']} ({file_structure['end_pos']}/{file_structure['file_size']} bytes)"
+                            for hour, file_structure in sorted(structure.items())
+                        )
+                    )
+                continue
+            if target_date_str in inner_date_list:
+                message_dict[inner_key].append(device_id)
+                invalid_ids.add(device_id)
+    
+    missing_date_dict["valid_data"] = {
+        "date": target_date_str,
+        "device_ids": set(target_device_ids) - invalid_ids,
+    }
+    
+    
+    if save_pkl:
+        with open("upload_check.pkl", "wb") as f:
+            pickle.dump(missing_date_dict, f, pickle.HIGHEST_PROTOCOL)
+    
+    # 02_process_data.py worker 들이 claim 할 수 있도록 유효한 (device, date) 등록 (이미 처리한 항목은 그대로)
+    if store_url is not None:
+        valid_device_dates = [(device_id, target_date_str) for device_id in sorted(missing_date_dict["valid_data"]["device_ids"])]
+        with job_store.open_job_store(store_url) as store:
+            enqueued = store.enqueue(valid_device_dates, job_store.PROCESS_STAGE)
+        print(f"Enqueued: {enqueued}/{len(valid_device_dates)} (device, date)")
+    
+    for data_type, device_id_list in message_dict.items():
+        message += f"\n{data_type}\n\n{', '.join([f'{device2user.get(device_id)}({device_id})' for device_id in device_id_list])}\n{'-'*40}"
+    if structure_lines:
+        message += f"\nsensor_data-structure\n\n" + "\n".join(structure_lines) + f"\n{'-'*40}"
+    if quality_lines:
+        message += f"\nsensor_data-quality\n\n" + "\n".join(quality_lines) + f"\n{'-'*40}"
+    
+    # 이번 업로드 체크 + 마지막 전처리 실행 요약
+    for summary in [run_metrics.finish("upload_check"), run_metrics.latest_summary("process_data", metrics_dir)]:
+        if summary is not None:
+            message += f"\n{summary}\n{'-'*40}"
+    
+    print(message)
+    send_to_chat(message)
+
+def build_parser(parser=None):
+    
+    parser = parser or argparse.ArgumentParser()
+    parser.add_argument("--no-index", action="store_true",
+                        help="upload index(SQLite) 없이 매번 디렉토리를 listing")
+    parser.add_argument("--full-rescan", action="store_true",
+                        help="디렉토리 mtime 과 관계없이 index 를 다시 읽음")
+    parser.add_argument("--device-ids", nargs="*", default=None,
+                        help="체크할 device (기본: user_device_table.csv 의 전체 device)")
+    parser.add_argument("--target-date", default=None,
+                        help="report 날짜 YYYY-MM-DD (기본: 오늘, --cutoff-hour 이전이면 어제)")
+    parser.add_argument("--cutoff-hour", type=int, default=DEFAULT_CUTOFF_HOUR,
+                        help="--target-date 가 없을 때 이 시각 이전이면 어제를 report 날짜로 사용")
+    parser.add_argument("--workers", type=int, default=8,
+                        help="device 별 체크를 동시에 수행할 thread 수")
+    parser.add_argument("--job-store", default=job_store.JOB_STORE_URL,
+                        help="유효한 (device, date) 를 등록할 작업 상태 저장소 (JOB_STORE_URL)")
+    parser.add_argument("--no-structure-scan", action="store_true",
+                        help="sensor_data 파일 header 구조(잘림 / 깨짐) 확인 생략")
+    parser.add_argument("--metrics-dir", default=run_metrics.RUN_METRICS_DIR,
+                        help="stage 별 측정값(JSON lines / Prometheus textfile) 저장 경로 (RUN_METRICS_DIR)")
+    parser.add_argument("--profile-dir", default=run_metrics.RUN_PROFILE_DIR,
+                        help="device 별 체크 구간 cProfile 결과 저장 경로 (RUN_PROFILE_DIR)")
+    
+    return parser
+
+def run(args, parser=None):
+    
+    main(
+        save_pkl=True, use_index=not args.no_index, full_rescan=args.full_rescan,
+        device_ids=args.device_ids, workers=args.workers, store_url=args.job_store,
+        metrics_dir=args.metrics_dir, profile_dir=args.profile_dir, scan_structure=not args.no_structure_scan,
+        target_date=args.target_date, cutoff_hour=args.cutoff_hour,
+    )
+
+if __name__ == "__main__":
+    run(build_parser().parse_args())
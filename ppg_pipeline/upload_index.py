@@ -0,0 +1,232 @@
+import os
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from dotenv import load_dotenv
+
+from .utils import scan_har_label_dates, scan_sensor_structure
+
+"""
+RAW_DATA_DIR 업로드 파일 index (SQLite)
+- files : device / 데이터 종류 / 파일명 / 날짜 / 시간 / 크기 / mtime
+- dirs  : 마지막으로 읽은 디렉토리 mtime, 바뀌지 않은 디렉토리는 다시 listing 하지 않음
+- sensor_structure : sensor_data 파일의 header 구조 확인 결과 (utils.scan_sensor_structure), 크기 / mtime 이 같으면 재사용
+"""
+load_dotenv()
+
+UPLOAD_INDEX_PATH = os.getenv("UPLOAD_INDEX_PATH", "upload_index.sqlite")
+SPEC_DIRS = ["har_label", "sensor_data", "samsung_health"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    device_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    date TEXT,
+    hour INTEGER,
+    size INTEGER,
+    mtime_ns INTEGER,
+    PRIMARY KEY (device_id, kind, name)
+);
+CREATE INDEX IF NOT EXISTS files_date ON files (device_id, kind, date);
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS har_label_dates (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    resume_offset INTEGER NOT NULL,
+    check_bytes BLOB NOT NULL,
+    dates TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sensor_structure (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    result TEXT NOT NULL
+);
+"""
+# append 여부 확인용으로 resume_offset 직전 몇 바이트를 저장
+HAR_CHECK_BYTES = 64
+
+
+def parse_entry_name(kind, name):
+    # 파일명에서 (date, hour) 추출, 형식이 다르면 (None, None)
+    
+    try:
+        if kind == "har_label":
+            return datetime.strptime(name.split("_")[0], "%y%m%d").strftime("%Y-%m-%d"), None
+        elif kind == "sensor_data":
+            _, _, date, hour = name.split(".")[0].split("_")
+            datetime.strptime(date, "%Y-%m-%d")
+            return date, int(hour)
+        else: # samsung_health : 날짜 디렉토리
+            datetime.strptime(name, "%Y-%m-%d")
+            return name, None
+    except ValueError:
+        return None, None
+
+class UploadIndex:
+    
+    def __init__(self, raw_data_dir, index_path=UPLOAD_INDEX_PATH):
+        
+        self.raw_data_dir = raw_data_dir
+        self.index_path = index_path
+        # 여러 thread에서 같이 사용 (디렉토리 scan은 lock 밖, DB 접근만 lock 안에서)
+        self.conn = sqlite3.connect(index_path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.RLock()
+    
+    def close(self):
+        self.conn.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def refresh(self, device_id, full=False):
+        """
+        device 의 디렉토리 중 mtime 이 바뀐 것만 scandir 하여 추가/삭제/변경된 항목을 반영.
+        full=True 이면 디렉토리 mtime 과 관계없이 다시 읽음 (파일 내용만 바뀐 경우 등).
+        Returns: 다시 읽은 디렉토리 수
+        """
+        
+        refreshed = 0
+        for kind in SPEC_DIRS:
+            target_dir = os.path.join(self.raw_data_dir, device_id, kind)
+            
+            try:
+                dir_mtime_ns = os.stat(target_dir).st_mtime_ns
+            except FileNotFoundError:
+                dir_mtime_ns = None
+            
+            with self.lock:
+                row = self.conn.execute("SELECT mtime_ns FROM dirs WHERE path = ?", (target_dir,)).fetchone()
+            if not full and row is not None and dir_mtime_ns is not None and row[0] == dir_mtime_ns:
+                continue
+            
+            current = {}
+            if dir_mtime_ns is not None:
+                with os.scandir(target_dir) as entries:
+                    for entry in entries:
+                        stat = entry.stat()
+                        current[entry.name] = (stat.st_size, stat.st_mtime_ns)
+            
+            with self.lock:
+                indexed = {
+                    name: (size, mtime_ns)
+                    for name, size, mtime_ns in self.conn.execute(
+                        "SELECT name, size, mtime_ns FROM files WHERE device_id = ? AND kind = ?", (device_id, kind)
+                    )
+                }
+                
+                removed = [(device_id, kind, name) for name in indexed.keys() - current.keys()]
+                changed = [
+                    (device_id, kind, name, *parse_entry_name(kind, name), size, mtime_ns)
+                    for name, (size, mtime_ns) in current.items()
+                    if indexed.get(name) != (size, mtime_ns)
+                ]
+                
+                with self.conn:
+                    self.conn.executemany("DELETE FROM files WHERE device_id = ? AND kind = ? AND name = ?", removed)
+                    self.conn.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)", changed)
+                    if dir_mtime_ns is None:
+                        self.conn.execute("DELETE FROM dirs WHERE path = ?", (target_dir,))
+                    else:
+                        self.conn.execute("INSERT OR REPLACE INTO dirs VALUES (?, ?)", (target_dir, dir_mtime_ns))
+            
+            refreshed += 1
+        
+        return refreshed
+    
+    def har_label_files(self, device_id):
+        # {파일 날짜(datetime): 파일명}
+        
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT date, name FROM files WHERE device_id = ? AND kind = 'har_label' AND date IS NOT NULL ORDER BY name",
+                (device_id,),
+            ).fetchall()
+        return {datetime.strptime(date, "%Y-%m-%d"): name for date, name in rows}
+    
+    def sensor_files(self, device_id, start_date):
+        # start_date(YYYY-MM-DD) 이후 sensor_data 파일의 (date, hour, 파일명) 목록
+        
+        with self.lock:
+            return self.conn.execute(
+                "SELECT date, hour, name FROM files WHERE device_id = ? AND kind = 'sensor_data' AND date >= ? ORDER BY name DESC",
+                (device_id, start_date),
+            ).fetchall()
+    
+    def samsung_health_dates(self, device_id):
+        
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT name FROM files WHERE device_id = ? AND kind = 'samsung_health'", (device_id,)
+            ).fetchall()
+        return {name for name, in rows}
+    
+    def har_label_dates(self, path):
+        """
+        har_label 파일의 timeString 날짜 set.
+        크기 / mtime 이 그대로면 stat 한번으로 cache 반환, 파일 뒤에 추가만 된 경우 추가된 부분만 scan.
+        """
+        
+        stat = os.stat(path)
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT size, mtime_ns, resume_offset, check_bytes, dates FROM har_label_dates WHERE path = ?", (path,)
+            ).fetchone()
+        
+        if row is not None:
+            size, mtime_ns, resume_offset, check_bytes, dates = row
+            if (size, mtime_ns) == (stat.st_size, stat.st_mtime_ns):
+                return set(json.loads(dates))
+        
+        dates, start = set(), 0
+        if row is not None and stat.st_size > size:
+            with open(path, "rb") as f:
+                f.seek(resume_offset - len(check_bytes))
+                if f.read(len(check_bytes)) == check_bytes:
+                    dates, start = set(json.loads(row[4])), resume_offset
+        
+        new_dates, resume_offset = scan_har_label_dates(path, start=start)
+        dates |= new_dates
+        
+        with open(path, "rb") as f:
+            check_start = max(0, resume_offset - HAR_CHECK_BYTES)
+            f.seek(check_start)
+            check_bytes = f.read(resume_offset - check_start)
+        
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO har_label_dates VALUES (?, ?, ?, ?, ?, ?)",
+                (path, stat.st_size, stat.st_mtime_ns, resume_offset, check_bytes, json.dumps(sorted(dates))),
+            )
+        
+        return dates
+    
+    def sensor_structure(self, path):
+        # utils.scan_sensor_structure 결과, 크기 / mtime 이 그대로면 파일을 다시 읽지 않음
+        
+        stat = os.stat(path)
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT size, mtime_ns, result FROM sensor_structure WHERE path = ?", (path,)
+            ).fetchone()
+        if row is not None and tuple(row[:2]) == (stat.st_size, stat.st_mtime_ns):
+            return json.loads(row[2])
+        
+        result = scan_sensor_structure(path)
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sensor_structure VALUES (?, ?, ?, ?)",
+                (path, stat.st_size, stat.st_mtime_ns, json.dumps(result)),
+            )
+        
+        return result
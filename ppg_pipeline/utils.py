@@ -0,0 +1,1123 @@
+import io
+import os
+import re
+import json
+import mmap
+import bisect
+import struct
+import isodate
+import numpy as np
+import pyarrow as pa
+from zoneinfo import ZoneInfo
+from functools import lru_cache
+from contextlib import nullcontext
+from datetime import datetime, timedelta, timezone
+
+#### For decoding binary files
+
+MAGIC_HEADER = 0x53454E53
+REVERSE_SENSOR_TYPE_MAP = {
+    1001: "SAMSUNG_PPG",
+    1002: "ACCELEROMETER", 
+    1003: "GYROSCOPE",
+    1004: "SAMSUNG_HEART_RATE",
+    1005: "SAMSUNG_TEMP",
+    1006: "SAMSUNG_ACCE",
+    1007: "SAMSUNG_ECG",
+    1008: "LIGHT",
+    1009: "TYPE_STEP_COUNTER",
+    1010: "SAMSUNG_IBI"
+}
+DATA_SIZE_CHECK_DICT = {
+    1001: 3,
+    1003: 3,
+    1004: 2,
+    1005: 2,
+    1006: 3,
+    1010: 0,
+    # 1002, 1007, 1008, 1009 Sensors are not collected
+}
+# 기대 sampling rate(Hz), 없는 sensor type(IBI 등)은 수집 간격이 일정하지 않음
+EXPECTED_SAMPLE_RATES_HZ = {
+    1001: 25,
+    1003: 25,
+    1004: 1,
+    1005: 1 / 60,
+    1006: 25,
+}
+# columnar 출력에서 sensor type 별로 사용하는 float32 컬럼 (DATA_SIZE_CHECK_DICT 폭 기준)
+SENSOR_VALUE_COLUMNS = {
+    1001: ["ppg_0", "ppg_1", "ppg_2"],
+    1003: ["gyro_x", "gyro_y", "gyro_z"],
+    1004: ["hr_value", "hr_status"],
+    1005: ["temp_0", "temp_1"],
+    1006: ["acc_x", "acc_y", "acc_z"],
+    1010: [],
+}
+
+#### For decoding binary files
+
+def format_timestamp(timestamp: int) -> str:
+    try:
+        dt = datetime.fromtimestamp(timestamp / 1000)
+        return dt.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+    except (ValueError, OSError):
+        return f"Invalid timestamp: {timestamp}"
+
+def format_timestamps(timestamps):
+    """
+    format_timestamp 의 vectorized 버전 (ms timestamp 배열 -> pa.string 배열, decode_binary 가 허용하는 13자리 epoch ms 에서 결과 동일).
+    "초" 까지의 문자열은 고유한 초마다 한번씩만 만들고, ".ms" 는 숫자 byte 로 붙임.
+    """
+    
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    num_rows = len(timestamps)
+    seconds, inverse = np.unique(timestamps // 1000, return_inverse=True)
+    
+    prefixes = []
+    for second in seconds.tolist():
+        try:
+            prefix = datetime.fromtimestamp(second).strftime("%Y-%m-%d %H:%M:%S").encode("ascii")
+        except (ValueError, OSError, OverflowError):
+            prefix = b""
+        # 연도가 4자리가 아니면 format_timestamp 로 따로 처리
+        prefixes.append(prefix if len(prefix) == 19 else b"")
+    prefix_valid = np.array([len(prefix) == 19 for prefix in prefixes], dtype=bool)
+    prefix_bytes = np.frombuffer(
+        b"".join(prefix or b"0" * 19 for prefix in prefixes), dtype=np.uint8,
+    ).reshape(len(prefixes), 19)
+    
+    millis = timestamps % 1000
+    chars = np.empty((num_rows, 23), dtype=np.uint8)
+    chars[:, :19] = prefix_bytes[inverse]
+    chars[:, 19] = ord(".")
+    chars[:, 20] = ord("0") + millis // 100
+    chars[:, 21] = ord("0") + millis // 10 % 10
+    chars[:, 22] = ord("0") + millis % 10
+    value_offsets = np.arange(0, 23 * (num_rows + 1), 23, dtype=np.int32)
+    strings = pa.StringArray.from_buffers(num_rows, pa.py_buffer(value_offsets), pa.py_buffer(chars))
+    
+    row_valid = prefix_valid[inverse]
+    if row_valid.all():
+        return strings
+    
+    strings = strings.to_pylist()
+    for index in np.flatnonzero(~row_valid).tolist():
+        strings[index] = format_timestamp(int(timestamps[index]))
+    
+    return pa.array(strings, type=pa.string())
+
+def parse_file_header(file_header):
+    
+    if len(file_header) != 16:
+        raise ValueError(f"Invalid header size: {len(file_header)}") 
+    
+    magic_header, format_version, creation_time = struct.unpack("> I I Q", file_header)
+    
+    if magic_header != MAGIC_HEADER:
+        raise ValueError(f"Invalid magic header: {hex(magic_header)}")
+    
+    return format_version, creation_time
+
+def parse_batch(file):
+    
+    data_size_check_dict = DATA_SIZE_CHECK_DICT
+    
+    def _check_valid(sensor_type, collected_ts, acc, data_size):
+        if sensor_type not in REVERSE_SENSOR_TYPE_MAP:
+            return False, {
+                "at": "sensor_type",
+                "got": sensor_type,
+                "expected": f"{REVERSE_SENSOR_TYPE_MAP.keys()}"
+            }
+        
+        if not(len(str(collected_ts)) == 13 and 1e12 <= collected_ts <= 2e12):
+            return False, {
+                "at": "collected_ts",
+                "got": collected_ts,
+                "len": len(str(collected_ts)),
+                "expected": "13-digits epoch millis in [1e12, 2e12]"
+            }
+        
+        if acc != 0:
+            return False, {
+                "at": "accuracy",
+                "got": acc,
+                "expected": 0
+            }
+        
+        check_size = data_size_check_dict.get(sensor_type)
+        if check_size is None:
+            return False, {
+                "at": "data_size check",
+                "got": sensor_type,
+                "expected": f"{data_size_check_dict.keys()}"
+            }
+        
+        else:
+            if sensor_type == 1004:
+                if data_size < check_size:
+                    return False, {
+                        "at": "data_size_min",
+                        "got": data_size,
+                        "expected": "length of HeartRate needs at least 2"
+                    }
+            elif sensor_type == 1010:
+                if data_size == check_size:
+                    return True, {
+                        "at": "data_size",
+                        "got": data_size,
+                        "expected": "valid ibi data size, but continue"
+                    }
+            elif data_size != check_size:
+                return False, {
+                    "at": "data_size",
+                    "got": data_size,
+                    "expected": f"check_size"
+                }
+        
+        return True, None
+    
+    start_pos = file.tell()
+    fixed_part = file.read(20)
+    if len(fixed_part) < 20:
+        return None, {
+            "at": "fixed_part",
+            "pos": start_pos,
+            "got": len(fixed_part),
+            "expected": "length of fixed_part needs at least 20"
+        }
+    
+    sensor_type, collected_ts, accuracy, data_size = struct.unpack(">I Q I I", fixed_part)
+    
+    valid, fail_log = _check_valid(sensor_type, collected_ts, accuracy, data_size)
+    if not valid:
+        return False, fail_log
+    
+    value_bytes = file.read(data_size * 4)
+    if len(value_bytes) < data_size * 4:
+        return False, {
+            "at": "value_bytes",
+            "pos": start_pos,
+            "got": f"{len(value_bytes)}",
+            "expected": f"{data_size * 4}"
+        }
+    
+    values = struct.unpack(f">{data_size}f", value_bytes)
+    
+    return {
+        "sensor_type": sensor_type,
+        "collected_ts": collected_ts,
+        "values": values
+    }, None
+
+def save_error_info(file_path, error_info):
+    # salvage 결과(skipped_spans)가 있으면 건너뛴 구간마다 한 줄씩 기록
+    
+    today = datetime.now(ZoneInfo("Asia/Seoul")).strftime("%y%m%d")
+    error_save_path = os.path.basename(file_path) + ".errors.jsonl"
+    error_save_path = os.path.join("test", today, error_save_path)
+    os.makedirs(os.path.dirname(error_save_path), exist_ok=True)
+    with open(error_save_path, "w", encoding="utf-8") as f:
+        for line_info in error_info.get("skipped_spans") or [error_info]:
+            f.write(json.dumps(line_info, ensure_ascii=False) + "\n")
+
+def _process_binary_python(file_path):
+    
+    invalid_file_flag = False
+    error_info = None
+    
+    with open(file_path, "rb") as file:
+        
+        data_sequence = 0
+        file_header = file.read(16)
+        format_version, creation_time = parse_file_header(file_header)
+        
+        sensor_record_list = []
+        while True:
+            if invalid_file_flag:
+                break
+            # before_tmp_sensor = {}        # TODO: for debugging
+            
+            batch_header = file.read(12)
+            if len(batch_header) < 12:
+                break
+            
+            batch_size, batch_timestamp = struct.unpack(">I Q", batch_header)
+            
+            if batch_size <= 0 or batch_size > 10000:
+                raise ValueError(f"Invalid batch_size: {batch_size}")
+            
+            for i in range(batch_size):
+                rec_pos = file.tell()
+                # if rec_pos == 7333536:            # TODO: for debugging
+                #     print(1)
+                sensor_data, err = parse_batch(file)
+                if not sensor_data:
+                    error_info = {
+                        "file_path": file_path,
+                        "batch_timestamp": batch_timestamp,
+                        "record_index": i,
+                        "pos": rec_pos,
+                        "timestamp": datetime.now(ZoneInfo("Asia/Seoul")).isoformat(timespec="milliseconds")
+                    }
+                    if err:
+                        error_info["details"] = err
+                    print("Error detected:", error_info)
+                    invalid_file_flag = True
+                    break
+                elif err is not None:
+                    # for passing dummy ibi data
+                    continue
+                
+                # before_tmp_sensor[i] = sensor_data   # TODO: for debugging
+                sensor_type_str = REVERSE_SENSOR_TYPE_MAP[sensor_data.get("sensor_type")]
+                collected_time = format_timestamp(sensor_data.get("collected_ts"))
+                record = {
+                    "file_path": file_path,
+                    "sequence": data_sequence,
+                    "sensor_type": sensor_type_str,
+                    "data": sensor_data.get("values"),
+                    "collected_time": collected_time,
+                    "timestamp": sensor_data.get("collected_ts")
+                }
+                sensor_record_list.append(record)
+                
+                data_sequence += 1
+    
+    if error_info is not None:
+        save_error_info(file_path, error_info)
+    
+    return sensor_record_list
+
+#### Vectorized decoding engine
+# record header만 따라가며 record 위치를 찾고, 값 decoding과 검증은 data_size 별로 묶어서 numpy로 처리
+
+RECORD_HEADER_DTYPE = np.dtype([
+    ("sensor_type", ">u4"),
+    ("collected_ts", ">u8"),
+    ("accuracy", ">u4"),
+    ("data_size", ">u4"),
+])
+RECORD_HEADER_SIZE = 20
+BATCH_HEADER_SIZE = 12
+GATHER_CHUNK_SIZE = 1 << 16
+
+_unpack_batch_header = struct.Struct(">I Q").unpack_from
+_unpack_data_size = struct.Struct(">I").unpack_from
+
+def valid_record_mask(sensor_type, collected_ts, accuracy, data_size):
+    # parse_batch._check_valid 의 규칙을 array mask로 적용
+    
+    size_ok = np.zeros(len(sensor_type), dtype=bool)
+    for check_type, check_size in DATA_SIZE_CHECK_DICT.items():
+        is_type = sensor_type == check_type
+        if check_type == 1004:
+            size_ok |= is_type & (data_size >= check_size)
+        elif check_type == 1010:
+            # ibi는 data_size와 관계없이 통과 (기존 parse_batch와 동일)
+            size_ok |= is_type
+        else:
+            size_ok |= is_type & (data_size == check_size)
+    
+    ts_ok = (collected_ts >= 10**12) & (collected_ts <= 2 * 10**12)
+    
+    return size_ok & ts_ok & (accuracy == 0)
+
+def _gather_bytes(raw, offsets, width):
+    # offsets 위치에서 width 바이트씩 잘라 (n, width) uint8 array로 반환
+    
+    out = np.empty((len(offsets), width), dtype=np.uint8)
+    if width == 0:
+        return out
+    
+    columns = np.arange(width, dtype=np.int64)
+    for chunk_start in range(0, len(offsets), GATHER_CHUNK_SIZE):
+        chunk = offsets[chunk_start:chunk_start + GATHER_CHUNK_SIZE]
+        out[chunk_start:chunk_start + len(chunk)] = raw[chunk[:, None] + columns]
+    
+    return out
+
+def _walk_records(buffer, file_size, pos=16):
+    """
+    pos(batch header)부터 batch / record header를 따라가며 record 시작 위치만 수집.
+    Returns: (offsets, batch_starts, stop)
+        batch_starts: [(첫 record 번호, batch_timestamp), ...]
+        stop: None | ("batch_size", batch_size, pos) | ("record", pos)
+    """
+    
+    offsets = []
+    append = offsets.append
+    batch_starts = []
+    stop = None
+    
+    while stop is None and file_size - pos >= BATCH_HEADER_SIZE:
+        batch_size, batch_timestamp = _unpack_batch_header(buffer, pos)
+        if batch_size <= 0 or batch_size > 10000:
+            stop = ("batch_size", batch_size, pos)
+            break
+        
+        pos += BATCH_HEADER_SIZE
+        batch_starts.append((len(offsets), batch_timestamp))
+        for _ in range(batch_size):
+            if file_size - pos < RECORD_HEADER_SIZE:
+                stop = ("record", pos)
+                break
+            next_pos = pos + RECORD_HEADER_SIZE + _unpack_data_size(buffer, pos + 16)[0] * 4
+            if next_pos > file_size:
+                stop = ("record", pos)
+                break
+            append(pos)
+            pos = next_pos
+    
+    return np.array(offsets, dtype=np.int64), batch_starts, stop
+
+#### Salvage (corrupt 파일에서 다음 정상 header 를 찾아 이어서 decoding)
+
+# sensor type 은 big-endian 으로 00 00 03 xx, 이 prefix 로 후보를 먼저 거름
+RESYNC_TYPE_PREFIXES = sorted({sensor_type >> 8 for sensor_type in DATA_SIZE_CHECK_DICT})
+RESYNC_MAX_DATA_SIZE = 64
+RESYNC_MIN_CHUNK_SIZE = 1 << 12
+RESYNC_CHUNK_SIZE = 1 << 20
+
+def _sound_record_mask(headers, positions, file_size):
+    """
+    구조상 record header 로 보이는지 (sensor type 범위, timestamp, accuracy, 파일 안에 들어가는 data_size).
+    sensor type / data_size 조합 검사는 valid_record_mask 에서 따로 하므로 수집하지 않는 sensor type 도 통과.
+    """
+    
+    data_sizes = headers["data_size"].astype(np.int64)
+    
+    return (
+        np.isin(headers["sensor_type"] >> 8, RESYNC_TYPE_PREFIXES)
+        & (headers["collected_ts"] >= 10**12) & (headers["collected_ts"] <= 2 * 10**12)
+        & (headers["accuracy"] == 0)
+        & (data_sizes <= RESYNC_MAX_DATA_SIZE)
+        & (positions + RECORD_HEADER_SIZE + data_sizes * 4 <= file_size)
+    )
+
+def _word_headers(words, positions):
+    # 4 bytes 단위 위치(positions)의 record header 필드, words 는 파일 전체의 big-endian uint32 view
+    
+    return {
+        "sensor_type": words[positions],
+        "collected_ts": (words[positions + 1].astype(np.uint64) << np.uint64(32)) | words[positions + 2],
+        "accuracy": words[positions + 3],
+        "data_size": words[positions + 4],
+    }
+
+def _fast_walk_records(buffer, file_size):
+    """
+    _walk_records 와 같은 결과를 python loop 없이 계산 (file / batch / record header 는 모두 4 bytes 단위 위치).
+    record header 로 보이는 위치를 한번에 찾은 뒤, 각 record 의 끝이 다음 record / batch header 와 이어지는지 확인.
+    이어지지 않는 곳(잘못된 record, 값 bytes 가 header 처럼 보이는 경우 등)이 있으면 None (_walk_records 로 확인).
+    """
+    
+    words = np.frombuffer(buffer, dtype=">u4", count=file_size // 4)
+    if len(words) < 12:
+        return None
+    
+    # word i 가 record header 이면 i+3 은 accuracy(0)
+    candidate = words[10:-1] == 0
+    type_prefix = words[7:-4] >> 8
+    candidate &= np.logical_or.reduce([type_prefix == prefix for prefix in RESYNC_TYPE_PREFIXES])
+    positions = 7 + np.flatnonzero(candidate)
+    headers = _word_headers(words, positions)
+    sound = _sound_record_mask(headers, positions * 4, file_size)
+    positions = positions[sound]
+    headers = {name: values[sound] for name, values in headers.items()}
+    if len(positions) == 0 or positions[0] != 7:
+        return None
+    
+    ends = positions + 5 + headers["data_size"].astype(np.int64)
+    gaps = positions[1:] - ends[:-1]
+    if not ((gaps == 0) | (gaps == BATCH_HEADER_SIZE // 4)).all():
+        return None
+    
+    first_indices = np.concatenate([[0], np.flatnonzero(gaps) + 1])
+    header_words = np.concatenate([[4], ends[first_indices[1:] - 1]])
+    batch_sizes = words[header_words].astype(np.int64)
+    counts = np.diff(np.append(first_indices, len(positions)))
+    if (batch_sizes > 10000).any() or (batch_sizes[:-1] != counts[:-1]).any() or counts[-1] > batch_sizes[-1]:
+        return None
+    
+    stop = None
+    end = int(ends[-1]) * 4
+    if counts[-1] < batch_sizes[-1]:
+        # 마지막 batch 의 나머지 record 가 파일 안에 들어가지 않아야 _walk_records 와 같음
+        if file_size - end >= RECORD_HEADER_SIZE and end + RECORD_HEADER_SIZE + _unpack_data_size(buffer, end + 16)[0] * 4 <= file_size:
+            return None
+        stop = ("record", end)
+    elif file_size - end >= BATCH_HEADER_SIZE:
+        return None
+    
+    batch_timestamps = (words[header_words + 1].astype(np.int64) << 32) | words[header_words + 2].astype(np.int64)
+    
+    return positions * 4, list(zip(first_indices.tolist(), batch_timestamps.tolist())), stop
+
+def _plausible_records(raw, positions, file_size, chain=False):
+    """
+    positions 위치가 record header 로 보이는지.
+    chain=True 이면 바로 뒤도 record / batch header / 파일 끝이어야 함 (값 bytes 가 우연히 header 처럼 보이는 경우 제외)
+    """
+    
+    positions = np.asarray(positions, dtype=np.int64)
+    plausible = np.zeros(len(positions), dtype=bool)
+    fits = np.flatnonzero(positions + RECORD_HEADER_SIZE <= file_size)
+    if len(fits) == 0:
+        return plausible
+    
+    headers = _gather_bytes(raw, positions[fits], RECORD_HEADER_SIZE).view(RECORD_HEADER_DTYPE)[:, 0]
+    ok = _sound_record_mask(headers, positions[fits], file_size)
+    
+    if chain and ok.any():
+        checked = np.flatnonzero(ok)
+        next_positions = positions[fits][checked] + RECORD_HEADER_SIZE + headers["data_size"][checked].astype(np.int64) * 4
+        ok[checked] = (
+            (next_positions == file_size)
+            | _plausible_records(raw, next_positions, file_size)
+            | _plausible_batches(raw, next_positions, file_size)
+        )
+    
+    plausible[fits] = ok
+    
+    return plausible
+
+def _plausible_batches(raw, positions, file_size):
+    # batch_size 1 ~ 10000, batch timestamp 범위, 첫 record 가 정상인 batch header
+    
+    positions = np.asarray(positions, dtype=np.int64)
+    plausible = np.zeros(len(positions), dtype=bool)
+    fits = np.flatnonzero(positions + BATCH_HEADER_SIZE + RECORD_HEADER_SIZE <= file_size)
+    if len(fits) == 0:
+        return plausible
+    
+    headers = _gather_bytes(raw, positions[fits], BATCH_HEADER_SIZE).view(
+        np.dtype([("batch_size", ">u4"), ("batch_ts", ">u8")])
+    )[:, 0]
+    ok = (
+        (headers["batch_size"] >= 1) & (headers["batch_size"] <= 10000)
+        & (headers["batch_ts"] >= 10**12) & (headers["batch_ts"] <= 2 * 10**12)
+    )
+    if ok.any():
+        checked = np.flatnonzero(ok)
+        ok[checked] = _plausible_records(raw, positions[fits][checked] + BATCH_HEADER_SIZE, file_size)
+    
+    plausible[fits] = ok
+    
+    return plausible
+
+def _type_prefix_positions(raw, start, end):
+    # [start, end) 에서 sensor type 상위 3 bytes 가 맞는 위치
+    
+    count = min(end, len(raw) - 3) - start
+    if count <= 0:
+        return np.empty(0, dtype=np.int64)
+    
+    window = raw[start:start + count + 2]
+    match = (window[:count] == 0) & (window[1:count + 1] == 0) & np.isin(window[2:count + 2], RESYNC_TYPE_PREFIXES)
+    
+    return start + np.flatnonzero(match)
+
+def _resync(raw, file_size, start):
+    """
+    start 이후 처음으로 record 가 시작되는 위치를 chunk 단위 byte scan 으로 찾음.
+    record 바로 앞이 정상 batch header 이면 batch header 에서 재개.
+    Returns: (pos, "batch" | "record") | (None, None)
+    """
+    
+    last = file_size - RECORD_HEADER_SIZE
+    # 대부분 바로 뒤에서 찾으므로 작은 chunk 부터 시작하여 두 배씩 늘림
+    chunk_start, chunk_size = start, RESYNC_MIN_CHUNK_SIZE
+    hits = []
+    while len(hits) == 0:
+        if chunk_start > last:
+            return None, None
+        chunk_end = min(chunk_start + chunk_size, last + 1)
+        candidates = _type_prefix_positions(raw, chunk_start, chunk_end)
+        hits = candidates[_plausible_records(raw, candidates, file_size, chain=True)]
+        chunk_start, chunk_size = chunk_end, min(chunk_size * 2, RESYNC_CHUNK_SIZE)
+    
+    pos = int(hits[0])
+    if pos - BATCH_HEADER_SIZE >= start and _plausible_batches(raw, [pos - BATCH_HEADER_SIZE], file_size)[0]:
+        return pos - BATCH_HEADER_SIZE, "batch"
+    
+    return pos, "record"
+
+def _walk_loose_records(raw, file_size, pos):
+    # batch 중간에서 재개한 경우 : batch header 없이 record 가 이어지는 동안 따라감
+    
+    offsets = []
+    while _plausible_records(raw, [pos], file_size)[0]:
+        offsets.append(pos)
+        pos += RECORD_HEADER_SIZE + int(raw[pos + 16:pos + 20].view(">u4")[0]) * 4
+    
+    return np.array(offsets, dtype=np.int64), pos
+
+def _salvage_walk(buffer, file_size):
+    """
+    _walk_records 와 같이 record 위치를 모으되, 구조가 깨진 record / batch header 를 만나면
+    _resync 로 다음 header 를 찾아 이어서 진행.
+    구조는 정상이지만 검사에 실패한 record (수집하지 않는 sensor type 등)는 그 record 만 제외.
+    Returns: (offsets, spans, num_rejected)
+        spans: [(시작 pos, 끝 pos, 직전 batch_timestamp, 재개 형태, details), ...] 건너뛴 구간
+    """
+    
+    raw = np.frombuffer(buffer, dtype=np.uint8)
+    offsets = []
+    spans = []
+    batch_timestamp = None
+    
+    pos, kind = 16, "batch"
+    while True:
+        if kind == "record":
+            loose_offsets, pos = _walk_loose_records(raw, file_size, pos)
+            offsets.append(loose_offsets)
+            kind = "batch"
+            continue
+        
+        segment_offsets, batch_starts, stop = _walk_records(buffer, file_size, pos)
+        headers = _gather_bytes(raw, segment_offsets, RECORD_HEADER_SIZE).view(RECORD_HEADER_DTYPE)[:, 0]
+        sound = _sound_record_mask(headers, segment_offsets, file_size)
+        num_sound = len(segment_offsets) if sound.all() else int(np.argmin(sound))
+        
+        for first_index, timestamp in batch_starts:
+            if first_index <= num_sound:
+                batch_timestamp = timestamp
+        
+        details = None
+        if num_sound < len(segment_offsets):
+            error_pos = int(segment_offsets[num_sound])
+        elif stop is None:
+            offsets.append(segment_offsets)
+            break
+        elif stop[0] == "record":
+            error_pos = stop[1]
+            details = {"at": "record", "got": file_size - error_pos, "expected": "record within file"}
+        else:
+            error_pos = stop[2]
+            details = {"at": "batch_size", "got": stop[1], "expected": "1 ~ 10000"}
+        
+        if num_sound == 0:
+            # batch header 부터 잘못된 경우
+            error_pos = pos
+        elif not valid_record_mask(*(headers[name][num_sound - 1:num_sound] for name in RECORD_HEADER_DTYPE.names))[0]:
+            # data_size 가 잘못되어 다음 header 위치가 어긋난 경우 : 그 record 부터 다시 찾음
+            num_sound -= 1
+            error_pos = int(segment_offsets[num_sound])
+            details = None
+        offsets.append(segment_offsets[:num_sound])
+        
+        resync_pos, kind = _resync(raw, file_size, error_pos + 1)
+        spans.append((error_pos, file_size if resync_pos is None else resync_pos, batch_timestamp, kind, details))
+        if resync_pos is None:
+            break
+        pos = resync_pos
+    
+    offsets = np.concatenate(offsets) if offsets else np.empty(0, dtype=np.int64)
+    headers = _gather_bytes(raw, offsets, RECORD_HEADER_SIZE).view(RECORD_HEADER_DTYPE)[:, 0]
+    valid = valid_record_mask(headers["sensor_type"], headers["collected_ts"], headers["accuracy"], headers["data_size"])
+    
+    return offsets[valid], spans, int(np.count_nonzero(~valid))
+
+def _salvage_error_info(file, file_path, raw, spans, num_rejected, num_records):
+    """
+    첫 구간 기준 error_info + 모든 구간 목록 / 합계.
+    건너뛴 record 수는 구간 안의 구조를 알 수 없으므로 추정값(estimated_skipped_records):
+        건너뛴 byte / 같은 파일에서 읽은 record 하나당 평균 byte (batch header 포함, num_records 는 제외한 record 포함)
+        읽은 record 가 없으면 최소 record 크기(RECORD_HEADER_SIZE) 기준 (상한)
+    """
+    
+    now = datetime.now(ZoneInfo("Asia/Seoul")).isoformat(timespec="milliseconds")
+    total_skipped = sum(end - start for start, end, *_ in spans)
+    read_bytes = len(raw) - 16 - total_skipped
+    bytes_per_record = read_bytes / num_records if num_records > 0 and read_bytes > 0 else RECORD_HEADER_SIZE
+    
+    span_infos = []
+    for start, end, batch_timestamp, resync_kind, details in spans:
+        if details is None:
+            file.seek(start)
+            _, details = parse_batch(file)
+        span_info = {
+            "file_path": file_path,
+            "batch_timestamp": batch_timestamp,
+            "pos": start,
+            "end": end,
+            "skipped_bytes": end - start,
+            "estimated_skipped_records": max(1, round((end - start) / bytes_per_record)),
+            "resync": resync_kind,
+            "timestamp": now,
+        }
+        if details:
+            span_info["details"] = details
+        span_infos.append(span_info)
+    
+    error_info = dict(span_infos[0]) if span_infos else {"file_path": file_path, "timestamp": now}
+    error_info.update({
+        "skipped_spans": span_infos,
+        "skipped_bytes": sum(span_info["skipped_bytes"] for span_info in span_infos),
+        "estimated_skipped_records": sum(span_info["estimated_skipped_records"] for span_info in span_infos),
+        "rejected_records": num_rejected,
+    })
+    
+    return error_info
+
+def _decode_records(buffer, offsets):
+    
+    raw = np.frombuffer(buffer, dtype=np.uint8)
+    headers = _gather_bytes(raw, offsets, RECORD_HEADER_SIZE).view(RECORD_HEADER_DTYPE)[:, 0]
+    
+    valid = valid_record_mask(
+        headers["sensor_type"], headers["collected_ts"], headers["accuracy"], headers["data_size"]
+    )
+    num_valid = len(offsets) if valid.all() else int(np.argmin(valid))
+    headers = headers[:num_valid]
+    
+    blocks = []
+    data_sizes = headers["data_size"]
+    for data_size in np.unique(data_sizes).tolist():
+        index = np.flatnonzero(data_sizes == data_size)
+        value_bytes = _gather_bytes(raw, offsets[index] + RECORD_HEADER_SIZE, data_size * 4)
+        blocks.append({
+            "sequence": index.astype(np.int64),
+            "sensor_type": headers["sensor_type"][index].astype(np.uint32),
+            "collected_ts": headers["collected_ts"][index].astype(np.int64),
+            "values": value_bytes.view(">f4").astype(np.float32).reshape(len(index), data_size),
+        })
+    
+    return blocks, num_valid
+
+def decode_binary(file_path, salvage=False, data=None):
+    """
+    memory-map 한 sensor binary를 data_size 별 block 단위로 decoding.
+    data(bytes)가 있으면 파일을 다시 읽지 않고 data 를 decoding (read_ahead 로 미리 읽어둔 경우), file_path 는 에러 기록용.
+    salvage=True 이면 잘못된 record / batch header 이후를 버리지 않고 다음 정상 header 를 찾아 이어서 decoding.
+    Returns: (blocks, error_info)
+        blocks: [{"sequence", "sensor_type", "collected_ts", "values"}, ...]
+                sequence는 파일 내 record 순번 array, values는 (n, data_size) float32 array
+        error_info: process_binary와 동일한 형태, 없으면 None
+                    salvage 시 skipped_spans(건너뛴 구간 목록) / skipped_bytes / estimated_skipped_records / rejected_records 추가
+    """
+    
+    error_info = None
+    
+    with open(file_path, "rb") if data is None else io.BytesIO(data) as file:
+        
+        file_header = file.read(16)
+        format_version, creation_time = parse_file_header(file_header)
+        file_size = os.fstat(file.fileno()).st_size if data is None else len(data)
+        
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if data is None else nullcontext(data) as buffer:
+            if salvage:
+                offsets, spans, num_rejected = _salvage_walk(buffer, file_size)
+                blocks, _ = _decode_records(buffer, offsets)
+                if spans or num_rejected:
+                    error_info = _salvage_error_info(
+                        file, file_path, np.frombuffer(buffer, dtype=np.uint8), spans, num_rejected, len(offsets) + num_rejected,
+                    )
+                    print("Error detected:", {key: value for key, value in error_info.items() if key != "skipped_spans"})
+                    save_error_info(file_path, error_info)
+                return blocks, error_info
+            
+            # 대부분의 파일은 loop 없이 record 위치를 찾고, 구조가 이어지지 않는 파일만 _walk_records 로 확인
+            walked = _fast_walk_records(buffer, file_size)
+            offsets, batch_starts, stop = walked if walked is not None else _walk_records(buffer, file_size)
+            blocks, num_valid = _decode_records(buffer, offsets)
+        
+        if num_valid < len(offsets):
+            error_index, error_pos = num_valid, int(offsets[num_valid])
+        elif stop is not None and stop[0] == "record":
+            error_index, error_pos = len(offsets), stop[1]
+        elif stop is not None:
+            raise ValueError(f"Invalid batch_size: {stop[1]}")
+        else:
+            error_index = None
+        
+        if error_index is not None:
+            batch_index = bisect.bisect_right([start for start, _ in batch_starts], error_index) - 1
+            batch_start, batch_timestamp = batch_starts[batch_index]
+            
+            # 실패 원인은 기존 parse_batch로 다시 확인
+            file.seek(error_pos)
+            _, err = parse_batch(file)
+            error_info = {
+                "file_path": file_path,
+                "batch_timestamp": batch_timestamp,
+                "record_index": error_index - batch_start,
+                "pos": error_pos,
+                "timestamp": datetime.now(ZoneInfo("Asia/Seoul")).isoformat(timespec="milliseconds")
+            }
+            if err:
+                error_info["details"] = err
+            print("Error detected:", error_info)
+    
+    if error_info is not None:
+        save_error_info(file_path, error_info)
+    
+    return blocks, error_info
+
+def scan_sensor_structure(file_path):
+    """
+    값(float)은 decoding 하지 않고 file / batch / record header 만 따라가며 구조 확인 (data_size 로 값 bytes 를 건너뜀).
+    Returns: {"status", "file_size", "end_pos", "batches", "records", "sensor_types", "start_ts", "end_ts", "details"}
+        status: ok         : 마지막 record 가 파일 끝에서 끝남
+                truncated  : 마지막 batch / record 가 파일 끝에서 잘림 (업로드 중단 등)
+                corrupt    : 잘못된 batch header / record 가 있음 (decode_binary 는 그 위치에서 멈춤)
+                bad_header : file header 가 16 bytes 미만이거나 magic header 가 다름
+        end_pos: 정상 record 가 끝나는 위치, records / sensor_types({sensor type: record 수}) / start_ts / end_ts 는 end_pos 까지
+    """
+    
+    file_size = os.path.getsize(file_path)
+    result = {
+        "status": "ok", "file_size": file_size, "end_pos": 0, "batches": 0, "records": 0,
+        "sensor_types": {}, "start_ts": None, "end_ts": None, "details": None,
+    }
+    
+    with open(file_path, "rb") as file:
+        try:
+            parse_file_header(file.read(16))
+        except ValueError as e:
+            result.update(status="bad_header", details={"at": "file_header", "got": str(e)})
+            return result
+        
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            walked = _fast_walk_records(buffer, file_size)
+            offsets, batch_starts, stop = walked if walked is not None else _walk_records(buffer, file_size)
+            # record / batch header 는 모두 4 bytes 단위 위치
+            headers = _word_headers(np.frombuffer(buffer, dtype=">u4", count=file_size // 4), offsets // 4)
+    
+    valid = valid_record_mask(headers["sensor_type"], headers["collected_ts"], headers["accuracy"], headers["data_size"])
+    num_valid = len(offsets) if valid.all() else int(np.argmin(valid))
+    
+    if num_valid < len(offsets):
+        result["status"] = "corrupt"
+        result["details"] = {"at": "record", "pos": int(offsets[num_valid]), "sensor_type": int(headers["sensor_type"][num_valid])}
+        end_pos = int(offsets[num_valid])
+    elif stop is not None and stop[0] == "batch_size":
+        result["status"] = "corrupt"
+        result["details"] = {"at": "batch_size", "pos": stop[2], "got": stop[1]}
+        end_pos = stop[2]
+    elif stop is not None:
+        result["status"] = "truncated"
+        result["details"] = {"at": "record", "pos": stop[1], "got": file_size - stop[1]}
+        end_pos = stop[1]
+    else:
+        end_pos = int(offsets[-1]) + RECORD_HEADER_SIZE + int(headers["data_size"][-1]) * 4 if len(offsets) else 16
+        if end_pos != file_size:
+            # batch header 보다 짧은 나머지 bytes
+            result["status"] = "truncated"
+            result["details"] = {"at": "batch_header", "pos": end_pos, "got": file_size - end_pos}
+    
+    headers = {name: values[:num_valid] for name, values in headers.items()}
+    type_values, counts = np.unique(headers["sensor_type"], return_counts=True)
+    result.update({
+        "end_pos": end_pos,
+        "batches": sum(1 for first_index, _ in batch_starts if first_index < num_valid),
+        "records": num_valid,
+        "sensor_types": {REVERSE_SENSOR_TYPE_MAP[type_value]: count for type_value, count in zip(type_values.tolist(), counts.tolist())},
+    })
+    if num_valid:
+        result["start_ts"] = int(headers["collected_ts"].min())
+        result["end_ts"] = int(headers["collected_ts"].max())
+    
+    return result
+
+def blocks_to_records(file_path, blocks):
+    # process_binary(engine="python") 와 같은 record dict list (data 는 tuple)
+    
+    sensor_record_list = blocks_to_legacy_table(file_path, blocks).to_pylist()
+    for record in sensor_record_list:
+        record["data"] = tuple(record["data"])
+    
+    return sensor_record_list
+
+#### Columnar sensor table
+
+SENSOR_TYPE_LOOKUP = np.full(max(REVERSE_SENSOR_TYPE_MAP) + 1, -1, dtype=np.int8)
+for _code, _sensor_type in enumerate(REVERSE_SENSOR_TYPE_MAP):
+    SENSOR_TYPE_LOOKUP[_sensor_type] = _code
+
+@lru_cache(maxsize=None)
+def sensor_type_dictionary():
+    # import 시점에 pa.array 를 만들면 pyarrow 가 pandas 까지 import 하므로 처음 사용할 때 생성
+    return pa.array(list(REVERSE_SENSOR_TYPE_MAP.values()), type=pa.string())
+
+def sensor_table_schema():
+    
+    fields = [
+        pa.field("file_index", pa.int16()),
+        pa.field("sequence", pa.int32()),
+        pa.field("sensor_type", pa.dictionary(pa.int8(), pa.string())),
+        pa.field("timestamp", pa.timestamp("ms", tz="Asia/Seoul")),
+    ]
+    for column_names in SENSOR_VALUE_COLUMNS.values():
+        fields += [pa.field(column_name, pa.float32()) for column_name in column_names]
+    
+    return pa.schema(fields)
+
+def blocks_to_table(blocks, file_index=0):
+    """
+    decode_binary 결과를 파일 순서(sequence)대로 정렬된 columnar table로 변환.
+    값은 SENSOR_VALUE_COLUMNS 폭만큼만 사용하고, 해당하지 않는 sensor type의 컬럼은 null.
+    """
+    
+    schema = sensor_table_schema()
+    if not blocks:
+        return schema.empty_table()
+    
+    sequence = np.concatenate([block["sequence"] for block in blocks])
+    sensor_type = np.concatenate([block["sensor_type"] for block in blocks])
+    collected_ts = np.concatenate([block["collected_ts"] for block in blocks])
+    num_rows = len(sequence)
+    
+    order = np.argsort(sequence, kind="stable")
+    row_of = np.empty(num_rows, dtype=np.int64)
+    row_of[order] = np.arange(num_rows)
+    
+    value_columns = {}
+    value_valid = {}
+    for column_names in SENSOR_VALUE_COLUMNS.values():
+        for column_name in column_names:
+            value_columns[column_name] = np.zeros(num_rows, dtype=np.float32)
+            value_valid[column_name] = np.zeros(num_rows, dtype=bool)
+    
+    block_start = 0
+    for block in blocks:
+        block_rows = row_of[block_start:block_start + len(block["sequence"])]
+        block_start += len(block["sequence"])
+        
+        for type_value in np.unique(block["sensor_type"]).tolist():
+            selected = block["sensor_type"] == type_value
+            rows = block_rows[selected]
+            column_names = SENSOR_VALUE_COLUMNS.get(type_value, [])
+            for j, column_name in enumerate(column_names[:block["values"].shape[1]]):
+                value_columns[column_name][rows] = block["values"][selected, j]
+                value_valid[column_name][rows] = True
+    
+    arrays = [
+        pa.array(np.full(num_rows, file_index, dtype=np.int16)),
+        pa.array(sequence[order].astype(np.int32)),
+        pa.DictionaryArray.from_arrays(pa.array(SENSOR_TYPE_LOOKUP[sensor_type[order]]), sensor_type_dictionary()),
+        pa.array(collected_ts[order], type=pa.timestamp("ms", tz="Asia/Seoul")),
+    ]
+    for column_name in value_columns:
+        arrays.append(pa.array(value_columns[column_name], mask=~value_valid[column_name]))
+    
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+def legacy_sensor_schema():
+    
+    return pa.schema([
+        pa.field("file_path", pa.string()),
+        pa.field("sequence", pa.int64()),
+        pa.field("sensor_type", pa.string()),
+        pa.field("data", pa.list_(pa.float64())),
+        pa.field("collected_time", pa.string()),
+        pa.field("timestamp", pa.int64()),
+    ])
+
+def blocks_to_legacy_table(file_path, blocks):
+    """
+    decode_binary 결과를 record dict 를 거치지 않고 legacy 형태의 table로 변환 (records_to_table(blocks_to_records(...)) 와 동일).
+    file_path / sensor_type 은 dictionary 를 string 으로 cast, data 는 block 값을 이어붙인 ListArray 를 sequence 순서로 take.
+    """
+    
+    schema = legacy_sensor_schema()
+    if not blocks:
+        return schema.empty_table()
+    
+    sequence = np.concatenate([block["sequence"] for block in blocks]).astype(np.int64)
+    sensor_type = np.concatenate([block["sensor_type"] for block in blocks])
+    collected_ts = np.concatenate([block["collected_ts"] for block in blocks]).astype(np.int64)
+    num_rows = len(sequence)
+    order = np.argsort(sequence, kind="stable")
+    
+    # block 마다 값 개수가 다를 수 있으므로 row 별 offset 으로 list 구성
+    widths = np.concatenate([np.full(len(block["sequence"]), block["values"].shape[1], dtype=np.int64) for block in blocks])
+    value_offsets = np.zeros(num_rows + 1, dtype=np.int32)
+    np.cumsum(widths, out=value_offsets[1:])
+    values = np.concatenate([block["values"].astype(np.float64).ravel() for block in blocks])
+    data = pa.ListArray.from_arrays(pa.array(value_offsets), pa.array(values)).take(pa.array(order))
+    
+    arrays = [
+        pa.DictionaryArray.from_arrays(
+            pa.array(np.zeros(num_rows, dtype=np.int8)), pa.array([file_path], type=pa.string()),
+        ).cast(pa.string()),
+        pa.array(sequence[order]),
+        pa.DictionaryArray.from_arrays(pa.array(SENSOR_TYPE_LOOKUP[sensor_type[order]]), sensor_type_dictionary()).cast(pa.string()),
+        data,
+        format_timestamps(collected_ts[order]),
+        pa.array(collected_ts[order]),
+    ]
+    
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+def records_to_table(sensor_record_list):
+    # process_binary 결과(record dict list)를 legacy 형태의 table로 변환
+    
+    return pa.Table.from_pylist(sensor_record_list, schema=legacy_sensor_schema())
+
+def with_file_paths(table, file_paths):
+    # file_index -> file_path 매핑은 컬럼 대신 schema metadata로 저장
+    
+    metadata = dict(table.schema.metadata or {})
+    metadata[b"file_paths"] = json.dumps(list(file_paths), ensure_ascii=False).encode("utf-8")
+    
+    return table.replace_schema_metadata(metadata)
+
+def process_binary(file_path, engine="numpy", salvage=False):
+    
+    if engine == "python":
+        if salvage:
+            raise ValueError("salvage is only supported by the numpy engine")
+        return _process_binary_python(file_path)
+    elif engine == "numpy":
+        blocks, _ = decode_binary(file_path, salvage=salvage)
+        return blocks_to_records(file_path, blocks)
+    else:
+        raise ValueError(f"Invalid engine: {engine}")
+
+#### For har_label
+
+# json.load 없이 "timeString" 값의 날짜 부분(공백 앞)만 추출, 값 뒤의 종료 문자까지 읽힌 경우만 매칭
+HAR_TIME_STRING_PATTERN = re.compile(rb'"timeString"\s*:\s*"([^" ]*)[" ]')
+HAR_SCAN_OVERLAP = 256
+
+def scan_har_label_dates(file_path, start=0, chunk_size=1 << 20):
+    """
+    har_label json 파일을 chunk 단위로 읽으며 timeString 날짜를 추출.
+    Returns: (dates, resume_offset)
+        resume_offset: 마지막으로 완전히 읽은 timeString 이후 위치, 파일이 append 된 경우 여기서부터 다시 scan
+    """
+    
+    dates = set()
+    resume_offset = start
+    
+    with open(file_path, "rb") as f:
+        f.seek(start)
+        buffer = b""
+        buffer_start = start
+        
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            buffer += chunk
+            
+            last_end = 0
+            for match in HAR_TIME_STRING_PATTERN.finditer(buffer):
+                dates.add(match.group(1).decode("utf-8"))
+                last_end = match.end(1)
+            if last_end:
+                resume_offset = buffer_start + last_end
+            
+            # 마지막 매칭 이후 부분은 다음 chunk와 이어서 다시 확인
+            keep_from = max(last_end, len(buffer) - HAR_SCAN_OVERLAP)
+            buffer_start += keep_from
+            buffer = buffer[keep_from:]
+    
+    return dates, resume_offset
+
+#### For processing samsung health
+
+def utc2kst(time):
+    
+    if isinstance(time, str):
+        time = datetime.fromisoformat(time.replace("Z", "+00:00"))
+    elif isinstance(time, datetime) and time.tzinfo is None:
+        time = time.replace(tzinfo=timezone.utc)
+    
+    kst_dt = time.astimezone(ZoneInfo("Asia/Seoul"))
+    kst_str = kst_dt.isoformat(timespec="milliseconds")
+    
+    return kst_str
+
+def parse_iso_duration(input_data):
+    try:
+        duration = isodate.parse_duration(input_data)
+        if isinstance(duration, timedelta):
+            return duration.total_seconds()
+        else :
+            return duration
+    except :
+        return input_data
+
+#### Batch helpers for samsung health
+
+KST_FIXED_OFFSET_SINCE = np.datetime64("1988-10-09T00:00:00", "us")
+ISO_DURATION_PATTERN = r"^P(?:(\d+)D)?(?:T(?=\d)(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)(?:\.(\d{1,6}))?S)?)?$"
+# 시간 부분(T / 공백 뒤 hh[:mm[:ss[.fff]]]) 바로 뒤에 오는 offset (Z, +hh[:mm]) 만 인정, 날짜만 있는 "2025-08-12" 의 "-" 는 제외
+ISO_OFFSET_PATTERN = re.compile(r"[T ]\d{2}(?::?\d{2}(?::?\d{2}(?:[.,]\d+)?)?)?(?:Z|[+-]\d{2}(?::?\d{2})?)$")
+# numpy datetime64 로 바로 변환하는 "...Z" 형태 (다른 표기는 numpy 가 timezone warning 을 내므로 pandas 사용)
+ISO_UTC_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d{1,6})?Z")
+
+_utc2kst_cached = lru_cache(maxsize=1 << 16)(utc2kst)
+_parse_iso_duration_cached = lru_cache(maxsize=1 << 16)(parse_iso_duration)
+
+def utc2kst_batch(times):
+    """
+    utc2kst 를 list 전체에 적용. 모두 시간 뒤에 offset(Z, +hh:mm)이 있는 ISO 문자열이면 pandas로 한번에 변환,
+    그 외(naive / 날짜만 있는 문자열, datetime 등)는 memoize 된 utc2kst 로 처리.
+    """
+    
+    if len(times) == 0:
+        return []
+    
+    has_offset = all(isinstance(time, str) and ISO_OFFSET_PATTERN.search(time) for time in times)
+    if has_offset and all(ISO_UTC_PATTERN.fullmatch(time) for time in times):
+        # 대부분의 삼성헬스 시간은 "...Z" 형태, 1988-10-09 이후 KST 는 +09:00 고정
+        try:
+            utc = np.array([time[:-1] for time in times], dtype="datetime64[us]")
+        except ValueError:
+            utc = None
+        if utc is not None and utc.min() >= KST_FIXED_OFFSET_SINCE:
+            local = (utc + np.timedelta64(9, "h")).astype("datetime64[ms]")
+            return [time_str + "+09:00" for time_str in np.datetime_as_string(local, unit="ms").tolist()]
+    
+    if has_offset:
+        # pandas 는 필요한 경우에만 import (업로드 체크 등 utils 만 쓰는 실행의 시작 시간 단축)
+        import pandas as pd
+        try:
+            kst = pd.to_datetime(pd.Series(times, dtype=object), utc=True, format="ISO8601").dt.tz_convert("Asia/Seoul")
+        except (ValueError, TypeError, OverflowError):
+            kst = None
+        
+        if kst is not None:
+            # isoformat(timespec="milliseconds") 형태 : 현지 시각(ms 단위 절삭) + "+09:00"
+            local = kst.dt.tz_localize(None).to_numpy().astype("datetime64[ms]")
+            utc = kst.dt.tz_convert(None).to_numpy().astype("datetime64[ms]")
+            local_str = np.datetime_as_string(local, unit="ms")
+            offset_minutes = ((local - utc) // np.timedelta64(1, "m")).astype(np.int64)
+            offset_str = {
+                minutes: f"{'+' if minutes >= 0 else '-'}{abs(minutes) // 60:02d}:{abs(minutes) % 60:02d}"
+                for minutes in np.unique(offset_minutes).tolist()
+            }
+            return [time_str + offset_str[minutes] for time_str, minutes in zip(local_str.tolist(), offset_minutes.tolist())]
+    
+    return [_utc2kst_cached(time) if isinstance(time, (str, datetime)) else utc2kst(time) for time in times]
+
+def parse_iso_duration_batch(values):
+    """
+    parse_iso_duration 을 list 전체에 적용. 일/시/분/초 형태(PnDTnHnMn.nS)의 문자열은 정규식으로 한번에 계산,
+    그 외 문자열은 memoize 된 parse_iso_duration 으로 처리, 문자열이 아닌 값은 그대로 반환.
+    """
+    
+    results = list(values)
+    str_positions = [i for i, value in enumerate(results) if isinstance(value, str)]
+    if not str_positions:
+        return results
+    
+    import pandas as pd
+    str_values = pd.Series([results[i] for i in str_positions], dtype=object)
+    parts = str_values.str.extract(ISO_DURATION_PATTERN)
+    matched = parts.notna().any(axis=1).to_numpy()
+    
+    numbers = parts.iloc[:, :4].fillna("0").astype(np.int64).to_numpy()
+    fraction = parts.iloc[:, 4].fillna("").str.ljust(6, "0").astype(np.int64).to_numpy()
+    microseconds = (numbers[:, 0] * 86400 + numbers[:, 1] * 3600 + numbers[:, 2] * 60 + numbers[:, 3]) * 10**6 + fraction
+    seconds = (microseconds / 10**6).tolist()
+    
+    for j, i in enumerate(str_positions):
+        results[i] = seconds[j] if matched[j] else _parse_iso_duration_cached(results[i])
+    
+    return results
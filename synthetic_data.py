@@ -0,0 +1,328 @@
+import os
+import json
+import argparse
+import numpy as np
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from ppg_pipeline.utils import MAGIC_HEADER, DATA_SIZE_CHECK_DICT, RECORD_HEADER_SIZE, BATCH_HEADER_SIZE
+from ppg_pipeline.config import FUNCTION_MAP
+
+"""
+benchmark / 공유용 synthetic raw 데이터 생성 (실제 참가자 데이터 대신 사용)
+- sensor_data : <raw_dir>/<device_id>/sensor_data/sensor_data_<date>_<HH>.bin
+    - file header(MAGIC_HEADER, format version, creation time) + batch header + record, sensor type 별 수집 주기
+    - corrupt 옵션으로 잘못된 sensor type / data_size, 잘린 파일 생성
+- samsung_health : <raw_dir>/<device_id>/samsung_health/<date>/<data_type>_synthetic.json (14종)
+- har_label : <raw_dir>/<device_id>/har_label/<yymmdd>_label.json (생성일부터 일주일치 누적)
+"""
+
+KST = ZoneInfo("Asia/Seoul")
+FORMAT_VERSION = 1
+
+# sensor type 별 수집 주기 (Hz)
+SENSOR_RATES_HZ = {
+    1001: 25,       # PPG
+    1003: 25,       # GYROSCOPE
+    1004: 1,        # HEART_RATE
+    1005: 1 / 60,   # TEMP
+    1006: 25,       # ACCE
+    1010: 1,        # IBI
+}
+# 수집하지 않는 sensor type (parse_batch 에서 reject) 을 넣을 때 사용하는 주기 / data_size
+UNCOLLECTED_RATES_HZ = {1002: 1, 1007: 1, 1008: 1, 1009: 1}
+UNCOLLECTED_DATA_SIZE = {1002: 3, 1007: 1, 1008: 1, 1009: 1}
+# 워치에서 batch 를 flush 하는 간격
+BATCH_SECONDS = 10
+
+CORRUPT_KINDS = ["type", "size", "truncate"]
+COLLECT_HOURS = list(range(10, 16))
+HAR_LABELS = ["walk", "run", "sit", "stand", "lie"]
+
+RECORD_HEADER_FIELDS = np.dtype([("sensor_type", ">u4"), ("collected_ts", ">u8"), ("accuracy", ">u4"), ("data_size", ">u4")])
+BATCH_HEADER_FIELDS = np.dtype([("batch_size", ">u4"), ("batch_ts", ">u8")])
+
+
+def sensor_values(rng, sensor_type, count, data_size):
+    # sensor type 별로 그럴듯한 범위의 값
+    
+    if sensor_type == 1001:
+        values = 2e6 + rng.normal(0, 5e4, (count, data_size))
+    elif sensor_type == 1003:
+        values = rng.normal(0, 0.5, (count, data_size))
+    elif sensor_type == 1004:
+        values = np.column_stack([rng.integers(55, 110, count), np.ones(count)])[:, :data_size]
+    elif sensor_type == 1005:
+        values = np.column_stack([rng.uniform(32, 36, count), rng.uniform(20, 28, count)])[:, :data_size]
+    elif sensor_type == 1006:
+        values = rng.normal(0, 9.8, (count, data_size))
+    else:
+        values = rng.normal(0, 1, (count, data_size))
+    
+    return values.astype(">f4")
+
+def sensor_hour_bytes(start_ms, seconds=3600, rates=SENSOR_RATES_HZ, batch_seconds=BATCH_SECONDS, seed=0,
+                      include_uncollected=False, corrupt=None, corrupt_count=1):
+    """
+    start_ms 부터 seconds 동안의 sensor binary 파일 내용.
+    record 는 timestamp 순, batch_seconds 단위로 batch 를 나눔.
+    corrupt: None | "type" (없는 sensor type) | "size" (data_size 불일치) | "truncate" (파일 끝 잘림)
+    Returns: (bytes, corrupt 적용 전 수집 대상 sensor type record 수)
+    """
+    
+    rng = np.random.default_rng(seed)
+    
+    rates = dict(rates)
+    data_sizes = {sensor_type: DATA_SIZE_CHECK_DICT[sensor_type] for sensor_type in rates}
+    if include_uncollected:
+        rates.update(UNCOLLECTED_RATES_HZ)
+        data_sizes.update(UNCOLLECTED_DATA_SIZE)
+    
+    sensor_types, timestamps = [], []
+    for sensor_type, rate in rates.items():
+        count = int(seconds * rate)
+        # 수집 주기 + 약간의 jitter
+        ts = start_ms + (np.arange(count) * (1000 / rate)).astype(np.int64) + rng.integers(0, 5, count)
+        sensor_types.append(np.full(count, sensor_type, dtype=np.uint32))
+        timestamps.append(ts)
+    
+    sensor_types = np.concatenate(sensor_types)
+    timestamps = np.concatenate(timestamps)
+    order = np.argsort(timestamps, kind="stable")
+    sensor_types, timestamps = sensor_types[order], timestamps[order]
+    size_lookup = np.zeros(max(rates) + 1, dtype=np.int64)
+    for sensor_type, data_size in data_sizes.items():
+        size_lookup[sensor_type] = data_size
+    sizes = size_lookup[sensor_types]
+    
+    num_records = len(timestamps)
+    batch_ids = (timestamps - start_ms) // (batch_seconds * 1000)
+    batch_first = np.ones(num_records, dtype=bool)
+    batch_first[1:] = batch_ids[1:] != batch_ids[:-1]
+    batch_index = np.cumsum(batch_first) - 1
+    
+    record_bytes = RECORD_HEADER_SIZE + sizes * 4
+    record_offsets = 16 + BATCH_HEADER_SIZE * (batch_index + 1) + np.concatenate([[0], np.cumsum(record_bytes)[:-1]])
+    total_size = 16 + BATCH_HEADER_SIZE * int(batch_first.sum()) + int(record_bytes.sum())
+    
+    buffer = np.zeros(total_size, dtype=np.uint8)
+    buffer[:16] = np.frombuffer(
+        np.array([(MAGIC_HEADER, FORMAT_VERSION, start_ms)], dtype=[("m", ">u4"), ("v", ">u4"), ("c", ">u8")]).tobytes(),
+        dtype=np.uint8,
+    )
+    
+    # batch header
+    batch_starts = np.flatnonzero(batch_first)
+    batch_headers = np.empty(len(batch_starts), dtype=BATCH_HEADER_FIELDS)
+    batch_headers["batch_size"] = np.diff(np.append(batch_starts, num_records))
+    batch_headers["batch_ts"] = timestamps[batch_starts]
+    batch_positions = record_offsets[batch_starts] - BATCH_HEADER_SIZE
+    buffer[batch_positions[:, None] + np.arange(BATCH_HEADER_SIZE)] = batch_headers.view(np.uint8).reshape(-1, BATCH_HEADER_SIZE)
+    
+    # record header
+    record_headers = np.empty(num_records, dtype=RECORD_HEADER_FIELDS)
+    record_headers["sensor_type"] = sensor_types
+    record_headers["collected_ts"] = timestamps
+    record_headers["accuracy"] = 0
+    record_headers["data_size"] = sizes
+    buffer[record_offsets[:, None] + np.arange(RECORD_HEADER_SIZE)] = record_headers.view(np.uint8).reshape(-1, RECORD_HEADER_SIZE)
+    
+    # record 값, data_size 가 같은 record 끼리 한번에 기록
+    for sensor_type in rates:
+        mask = sensor_types == sensor_type
+        data_size = data_sizes[sensor_type]
+        if data_size == 0 or not mask.any():
+            continue
+        values = sensor_values(rng, sensor_type, int(mask.sum()), data_size)
+        width = data_size * 4
+        buffer[(record_offsets[mask] + RECORD_HEADER_SIZE)[:, None] + np.arange(width)] = values.view(np.uint8).reshape(-1, width)
+    
+    num_valid = int(np.isin(sensor_types, list(DATA_SIZE_CHECK_DICT)).sum())
+    
+    if corrupt == "type" or corrupt == "size":
+        for position in rng.choice(record_offsets, size=min(corrupt_count, num_records), replace=False):
+            if corrupt == "type":
+                buffer[position:position + 4] = np.frombuffer(np.array([9999], dtype=">u4").tobytes(), dtype=np.uint8)
+            else:
+                # record 경계가 어긋나도록 data_size 변경
+                buffer[position + 16:position + 20] = np.frombuffer(np.array([7], dtype=">u4").tobytes(), dtype=np.uint8)
+    elif corrupt == "truncate":
+        buffer = buffer[:total_size - int(rng.integers(1, RECORD_HEADER_SIZE * max(corrupt_count, 1) + 1))]
+    elif corrupt is not None:
+        raise ValueError(f"Invalid corrupt kind: {corrupt}")
+    
+    return buffer.tobytes(), num_valid
+
+def kst_epoch_ms(target_date, hour=0):
+    return int(datetime.strptime(target_date, "%Y-%m-%d").replace(hour=hour, tzinfo=KST).timestamp() * 1000)
+
+def utc_iso(epoch_ms):
+    return datetime.fromtimestamp(epoch_ms / 1000, tz=ZoneInfo("UTC")).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+def iso_duration(seconds):
+    hours, remain = divmod(int(seconds), 3600)
+    minutes, seconds = divmod(remain, 60)
+    return f"PT{hours}H{minutes}M{seconds}S"
+
+def load_exercise_types():
+    
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "exercise_type.json"), "r") as f:
+        return list(json.load(f))
+
+def samsung_health_records(data_type, target_date, count, seed=0):
+    # 하루치 data_type 항목, 02_process_data.py 에서 사용하는 key 를 모두 포함
+    
+    rng = np.random.default_rng(seed)
+    day_start = kst_epoch_ms(target_date)
+    exercise_types = load_exercise_types() if data_type == "Exercise" else None
+    
+    records = []
+    for start_ms in np.sort(rng.integers(day_start, day_start + 24 * 3600 * 1000, count)).tolist():
+        duration_ms = int(rng.integers(60, 3600)) * 1000
+        record = {
+            "uid": "synthetic",
+            "appId": "com.sec.android.app.shealth",
+            "deviceId": "synthetic-watch",
+            "startTime": utc_iso(start_ms),
+            "endTime": utc_iso(start_ms + duration_ms),
+        }
+        series = [
+            {"startTime": utc_iso(start_ms + i * 60000), "endTime": utc_iso(start_ms + (i + 1) * 60000),
+             "value": round(float(rng.uniform(50, 120)), 1)}
+            for i in range(int(rng.integers(1, 6)))
+        ]
+        
+        if data_type == "TotalActive":
+            record["value"] = iso_duration(rng.integers(0, 8 * 3600))
+        elif data_type in ("calburn", "TotalCaloriesBurned", "TotalDistance"):
+            record["value"] = round(float(rng.uniform(0, 3000)), 2)
+        elif data_type == "step":
+            record["value"] = int(rng.integers(0, 20000))
+        elif data_type == "WaterIntake":
+            record["amount"] = int(rng.integers(100, 500))
+        elif data_type == "BloodGlucose":
+            record.update(
+                glucoseLevel=round(float(rng.uniform(4, 9)), 2), insulinInjected=float(rng.integers(0, 10)),
+                mealStatus=str(rng.choice(["FASTING", "AFTER_MEAL", "BEFORE_MEAL"])),
+                mealTime=utc_iso(start_ms - 3600 * 1000), seriesData=series,
+            )
+        elif data_type in ("BloodOxygen", "HeartRate", "skintemper"):
+            value_key = {"BloodOxygen": "oxygenSaturation", "HeartRate": "heartRate", "skintemper": "skinTemperature"}[data_type]
+            values = [point["value"] for point in series]
+            record.update({value_key: round(float(np.mean(values)), 1), "min": min(values), "max": max(values), "seriesData": series})
+        elif data_type == "sleep":
+            record.update(
+                duration=iso_duration(duration_ms / 1000),
+                sessions=[{"startTime": record["startTime"], "endTime": record["endTime"], "stage": "LIGHT"}],
+            )
+        elif data_type == "Exercise":
+            record.update(
+                exerciseType=str(rng.choice(exercise_types)),
+                sessions=[{"duration": iso_duration(duration_ms / 1000), "calorie": round(float(rng.uniform(10, 500)), 1)}],
+            )
+        elif data_type == "BodyComposition":
+            record.update(weight=round(float(rng.uniform(45, 100)), 1), bodyFat=round(float(rng.uniform(10, 35)), 1),
+                          skeletalMuscle=round(float(rng.uniform(20, 40)), 1))
+        elif data_type == "Nutrition":
+            record.update(mealType="LUNCH", title="비빔밥", calorie=round(float(rng.uniform(200, 900)), 1),
+                          protein=round(float(rng.uniform(5, 40)), 1))
+        else:
+            raise ValueError(f"Invalid data_type: {data_type}")
+        
+        records.append(record)
+    
+    return records
+
+def har_label_records(target_date, hours=COLLECT_HOURS, seed=0):
+    # 수집 시간대 동안 1분 간격 label
+    
+    rng = np.random.default_rng(seed)
+    day = datetime.strptime(target_date, "%Y-%m-%d")
+    
+    return [
+        {"timeString": (day + timedelta(hours=hour, minutes=minute)).strftime("%Y-%m-%d %H:%M:%S"),
+         "label": str(rng.choice(HAR_LABELS))}
+        for hour in hours for minute in range(60)
+    ]
+
+def make_raw_tree(raw_dir, device_ids, dates, hours=COLLECT_HOURS, seed=0, samsung_health_count=100,
+                  include_uncollected=False, corrupt=None, corrupt_ratio=0.0, batch_seconds=BATCH_SECONDS):
+    """
+    RAW_DATA_DIR 와 같은 구조로 synthetic 데이터 생성.
+    corrupt_ratio 비율의 sensor 파일에 corrupt 적용.
+    Returns: {"files", "bytes", "records"} (sensor_data 기준)
+    """
+    
+    rng = np.random.default_rng(seed)
+    all_health_types = [data_type for function_type in FUNCTION_MAP for data_type in FUNCTION_MAP[function_type]]
+    summary = {"files": 0, "bytes": 0, "records": 0}
+    
+    for device_id in device_ids:
+        device_dir = os.path.join(raw_dir, device_id)
+        for spec_dir in ["har_label", "sensor_data", "samsung_health"]:
+            os.makedirs(os.path.join(device_dir, spec_dir), exist_ok=True)
+        
+        for target_date in dates:
+            for hour in hours:
+                file_corrupt = corrupt if corrupt is not None and rng.random() < corrupt_ratio else None
+                content, num_valid = sensor_hour_bytes(
+                    kst_epoch_ms(target_date, hour), seed=int(rng.integers(1 << 31)), batch_seconds=batch_seconds,
+                    include_uncollected=include_uncollected, corrupt=file_corrupt,
+                )
+                with open(os.path.join(device_dir, "sensor_data", f"sensor_data_{target_date}_{hour:02d}.bin"), "wb") as f:
+                    f.write(content)
+                summary["files"] += 1
+                summary["bytes"] += len(content)
+                summary["records"] += num_valid
+            
+            health_dir = os.path.join(device_dir, "samsung_health", target_date)
+            os.makedirs(health_dir, exist_ok=True)
+            for data_type in all_health_types:
+                records = samsung_health_records(data_type, target_date, samsung_health_count, seed=int(rng.integers(1 << 31)))
+                with open(os.path.join(health_dir, f"{data_type}_synthetic.json"), "w") as f:
+                    json.dump(records, f, ensure_ascii=False)
+        
+        # har_label : 첫 날짜에 만든 파일에 일주일 단위로 누적
+        date_objs = sorted(datetime.strptime(target_date, "%Y-%m-%d") for target_date in dates)
+        week_files = {}
+        for date_obj in date_objs:
+            file_date = date_objs[0] + timedelta(days=7 * ((date_obj - date_objs[0]).days // 7))
+            week_files.setdefault(file_date, []).extend(
+                har_label_records(date_obj.strftime("%Y-%m-%d"), hours, seed=int(rng.integers(1 << 31)))
+            )
+        for file_date, label_records in week_files.items():
+            with open(os.path.join(device_dir, "har_label", f"{file_date.strftime('%y%m%d')}_label.json"), "w") as f:
+                json.dump(label_records, f)
+    
+    return summary
+
+def main():
+    
+    parser = argparse.ArgumentParser(description="synthetic raw 데이터 생성")
+    parser.add_argument("raw_dir")
+    parser.add_argument("--devices", type=int, default=2)
+    parser.add_argument("--start-date", default="2025-08-11")
+    parser.add_argument("--days", type=int, default=1)
+    parser.add_argument("--hours", type=int, nargs="*", default=COLLECT_HOURS)
+    parser.add_argument("--samsung-health-count", type=int, default=100,
+                        help="samsung_health 종류별 하루 항목 수")
+    parser.add_argument("--include-uncollected", action="store_true",
+                        help="수집하지 않는 sensor type(1002, 1007~1009) record 도 포함")
+    parser.add_argument("--corrupt", choices=CORRUPT_KINDS, default=None)
+    parser.add_argument("--corrupt-ratio", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    
+    start = datetime.strptime(args.start_date, "%Y-%m-%d")
+    dates = [(start + timedelta(days=day)).strftime("%Y-%m-%d") for day in range(args.days)]
+    device_ids = [f"synthetic_{index:04d}" for index in range(args.devices)]
+    
+    summary = make_raw_tree(
+        args.raw_dir, device_ids, dates, hours=args.hours, seed=args.seed,
+        samsung_health_count=args.samsung_health_count, include_uncollected=args.include_uncollected,
+        corrupt=args.corrupt, corrupt_ratio=args.corrupt_ratio,
+    )
+    print(f"sensor_data files: {summary['files']}, {summary['bytes'] / 1024**2:.1f} MB, valid records: {summary['records']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,608 @@
+import os
+import sys
+import time
+import shlex
+import shutil
+import struct
+import select
+import ctypes
+import ctypes.util
+import argparse
+import subprocess
+import numpy as np
+import pyarrow.parquet as pq
+from collections import deque, Counter
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+from ppg_pipeline import job_store, run_metrics, decode_cache, process_data
+from ppg_pipeline.utils import with_file_paths
+upload_check = process_data.upload_check
+
+"""
+업로드 감시 (watch mode)
+- device 별 sensor_data / har_label / samsung_health(/<date>) 디렉토리를 inotify 로 감시, 사용할 수 없으면 polling
+  (network mount 는 다른 host 에서 쓴 파일의 inotify 이벤트가 오지 않으므로 rescan_seconds 마다 전체 listing 도 함께 수행)
+- sensor_data 시간 단위 파일은 마지막 수정 후 settle_seconds 가 지나고 크기 / mtime 이 그대로면 완료로 보고 바로 decoding
+    -> <PROCESSED_DATA_DIR>/<device_id>/sensor_data_live/<date>/<파일 이름>.parquet (decoding cache 에도 저장)
+- 날짜별 cutoff(기본 16시, 01_upload_check.make_date_list 와 같은 기준)가 지나면 그 날짜를 명시하여
+  01_upload_check.py --target-date / 02_process_data.py --start-date 를 실행, 업로드 report 와 일 단위 파일을 만들고
+  (cache 로 decoding 생략) 처리가 끝난 device 의 live 파일 제거. 실패하면 finalize_retry_seconds 후 같은 날짜를 다시 시도
+- cutoff 처리 이후 도착한 파일(late)은 (device, date) 를 job store 에 다시 pending 으로 등록하고 다음 cutoff 처리에서 함께 처리
+  (--no-finalize 이면 job store 를 claim 하는 기존 02_process_data.py 실행에서 처리)
+- 파일마다 업로드(mtime) -> 처리 완료까지의 latency 와 아직 처리하지 않은 backlog 를 출력 / 기록
+"""
+load_dotenv()
+
+RAW_DATA_DIR = os.getenv("RAW_DATA_DIR")
+PROCESSED_DATA_DIR = os.getenv("PROCESSED_DATA_DIR")
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+WATCH_SPEC_DIRS = ["sensor_data", "har_label", "samsung_health"]
+LIVE_DIR_NAME = "sensor_data_live"
+# decoding cache 가 설정되지 않았으면 watch 전용 cache 사용 (cutoff 처리에서 다시 decoding 하지 않도록)
+WATCH_CACHE_DIR = decode_cache.DECODE_CACHE_DIR or (
+    os.path.join(PROCESSED_DATA_DIR, "_watch", "decode_cache") if PROCESSED_DATA_DIR else None
+)
+
+DEFAULT_CUTOFF_HOUR = upload_check.DEFAULT_CUTOFF_HOUR
+DEFAULT_SETTLE_SECONDS = 60
+DEFAULT_POLL_SECONDS = 10
+DEFAULT_RESCAN_SECONDS = 300
+DEFAULT_STATUS_SECONDS = 60
+DEFAULT_FINALIZE_RETRY_SECONDS = 600
+# latency 통계에 사용하는 최근 처리 파일 수
+LATENCY_WINDOW = 1000
+
+# linux inotify (sys/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+INOTIFY_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+_INOTIFY_EVENT = struct.Struct("iIII")
+
+
+class PollingWatcher:
+    """
+    dirs_fn() 의 디렉토리들을 listing 하여 이전과 크기 / mtime 이 다른 파일을 찾음.
+    poll(timeout) -> 바뀐 파일 경로 list
+    """
+    
+    mode = "polling"
+    
+    def __init__(self, dirs_fn):
+        
+        self.dirs_fn = dirs_fn
+        self.snapshot = {}
+    
+    def close(self):
+        pass
+    
+    def scan(self):
+        
+        current = {}
+        for directory in self.dirs_fn():
+            try:
+                entries = os.scandir(directory)
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            with entries:
+                for entry in entries:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        current[entry.path] = (stat.st_size, stat.st_mtime_ns)
+        
+        changed = [path for path, signature in current.items() if self.snapshot.get(path) != signature]
+        self.snapshot = current
+        
+        return changed
+    
+    def poll(self, timeout):
+        
+        time.sleep(timeout)
+        
+        return self.scan()
+
+class InotifyWatcher(PollingWatcher):
+    # 디렉토리마다 inotify watch, 새로 생긴 디렉토리(samsung_health/<date>)도 watch 추가
+    
+    mode = "inotify"
+    
+    def __init__(self, dirs_fn):
+        
+        super().__init__(dirs_fn)
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"inotify_init1: {os.strerror(errno)}")
+        self.watched = {}
+    
+    def close(self):
+        os.close(self.fd)
+    
+    def _watch(self, directory):
+        
+        wd = self._add_watch(self.fd, os.fsencode(directory), INOTIFY_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            # 디렉토리가 아직 없으면 다음 scan 에서 다시 시도
+            if errno in (2, 20):
+                return
+            raise OSError(errno, f"inotify_add_watch {directory}: {os.strerror(errno)}")
+        self.watched[wd] = directory
+    
+    def scan(self):
+        
+        for directory in self.dirs_fn():
+            if os.path.isdir(directory):
+                self._watch(directory)
+        
+        return super().scan()
+    
+    def poll(self, timeout):
+        
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        
+        changed = set()
+        while True:
+            try:
+                buffer = os.read(self.fd, 1 << 16)
+            except BlockingIOError:
+                break
+            
+            pos = 0
+            while pos < len(buffer):
+                wd, mask, _, name_size = _INOTIFY_EVENT.unpack_from(buffer, pos)
+                name = buffer[pos + _INOTIFY_EVENT.size:pos + _INOTIFY_EVENT.size + name_size].rstrip(b"\0")
+                pos += _INOTIFY_EVENT.size + name_size
+                
+                if mask & IN_Q_OVERFLOW:
+                    # 이벤트가 넘쳐 버려진 경우 전체 listing 으로 대신함
+                    return self.scan()
+                if mask & IN_IGNORED:
+                    self.watched.pop(wd, None)
+                    continue
+                
+                directory = self.watched.get(wd)
+                if directory is None or not name:
+                    continue
+                path = os.path.join(directory, os.fsdecode(name))
+                if mask & IN_ISDIR:
+                    self._watch(path)
+                    with os.scandir(path) as entries:
+                        changed.update(entry.path for entry in entries if entry.is_file())
+                else:
+                    changed.add(path)
+        
+        return list(changed)
+
+def make_watcher(dirs_fn, use_inotify=True):
+    
+    if use_inotify and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(dirs_fn)
+        except (OSError, AttributeError) as e:
+            print(f"inotify unavailable ({e}), falling back to polling")
+    
+    return PollingWatcher(dirs_fn)
+
+def classify_path(path):
+    """
+    raw 파일 경로 -> (device_id, spec_dir, date)
+    har_label 은 일주일치가 누적되므로 date None
+    """
+    
+    parent = os.path.dirname(path)
+    filename = os.path.basename(path)
+    
+    if os.path.basename(parent) == "sensor_data":
+        device_id = os.path.basename(os.path.dirname(parent))
+        parts = filename.split(".")[0].split("_")
+        return device_id, "sensor_data", parts[2] if len(parts) == 4 else None
+    elif os.path.basename(parent) == "har_label":
+        return os.path.basename(os.path.dirname(parent)), "har_label", None
+    elif os.path.basename(os.path.dirname(parent)) == "samsung_health":
+        return os.path.basename(os.path.dirname(os.path.dirname(parent))), "samsung_health", os.path.basename(parent)
+    
+    return None, None, None
+
+def live_dir(device_id, target_date):
+    return os.path.join(PROCESSED_DATA_DIR, device_id, LIVE_DIR_NAME, target_date)
+
+def live_path(device_id, target_date, sensor_data_path):
+    return os.path.join(live_dir(device_id, target_date), os.path.basename(sensor_data_path) + ".parquet")
+
+class UploadWatcher:
+    
+    def __init__(self, device_ids=None, cutoff_hour=DEFAULT_CUTOFF_HOUR, settle_seconds=DEFAULT_SETTLE_SECONDS,
+                 poll_seconds=DEFAULT_POLL_SECONDS, rescan_seconds=DEFAULT_RESCAN_SECONDS,
+                 status_seconds=DEFAULT_STATUS_SECONDS, use_inotify=True, output_mode="columnar", salvage=False,
+                 cache_dir=WATCH_CACHE_DIR, process_args=(), metrics_dir=run_metrics.RUN_METRICS_DIR, finalize=True,
+                 store_url=job_store.JOB_STORE_URL, finalize_retry_seconds=DEFAULT_FINALIZE_RETRY_SECONDS):
+        
+        self.explicit_device_ids = device_ids
+        self.device_ids = list(device_ids or upload_check.parse_user2device(upload_check.CSV_PATH).values())
+        self.cutoff_hour = cutoff_hour
+        self.settle_seconds = settle_seconds
+        self.poll_seconds = poll_seconds
+        self.rescan_seconds = rescan_seconds
+        self.status_seconds = status_seconds
+        self.output_mode = output_mode
+        self.salvage = salvage
+        self.cache_dir = cache_dir
+        self.process_args = list(process_args)
+        self.metrics_dir = metrics_dir
+        self.finalize_enabled = finalize
+        self.finalize_retry_seconds = finalize_retry_seconds
+        # 01 / 02 를 repo 경로에서 실행하므로 SQLite 파일 경로는 절대 경로로
+        self.store_url = store_url if "://" in store_url else os.path.abspath(store_url)
+        self.started_at = time.time()
+        self.next_finalize_at = 0.0
+        
+        # path -> [size, mtime_ns, 처음 발견 시각(monotonic)]
+        self.pending = {}
+        # path -> (size, mtime_ns) 처리 완료
+        self.done = {}
+        self.failed = {}
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.counts = Counter()
+        # job store 에 다시 등록한 late (device, date), 다음 cutoff 처리에서 02 로 처리
+        self.late_device_dates = set()
+        
+        now = datetime.now()
+        today = now.strftime("%Y-%m-%d")
+        # 이미 cutoff 가 지난 날짜는 기존 일 단위 실행에서 처리된 것으로 봄
+        self.finalized_through = today if now >= self.cutoff_time(today) else self._shift(today, -1)
+        
+        self.watcher = make_watcher(self.watch_dirs, use_inotify=use_inotify)
+    
+    @staticmethod
+    def _shift(target_date, days):
+        return (datetime.strptime(target_date, "%Y-%m-%d") + timedelta(days=days)).strftime("%Y-%m-%d")
+    
+    def cutoff_time(self, target_date):
+        return datetime.strptime(target_date, "%Y-%m-%d") + timedelta(hours=self.cutoff_hour)
+    
+    def open_dates(self):
+        # 아직 cutoff 처리하지 않은 날짜 (보통 오늘, cutoff 이후면 내일)
+        return [self._shift(self.finalized_through, 1), self._shift(self.finalized_through, 2)]
+    
+    def watch_dirs(self):
+        
+        dirs = []
+        for device_id in self.device_ids:
+            device_dir = os.path.join(RAW_DATA_DIR, device_id)
+            dirs += [os.path.join(device_dir, spec_dir) for spec_dir in WATCH_SPEC_DIRS]
+            dirs += [os.path.join(device_dir, "samsung_health", target_date) for target_date in self.open_dates()]
+        
+        return dirs
+    
+    def observe(self, paths):
+        # 바뀐 파일의 크기 / mtime 확인, 완료 전 파일은 pending 에서 settle 대기
+        
+        now = time.monotonic()
+        for path in paths:
+            device_id, spec_dir, target_date = classify_path(path)
+            if spec_dir is None or path.endswith(".tmp"):
+                continue
+            
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                self.pending.pop(path, None)
+                continue
+            signature = (stat.st_size, stat.st_mtime_ns)
+            
+            if target_date is not None and target_date <= self.finalized_through and path not in self.pending:
+                # cutoff 처리가 끝난 날짜는 cutoff 이후 (watch 중에) 도착 / 수정된 파일만 late 로 처리
+                if stat.st_mtime_ns / 1e9 <= max(self.cutoff_time(target_date).timestamp(), self.started_at):
+                    continue
+            
+            if self.done.get(path) == signature:
+                continue
+            entry = self.pending.setdefault(path, [*signature, now])
+            entry[:2] = signature
+    
+    def catch_up(self, paths):
+        # 시작 시 이미 live 파일이 있는 sensor_data 는 처리 완료로 표시
+        
+        for path in paths:
+            device_id, spec_dir, target_date = classify_path(path)
+            if spec_dir != "sensor_data" or target_date is None or target_date <= self.finalized_through:
+                continue
+            try:
+                stat = os.stat(path)
+                if os.path.getmtime(live_path(device_id, target_date, path)) * 1e9 >= stat.st_mtime_ns:
+                    self.done[path] = (stat.st_size, stat.st_mtime_ns)
+            except FileNotFoundError:
+                continue
+    
+    def process_sensor_file(self, path):
+        
+        device_id, _, target_date = classify_path(path)
+        save_path = live_path(device_id, target_date, path)
+        os.makedirs(os.path.dirname(save_path), exist_ok=True)
+        
+        with run_metrics.stage("watch_decode", device_id, target_date, file_path=path) as metrics:
+            table = process_data.decode_sensor_file(path, 0, self.output_mode, self.cache_dir, False, self.salvage)
+            if self.output_mode == "columnar":
+                table = with_file_paths(table, [path])
+            
+            # "_" 로 시작하는 임시 파일은 pyarrow dataset 조회에서 제외됨
+            tmp_path = os.path.join(os.path.dirname(save_path), f"_{os.path.basename(save_path)}.tmp")
+            pq.write_table(table, tmp_path)
+            os.replace(tmp_path, save_path)
+            metrics["rows_written"] += table.num_rows
+        
+        return table.num_rows
+    
+    def process_ready(self):
+        # 마지막 수정(mtime) 후 settle_seconds 가 지난 파일, 처리 직전에 다시 stat 하여 그 사이 바뀌었으면 다음으로 미룸
+        
+        now = time.time()
+        ready = sorted(path for path, entry in self.pending.items() if now - entry[1] / 1e9 >= self.settle_seconds)
+        
+        for path in ready:
+            size, mtime_ns, _ = self.pending[path]
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                self.pending.pop(path)
+                continue
+            if (stat.st_size, stat.st_mtime_ns) != (size, mtime_ns):
+                self.pending[path][:2] = (stat.st_size, stat.st_mtime_ns)
+                continue
+            
+            self.pending.pop(path)
+            device_id, spec_dir, target_date = classify_path(path)
+            
+            if target_date is not None and target_date <= self.finalized_through:
+                self.enqueue_late(device_id, target_date, path)
+                self.done[path] = (size, mtime_ns)
+                continue
+            
+            num_rows = None
+            if spec_dir == "sensor_data":
+                try:
+                    num_rows = self.process_sensor_file(path)
+                except Exception as e:
+                    self.failed[path] = f"{type(e).__name__}: {e}"
+                    self.counts["failed"] += 1
+                    print(f"Failed {path}: {self.failed[path]}")
+                    # 파일이 다시 바뀌기 전까지 재시도하지 않음
+                    self.done[path] = (size, mtime_ns)
+                    continue
+            
+            # har_label / samsung_health 는 cutoff 에 처리, 여기서는 도착만 기록
+            latency = time.time() - mtime_ns / 1e9
+            self.done[path] = (size, mtime_ns)
+            self.failed.pop(path, None)
+            self.counts[spec_dir] += 1
+            if spec_dir == "sensor_data":
+                self.latencies.append(latency)
+            
+            detail = f", {num_rows:,} rows" if num_rows is not None else ""
+            print(f"[{spec_dir}] {device_id} {os.path.basename(path)}: latency {latency:.1f}s{detail}, "
+                  f"backlog {len(self.pending)}")
+    
+    def enqueue_late(self, device_id, target_date, path):
+        # cutoff 처리 이후 도착한 파일의 (device, date) 를 다시 처리하도록 job store 에 등록 (done 이어도 pending 으로)
+        
+        self.counts["late"] += 1
+        print(f"Late upload (finalized {self.finalized_through}): {path}")
+        with job_store.open_job_store(self.store_url) as store:
+            store.enqueue([(device_id, target_date)], job_store.PROCESS_STAGE, force=True)
+        self.late_device_dates.add((device_id, target_date))
+    
+    def _run_script(self, script, args):
+        
+        common_args = ["--job-store", self.store_url]
+        if self.metrics_dir is not None:
+            common_args += ["--metrics-dir", self.metrics_dir]
+        result = subprocess.run([sys.executable, os.path.join(REPO_DIR, script), *args, *common_args], cwd=REPO_DIR)
+        if result.returncode != 0:
+            print(f"{script} failed: exit {result.returncode}")
+        
+        return result.returncode == 0
+    
+    def finalize(self, target_date):
+        """
+        cutoff 가 지난 날짜 : 날짜를 명시하여 01_upload_check.py --target-date -> 02_process_data.py --start-date 실행
+        (02 는 job store 에서 이 날짜의 (device, date) 만 claim), 이어서 job store 에 다시 등록한 late (device, date) 처리.
+        성공하면 처리가 끝난 live 파일 제거. Returns: 성공 여부
+        """
+        
+        print(f"Finalize {target_date} (cutoff {self.cutoff_time(target_date):%Y-%m-%d %H:%M})")
+        
+        device_args = ["--device-ids", *self.explicit_device_ids] if self.explicit_device_ids else []
+        process_args = ["--output-mode", self.output_mode] + self.process_args
+        if self.cache_dir is not None:
+            process_args += ["--cache-dir", self.cache_dir]
+        if self.salvage:
+            process_args.append("--salvage")
+        
+        if not self._run_script("01_upload_check.py", ["--target-date", target_date, *device_args]):
+            return False
+        if not self._run_script("02_process_data.py", ["--start-date", target_date, *device_args, *process_args]):
+            return False
+        
+        late_device_dates = sorted(self.late_device_dates)
+        if late_device_dates:
+            # --device-dates 는 job store 를 거치지 않으므로 job store 의 pending 을 claim 하는 기본 실행으로 처리
+            print(f"Process late uploads: {len(late_device_dates)} (device, date)")
+            if not self._run_script("02_process_data.py", process_args):
+                return False
+            self.late_device_dates -= set(late_device_dates)
+        
+        self.remove_finished_live()
+        
+        return True
+    
+    def remove_finished_live(self):
+        # cutoff 처리가 끝난 날짜의 live 파일 제거, 02 에서 실패하여 job store 에 남은 (device, date) 는 retry 후 제거
+        
+        with job_store.open_job_store(self.store_url) as store:
+            unfinished = {
+                (device_id, target_date)
+                for status in ["pending", "claimed", "failed"]
+                for device_id, target_date, *_ in store.jobs(job_store.PROCESS_STAGE, status)
+            }
+        
+        for device_id in self.device_ids:
+            live_root = os.path.join(PROCESSED_DATA_DIR, device_id, LIVE_DIR_NAME)
+            if not os.path.isdir(live_root):
+                continue
+            for target_date in os.listdir(live_root):
+                if target_date <= self.finalized_through and (device_id, target_date) not in unfinished:
+                    shutil.rmtree(os.path.join(live_root, target_date), ignore_errors=True)
+    
+    def finalize_due(self):
+        
+        next_date = self._shift(self.finalized_through, 1)
+        while datetime.now() >= self.cutoff_time(next_date):
+            if self.finalize_enabled:
+                if time.monotonic() < self.next_finalize_at:
+                    return
+                # finalized_through 를 먼저 옮겨야 live 파일 정리 대상에 포함됨, 실패하면 되돌리고 나중에 다시 시도
+                self.finalized_through = next_date
+                if not self.finalize(next_date):
+                    self.finalized_through = self._shift(next_date, -1)
+                    self.next_finalize_at = time.monotonic() + self.finalize_retry_seconds
+                    print(f"Finalize {next_date} failed, retry in {self.finalize_retry_seconds:.0f}s")
+                    return
+            else:
+                self.finalized_through = next_date
+            
+            # 지난 날짜의 처리 완료 기록은 정리 (아직 settle 대기 중인 파일은 late 로 처리, har_label 은 날짜 없음)
+            def _is_open(path):
+                target_date = classify_path(path)[2]
+                return target_date is None or target_date > next_date
+            
+            self.done = {path: signature for path, signature in self.done.items() if _is_open(path)}
+            next_date = self._shift(next_date, 1)
+    
+    def report_status(self):
+        
+        now = time.monotonic()
+        backlog = Counter(classify_path(path)[1] for path in self.pending)
+        oldest = max((now - entry[2] for entry in self.pending.values()), default=0.0)
+        latencies = np.array(self.latencies) if self.latencies else np.zeros(1)
+        quantiles = {"0.5": np.quantile(latencies, 0.5), "0.95": np.quantile(latencies, 0.95), "1": latencies.max()}
+        
+        print(
+            f"[watch/{self.watcher.mode}] backlog {sum(backlog.values())} files (oldest {oldest:.0f}s), "
+            f"processed sensor_data {self.counts['sensor_data']} / har_label {self.counts['har_label']} / "
+            f"samsung_health {self.counts['samsung_health']}, failed {self.counts['failed']}, late {self.counts['late']}, "
+            f"latency p50 {quantiles['0.5']:.1f}s p95 {quantiles['0.95']:.1f}s max {quantiles['1']:.1f}s"
+        )
+        
+        if self.metrics_dir is not None:
+            gauges = [
+                ("watch_backlog_files", "settle / 처리 대기 중인 파일 수", {"kind": spec_dir}, backlog.get(spec_dir, 0))
+                for spec_dir in WATCH_SPEC_DIRS
+            ]
+            gauges.append(("watch_backlog_oldest_seconds", "가장 오래 대기 중인 파일의 대기 시간", {}, f"{oldest:.1f}"))
+            gauges += [
+                ("watch_processed_files", "처리 / 도착 확인한 파일 수", {"kind": kind}, self.counts[kind])
+                for kind in WATCH_SPEC_DIRS + ["failed", "late"]
+            ]
+            gauges += [
+                ("watch_latency_seconds", "sensor_data 업로드(mtime) -> live 파일 기록 latency (최근 파일)",
+                 {"quantile": quantile}, f"{value:.1f}")
+                for quantile, value in quantiles.items()
+            ]
+            gauges.append(("watch_last_status_seconds", "마지막 상태 기록 시각 (epoch)", {}, f"{time.time():.0f}"))
+            run_metrics.write_gauges(os.path.join(self.metrics_dir, "watch.prom"), gauges)
+    
+    def run(self, once=False):
+        
+        print(f"Watching {len(self.device_ids)} devices ({self.watcher.mode}), finalized through {self.finalized_through}")
+        
+        paths = self.watcher.scan()
+        self.catch_up(paths)
+        self.observe(paths)
+        last_scan = last_status = time.monotonic()
+        
+        try:
+            while True:
+                self.observe(self.watcher.poll(self.poll_seconds))
+                
+                now = time.monotonic()
+                if self.watcher.mode == "inotify" and now - last_scan >= self.rescan_seconds:
+                    self.observe(self.watcher.scan())
+                    last_scan = now
+                
+                self.process_ready()
+                self.finalize_due()
+                
+                if once and not self.pending:
+                    break
+                if now - last_status >= self.status_seconds:
+                    self.report_status()
+                    last_status = now
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.report_status()
+            self.watcher.close()
+
+def main(metrics_dir=run_metrics.RUN_METRICS_DIR, profile_dir=run_metrics.RUN_PROFILE_DIR, once=False, **kwargs):
+    
+    run_metrics.configure("watch", metrics_dir, profile_dir)
+    
+    watcher = UploadWatcher(metrics_dir=metrics_dir, **kwargs)
+    watcher.run(once=once)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="업로드 감시 및 시간 단위 처리")
+    parser.add_argument("--device-ids", nargs="*", default=None,
+                        help="감시할 device (기본: user_device_table.csv 의 전체 device)")
+    parser.add_argument("--cutoff-hour", type=int, default=DEFAULT_CUTOFF_HOUR,
+                        help="이 시각이 지나면 그날 업로드 report / 일 단위 파일 생성")
+    parser.add_argument("--settle-seconds", type=float, default=DEFAULT_SETTLE_SECONDS,
+                        help="마지막 수정 후 이 시간이 지나면 업로드 완료로 판단")
+    parser.add_argument("--poll-seconds", type=float, default=DEFAULT_POLL_SECONDS,
+                        help="polling 간격 (inotify 사용 시 이벤트 대기 timeout)")
+    parser.add_argument("--rescan-seconds", type=float, default=DEFAULT_RESCAN_SECONDS,
+                        help="inotify 사용 시에도 전체 listing 하는 간격 (network mount 대비)")
+    parser.add_argument("--status-seconds", type=float, default=DEFAULT_STATUS_SECONDS,
+                        help="backlog / latency 출력 간격")
+    parser.add_argument("--polling", action="store_true",
+                        help="inotify 대신 polling 사용")
+    parser.add_argument("--output-mode", choices=["legacy", "columnar"], default="columnar",
+                        help="live / 일 단위 sensor_data parquet 형태")
+    parser.add_argument("--salvage", action="store_true",
+                        help="corrupt 한 sensor binary 에서 잘못된 구간만 건너뛰고 decoding")
+    parser.add_argument("--cache-dir", default=WATCH_CACHE_DIR,
+                        help="decoding cache 경로 (cutoff 처리에서 재사용)")
+    parser.add_argument("--process-args", default="",
+                        help="cutoff 에 실행하는 02_process_data.py 에 추가로 넘길 인자 (예: \"--workers 8\")")
+    parser.add_argument("--no-finalize", action="store_true",
+                        help="cutoff 에 01 / 02 를 실행하지 않음 (기존 cron 유지 시)")
+    parser.add_argument("--finalize-retry-seconds", type=float, default=DEFAULT_FINALIZE_RETRY_SECONDS,
+                        help="cutoff 처리가 실패하면 이 시간 후 같은 날짜를 다시 시도")
+    parser.add_argument("--job-store", default=job_store.JOB_STORE_URL,
+                        help="cutoff 처리 / late 업로드 등록에 사용하는 작업 상태 저장소 (JOB_STORE_URL)")
+    parser.add_argument("--once", action="store_true",
+                        help="현재 올라와 있는 파일을 처리하고 종료")
+    parser.add_argument("--metrics-dir", default=run_metrics.RUN_METRICS_DIR,
+                        help="파일별 측정값 / watch.prom 저장 경로 (RUN_METRICS_DIR)")
+    parser.add_argument("--profile-dir", default=run_metrics.RUN_PROFILE_DIR)
+    args = parser.parse_args()
+    
+    main(
+        metrics_dir=args.metrics_dir, profile_dir=args.profile_dir, once=args.once,
+        device_ids=args.device_ids, cutoff_hour=args.cutoff_hour, settle_seconds=args.settle_seconds,
+        poll_seconds=args.poll_seconds, rescan_seconds=args.rescan_seconds, status_seconds=args.status_seconds,
+        use_inotify=not args.polling, output_mode=args.output_mode, salvage=args.salvage,
+        cache_dir=args.cache_dir, process_args=shlex.split(args.process_args), finalize=not args.no_finalize,
+        store_url=args.job_store, finalize_retry_seconds=args.finalize_retry_seconds,
+    )